@@ -1,17 +1,42 @@
+import asyncio
+import json
 import logging
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field
-from typing import Dict, Any
+import os
+import numpy as np
+from fastapi import (
+    APIRouter,
+    Header,
+    HTTPException,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Callable, Dict, Any, List, Literal, Optional, Tuple
 
 # Servicios y utilidades
 from app.services.simulation_service import SimulationService
+from app.services.ejecutor import ServicioSaturadoError, TiempoAgotadoError
+from app.services.metricas import Cronometro, RegistroMetricas
+from app.services.sesiones import RegistroSesiones, SesionSimulacion
 from app.utils.validators import ParameterValidator
+from app.utils import serializacion
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="", tags=["Simulación"])
 
 # Instancia del servicio de simulación
 simulation_service = SimulationService()
+registro_sesiones = RegistroSesiones(int(os.getenv("SIMULADOR_MAX_SESIONES", "100")))
+registro_metricas = RegistroMetricas()
+MAX_PUNTOS_BARRIDO = int(os.getenv("SIMULADOR_MAX_PUNTOS_BARRIDO", "10000"))
+MAX_MUESTRAS_POBLACION = int(os.getenv("SIMULADOR_MAX_MUESTRAS_POBLACION", "20000"))
+MAX_MUESTRAS_ESTIMACION = int(os.getenv("SIMULADOR_MAX_MUESTRAS_ESTIMACION", "500000"))
+MAX_DURACION_ESCENARIO_S = float(
+    os.getenv("SIMULADOR_MAX_DURACION_ESCENARIO_S", "3600")
+)
+VELOCIDAD_MAXIMA = 100.0
 
 
 # --- Modelos Pydantic ---
@@ -45,57 +70,844 @@ class FisiologiaAvanzadaParams(BaseModel):
     )
     Qs_Qt: float = Field(0.05, ge=0, le=1, description="Fracción de Shunt")
     V_D: float = Field(0.15, ge=0, description="Volumen de espacio muerto (L)")
+    curva_o2: Literal["lineal", "severinghaus"] = Field(
+        "lineal", description="Curva de disociación de la hemoglobina"
+    )
+
+
+class EstadoSimulacionParams(BaseModel):
+    V1: float = Field(0.0, description="Volumen del compartimento 1 (L)")
+    V2: float = Field(0.0, description="Volumen del compartimento 2 (L)")
+    t: float = Field(0.0, ge=0, description="Tiempo de la simulación (s)")
+    paco2: float = Field(55.0, description="PaCO2 estimada (mmHg)")
+    integral_error: float = Field(
+        0.0, description="Término integral del control respiratorio"
+    )
+    amplitud: Optional[float] = Field(
+        None, description="Amplitud de P_mus del último ciclo (cmH2O)"
+    )
+    frecuencia: Optional[float] = Field(
+        None, gt=0, description="Frecuencia de P_mus del último ciclo (Hz)"
+    )
 
 
 class SimulationRequest(BaseModel):
     paciente: PacienteParams
     ventilador: VentiladorParams
     fisiologia: FisiologiaAvanzadaParams
+    estado_estacionario: bool = Field(
+        False,
+        description="En PCV/VCV, devolver solo dos ciclos del régimen periódico",
+    )
+    max_points: Optional[int] = Field(
+        None,
+        ge=10,
+        description="Máximo de muestras por serie (decimación que conserva picos)",
+    )
+    estado: Optional[EstadoSimulacionParams] = Field(
+        None,
+        description="Continuar desde el 'estado_final' de una simulación anterior",
+    )
+    precision: Literal["float64", "float32"] = Field(
+        "float64",
+        description="Tipo de las series: float32 usa la mitad de memoria",
+    )
+
+
+class EjeBarrido(BaseModel):
+    parametro: str = Field(
+        ..., description="Campo de paciente, ventilador o fisiología (p. ej. PEEP)"
+    )
+    valores: Optional[List[float]] = Field(
+        None, description="Valores explícitos (alternativa a inicio/fin/pasos)"
+    )
+    inicio: Optional[float] = Field(None, description="Primer valor del rango")
+    fin: Optional[float] = Field(None, description="Último valor del rango")
+    pasos: Optional[int] = Field(None, ge=1, description="Número de valores")
+
+    def lista_valores(self) -> List[float]:
+        if self.valores is not None:
+            return self.valores
+        if None in (self.inicio, self.fin, self.pasos):
+            raise ValueError(
+                f"El eje {self.parametro} requiere 'valores' o 'inicio', "
+                "'fin' y 'pasos'"
+            )
+        return np.linspace(self.inicio, self.fin, self.pasos).tolist()
+
+
+class SweepRequest(BaseModel):
+    paciente: PacienteParams
+    ventilador: VentiladorParams
+    fisiologia: FisiologiaAvanzadaParams
+    ejes: List[EjeBarrido] = Field(..., min_length=1, max_length=3)
+    estado_estacionario: bool = Field(
+        False, description="Medir sobre el régimen periódico (más rápido)"
+    )
+
+
+class SensitivityRequest(BaseModel):
+    paciente: PacienteParams
+    ventilador: VentiladorParams
+    fisiologia: FisiologiaAvanzadaParams
+    parametros: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        description="Parámetros a perturbar; por defecto, todos los numéricos",
+    )
+    paso_relativo: float = Field(
+        1e-4, gt=0, le=0.1, description="Paso de la diferencia finita (relativo)"
+    )
+    estado_estacionario: bool = Field(
+        True, description="Medir sobre el régimen periódico (recomendado)"
+    )
+
+
+class DistribucionParametro(BaseModel):
+    tipo: Literal["normal", "lognormal", "uniforme"] = Field(
+        ..., description="Distribución del parámetro"
+    )
+    media: Optional[float] = Field(None, description="Media (normal)")
+    mediana: Optional[float] = Field(None, gt=0, description="Mediana (lognormal)")
+    desvio: Optional[float] = Field(
+        None, ge=0, description="Desvío (normal) o desvío del logaritmo (lognormal)"
+    )
+    minimo: Optional[float] = Field(
+        None, description="Límite inferior (uniforme) o de truncamiento"
+    )
+    maximo: Optional[float] = Field(
+        None, description="Límite superior (uniforme) o de truncamiento"
+    )
+
+
+class PopulationRequest(BaseModel):
+    paciente: PacienteParams
+    ventilador: VentiladorParams
+    fisiologia: FisiologiaAvanzadaParams
+    distribuciones: Dict[str, DistribucionParametro] = Field(
+        ..., min_length=1, description="Distribución de cada parámetro sorteado"
+    )
+    muestras: int = Field(1000, ge=1, description="Pacientes de la población")
+    semilla: int = Field(0, ge=0, description="Semilla del muestreo")
+    percentiles: List[float] = Field(
+        [5.0, 25.0, 50.0, 75.0, 95.0], min_length=1, max_length=20
+    )
+    bins: int = Field(30, ge=1, le=1000, description="Intervalos de los histogramas")
+    estado_estacionario: bool = Field(
+        True, description="Medir sobre el régimen periódico (recomendado)"
+    )
+
+
+class EstimationRequest(BaseModel):
+    t: List[float] = Field(..., min_length=20, description="Tiempos (s), crecientes")
+    presion: List[float] = Field(..., description="Presión en la vía aérea (cmH2O)")
+    flujo: Optional[List[float]] = Field(None, description="Flujo total (L/s)")
+    volumen: Optional[List[float]] = Field(
+        None, description="Volumen (L); se admite cualquier desplazamiento"
+    )
+    nivel_confianza: float = Field(
+        0.95, gt=0, lt=1, description="Nivel de los intervalos de confianza"
+    )
+
+
+class EventoEscenario(BaseModel):
+    t: float = Field(..., gt=0, description="Tiempo programado del cambio (s)")
+    paciente: Dict[str, float] = Field({}, description="Cambios del paciente")
+    ventilador: Dict[str, Any] = Field({}, description="Cambios del ventilador")
+    fisiologia: Dict[str, Any] = Field({}, description="Cambios de fisiología")
+
+
+class ScenarioRequest(BaseModel):
+    paciente: PacienteParams
+    ventilador: VentiladorParams
+    fisiologia: FisiologiaAvanzadaParams
+    eventos: List[EventoEscenario] = Field(
+        ..., max_length=100, description="Cambios de parámetros programados"
+    )
+    duracion_s: float = Field(..., gt=0, description="Duración del escenario (s)")
+    max_points: Optional[int] = Field(
+        None,
+        ge=10,
+        description="Máximo de muestras por serie (decimación que conserva picos)",
+    )
+
+
+def _validar_parametros(request: SimulationRequest):
+    """Valida la petición; devuelve los parámetros de paciente, ventilador y
+    fisiología como diccionarios o lanza HTTPException 400."""
+    paciente_params = request.paciente.dict()
+    ventilador_params = request.ventilador.dict()
+    fisiologia_params = request.fisiologia.dict()
+
+    # Validar parámetros del paciente
+    patient_error = ParameterValidator.validate_patient_params(paciente_params)
+    if patient_error:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error en parámetros del paciente: {patient_error}",
+        )
+
+    # Validar parámetros del ventilador
+    ventilator_error = ParameterValidator.validate_ventilator_params(ventilador_params)
+    if ventilator_error:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Error en parámetros del ventilador: {ventilator_error}",
+        )
+
+    return paciente_params, ventilador_params, fisiologia_params
+
+
+def parametros_por_defecto(modo: str) -> Tuple[Dict, Dict, Dict]:
+    """Parámetros por defecto de la API para un modo, validados igual que
+    una petición (se usan en el calentamiento)."""
+    request = SimulationRequest(
+        paciente=PacienteParams(),
+        ventilador=VentiladorParams(modo=modo),
+        fisiologia=FisiologiaAvanzadaParams(),
+    )
+    return _validar_parametros(request)
 
 
 # --- Endpoint de Simulación ---
 @router.post("/simulate", response_model=Dict[str, Any])
-async def run_simulation(request: SimulationRequest):
+async def run_simulation(
+    request: SimulationRequest, accept: Optional[str] = Header(None)
+):
     """
     Ejecuta una simulación cardiorrespiratoria integral.
+
+    Con `Accept: application/octet-stream` las series se devuelven en el
+    formato binario columnar de app.utils.serializacion (float32 little-endian
+    con una cabecera JSON para las métricas); en otro caso, como JSON.
+
+    La cabecera Server-Timing detalla el tiempo de cada etapa (caché, cola
+    del ejecutor, simulación, procesamiento, gases, hemodinámica, respuesta,
+    conversión a listas y codificación) y los contadores nfev, ciclos y
+    puntos; las mismas mediciones se agregan en /metrics.
     """
     logger.info(f"Iniciando simulación con parámetros: {request.dict()}")
 
     try:
-        # Validar parámetros
-        paciente_params = request.paciente.dict()
-        ventilador_params = request.ventilador.dict()
-        fisiologia_params = request.fisiologia.dict()
-
-        # Validar parámetros del paciente
-        patient_error = ParameterValidator.validate_patient_params(paciente_params)
-        if patient_error:
+        paciente_params, ventilador_params, fisiologia_params = _validar_parametros(
+            request
+        )
+
+        # Ejecutar simulación usando el servicio
+        cronometro = Cronometro()
+        resultado = await simulation_service.run_simulation_async(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            cronometro=cronometro,
+            estado_estacionario=request.estado_estacionario,
+            max_points=request.max_points,
+            estado=request.estado.model_dump() if request.estado else None,
+            precision=request.precision,
+        )
+
+        logger.info("Simulación completada exitosamente.")
+        respuesta = _respuesta_series(resultado, accept, cronometro)
+        registro_metricas.observar(cronometro, modo=ventilador_params["modo"])
+        return respuesta
+
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Simulación rechazada: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
+        )
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+def _respuesta_series(
+    resultado: Dict[str, Any], accept: Optional[str], cronometro: Cronometro
+) -> Response:
+    """Respuesta con series_tiempo en el formato binario si `accept` lo pide
+    o, si no, como JSON; el cronómetro recibe el tiempo de codificación."""
+    if serializacion.acepta_binario(accept):
+        with cronometro.etapa("binario"):
+            contenido = serializacion.a_binario(resultado)
+        tipo = serializacion.TIPO_BINARIO
+    else:
+        with cronometro.etapa("listas"):
+            resultado_json = serializacion.a_json(resultado)
+        with cronometro.etapa("json"):
+            contenido = json.dumps(
+                resultado_json,
+                default=serializacion.a_nativo,
+                ensure_ascii=False,
+                allow_nan=False,
+                separators=(",", ":"),
+            ).encode("utf-8")
+        tipo = "application/json"
+    return Response(
+        content=contenido,
+        media_type=tipo,
+        headers={"Server-Timing": cronometro.server_timing()},
+    )
+
+
+@router.post("/simulate/stream")
+async def run_simulation_stream(
+    request: SimulationRequest, accept: Optional[str] = Header(None)
+):
+    """
+    Transmite la simulación ciclo a ciclo: cada respiración se envía con sus
+    series y métricas en cuanto se calcula, y al final un evento "fin".
+
+    Por defecto el formato es NDJSON (un objeto JSON por línea); con
+    `Accept: text/event-stream` se usan Server-Sent Events. Los errores
+    posteriores al inicio de la transmisión llegan como un evento "error".
+    Cada transmisión ocupa un lugar del ejecutor mientras dura (503 si no
+    hay) y cada ciclo tiene el tiempo máximo de una simulación.
+    `max_points` no aplica: cada ciclo se envía a resolución completa (ni
+    `precision`: cada ciclo se serializa a JSON en cuanto se calcula).
+    """
+    paciente_params, ventilador_params, fisiologia_params = _validar_parametros(request)
+    try:
+        eventos = simulation_service.iterar_simulacion(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            estado_estacionario=request.estado_estacionario,
+            estado=request.estado.model_dump() if request.estado else None,
+        )
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    if serializacion.acepta_sse(accept):
+        formatear, tipo = serializacion.evento_sse, serializacion.TIPO_SSE
+    else:
+        formatear, tipo = serializacion.linea_ndjson, serializacion.TIPO_NDJSON
+
+    # El generador vive en este proceso: el stream ocupa un lugar del
+    # ejecutor mientras dura y cada ciclo se calcula en uno de sus hilos,
+    # con su tiempo máximo
+    try:
+        reserva = simulation_service.ejecutor.reservar()
+    except ServicioSaturadoError as se:
+        logger.warning(f"Transmisión rechazada: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
+        )
+
+    async def transmitir():
+        try:
+            while (evento := await reserva.ejecutar(next, eventos, None)) is not None:
+                yield formatear(evento)
+        except Exception as e:
+            logger.error(f"Error durante la transmisión: {e}", exc_info=True)
+            yield formatear({"tipo": "error", "detalle": str(e)})
+        finally:
+            reserva.liberar()
+
+    return StreamingResponse(transmitir(), media_type=tipo)
+
+
+@router.websocket("/simulate/session")
+async def sesion_simulacion(websocket: WebSocket):
+    """
+    Sesión interactiva: la simulación avanza de forma continua y envía cada
+    ciclo nuevo (mismo formato que los eventos "ciclo" de /simulate/stream,
+    más "t_sesion" y "duracion") sin reiniciarse al cambiar parámetros.
+
+    El primer mensaje del cliente es un SimulationRequest, opcionalmente con
+    "velocidad" (1 = tiempo real). Después acepta en cualquier momento:
+        {"tipo": "actualizar", "paciente": {...}, "ventilador": {...},
+         "fisiologia": {...}}  cambios parciales, aplicados al próximo ciclo
+        {"tipo": "velocidad", "factor": x}  con 0 < x <= 100
+        {"tipo": "cerrar"}
+    Los mensajes inválidos se responden con un evento "error".
+
+    Cada ciclo se calcula en el ejecutor, con su capacidad y tiempo máximo:
+    si está saturado o el ciclo tarda demasiado, se envía un evento "error"
+    y se cierra la sesión (código 1013, reintentar más tarde).
+    """
+    await websocket.accept()
+    if not registro_sesiones.abrir():
+        await websocket.close(code=1013, reason="Servidor saturado")
+        return
+
+    mensajes: asyncio.Queue = asyncio.Queue()
+
+    async def recibir():
+        # Lectura en una tarea aparte para atender mensajes mientras se espera
+        # el siguiente ciclo
+        try:
+            while True:
+                await mensajes.put(await websocket.receive_text())
+        except WebSocketDisconnect:
+            await mensajes.put(None)
+
+    lector = asyncio.create_task(recibir())
+    try:
+        inicial = await mensajes.get()
+        if inicial is None:
+            return
+        try:
+            datos = json.loads(inicial)
+            velocidad = _velocidad_valida(datos.pop("velocidad", 1.0))
+            sesion = SesionSimulacion(
+                simulation_service,
+                *_validar_parametros(SimulationRequest(**datos)),
+            )
+        except (ValueError, TypeError, ValidationError, HTTPException) as e:
+            await _enviar_error(websocket, e)
+            await websocket.close(code=1008)
+            return
+
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                evento = await simulation_service.ejecutor.ejecutar_en_hilo(
+                    sesion.avanzar
+                )
+            except (ServicioSaturadoError, TiempoAgotadoError) as e:
+                # Un ciclo que superó su tiempo máximo sigue modificando la
+                # sesión: no se continúa
+                await _enviar_error(websocket, e)
+                await websocket.close(code=1013)
+                return
+            await websocket.send_text(serializacion.linea_ndjson(evento))
+
+            # Atender mensajes hasta que corresponda el siguiente ciclo
+            siguiente = loop.time() + evento["duracion"] / velocidad
+            while (restante := siguiente - loop.time()) > 0:
+                try:
+                    mensaje = await asyncio.wait_for(mensajes.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                if mensaje is None:
+                    return
+                try:
+                    datos = json.loads(mensaje)
+                    tipo = datos.get("tipo")
+                    if tipo == "cerrar":
+                        await websocket.close()
+                        return
+                    elif tipo == "velocidad":
+                        velocidad = _velocidad_valida(datos.get("factor"))
+                        siguiente = loop.time()
+                    elif tipo == "actualizar":
+                        _actualizar_sesion(sesion, datos)
+                    else:
+                        raise ValueError(f"Tipo de mensaje desconocido: {tipo}")
+                except (ValueError, TypeError, ValidationError, HTTPException) as e:
+                    await _enviar_error(websocket, e)
+
+    except WebSocketDisconnect:
+        pass
+    finally:
+        lector.cancel()
+        registro_sesiones.cerrar()
+
+
+def _velocidad_valida(factor) -> float:
+    factor = float(factor)
+    if not 0 < factor <= VELOCIDAD_MAXIMA:
+        raise ValueError(f"La velocidad debe estar en (0, {VELOCIDAD_MAXIMA:g}]")
+    return factor
+
+
+def _actualizar_sesion(sesion: SesionSimulacion, cambios: Dict[str, Any]) -> None:
+    """Valida la configuración resultante de aplicar cambios parciales."""
+    request = SimulationRequest(
+        paciente={**sesion.paciente_params, **cambios.get("paciente", {})},
+        ventilador={**sesion.ventilador_params, **cambios.get("ventilador", {})},
+        fisiologia={**sesion.fisiologia_params, **cambios.get("fisiologia", {})},
+    )
+    sesion.actualizar(*_validar_parametros(request))
+
+
+async def _enviar_error(websocket: WebSocket, error: Exception) -> None:
+    detalle = error.detail if isinstance(error, HTTPException) else str(error)
+    await websocket.send_text(
+        serializacion.linea_ndjson({"tipo": "error", "detalle": detalle})
+    )
+
+
+@router.post("/sweep", response_model=Dict[str, Any])
+async def run_sweep(request: SweepRequest):
+    """
+    Barrido de parámetros (PCV/VCV): simula la rejilla formada por los ejes
+    sobre la configuración base y devuelve solo métricas, cada una como una
+    matriz con un índice por eje, sin series de tiempo.
+    """
+    try:
+        paciente_params, ventilador_params, fisiologia_params = _validar_parametros(
+            request
+        )
+        modelos = {
+            PacienteParams: paciente_params,
+            VentiladorParams: ventilador_params,
+            FisiologiaAvanzadaParams: fisiologia_params,
+        }
+        ejes = []
+        for eje in request.ejes:
+            valores = eje.lista_valores()
+            # Cada valor debe cumplir las mismas restricciones que en /simulate
+            for modelo, base in modelos.items():
+                if eje.parametro in base:
+                    for valor in valores:
+                        modelo(**{**base, eje.parametro: valor})
+            ejes.append((eje.parametro, valores))
+
+        # El tiempo inspiratorio debe caber en el ciclo en toda la rejilla:
+        # basta comprobar el mayor Ti con la mayor frecuencia
+        valores_eje = dict(ejes)
+        Ti = max(valores_eje.get("Ti", [ventilador_params["Ti"]]))
+        fr = max(valores_eje.get("fr", [ventilador_params["fr"]]))
+        if Ti >= 60.0 / fr:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"Ti = {Ti:g} s no es menor que el ciclo de {60.0 / fr:g} s "
+                    f"(fr = {fr:g} rpm)"
+                ),
+            )
+
+        puntos = int(np.prod([len(valores) for _, valores in ejes]))
+        if puntos > MAX_PUNTOS_BARRIDO:
+            raise ValueError(
+                f"El barrido tiene {puntos} puntos (máximo {MAX_PUNTOS_BARRIDO})"
+            )
+
+        metricas = await simulation_service.run_sweep_async(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            ejes,
+            estado_estacionario=request.estado_estacionario,
+        )
+        return {
+            "ejes": [
+                {"parametro": parametro, "valores": valores}
+                for parametro, valores in ejes
+            ],
+            **{
+                grupo: {nombre: valor.tolist() for nombre, valor in valores.items()}
+                for grupo, valores in metricas.items()
+            },
+        }
+
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Barrido rechazado: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
+        )
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+def _lista_json(valores: np.ndarray) -> List[Optional[float]]:
+    """Arreglo a lista JSON: NaN e infinitos como null."""
+    return [float(v) if np.isfinite(v) else None for v in valores]
+
+
+def _validador_campos(
+    paciente_params: Dict[str, Any],
+    ventilador_params: Dict[str, Any],
+    fisiologia_params: Dict[str, Any],
+) -> Callable[[str, float], bool]:
+    """es_valido(parametro, valor): si la configuración con ese valor cumple
+    las mismas restricciones que en /simulate."""
+    modelos = {
+        PacienteParams: paciente_params,
+        VentiladorParams: ventilador_params,
+        FisiologiaAvanzadaParams: fisiologia_params,
+    }
+
+    def es_valido(parametro: str, valor: float) -> bool:
+        for modelo, base in modelos.items():
+            if parametro in base:
+                try:
+                    modelo(**{**base, parametro: valor})
+                except ValidationError:
+                    return False
+        return True
+
+    return es_valido
+
+
+@router.post("/sensitivity", response_model=Dict[str, Any])
+async def run_sensitivity(request: SensitivityRequest):
+    """
+    Análisis de sensibilidad local (PCV/VCV): jacobiano de las métricas
+    mecánicas, de gases y hemodinámicas respecto a los parámetros, por
+    diferencias finitas centradas evaluadas en un solo lote. Devuelve
+    también las elasticidades (∂m/∂p · p/m).
+    """
+    try:
+        paciente_params, ventilador_params, fisiologia_params = _validar_parametros(
+            request
+        )
+        parametros = request.parametros or [
+            campo
+            for base in (paciente_params, ventilador_params, fisiologia_params)
+            for campo, valor in base.items()
+            if isinstance(valor, (int, float))
+        ]
+
+        resultado = await simulation_service.run_sensitivity_async(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            parametros,
+            paso_relativo=request.paso_relativo,
+            estado_estacionario=request.estado_estacionario,
+            es_valido=_validador_campos(
+                paciente_params, ventilador_params, fisiologia_params
+            ),
+        )
+        return {
+            **resultado,
+            **{
+                clave: {
+                    grupo: {
+                        nombre: _lista_json(valores)
+                        for nombre, valores in metricas.items()
+                    }
+                    for grupo, metricas in resultado[clave].items()
+                }
+                for clave in ("jacobiano", "elasticidades")
+            },
+        }
+
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Sensibilidad rechazada: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
+        )
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+@router.post("/population", response_model=Dict[str, Any])
+async def run_population(request: PopulationRequest):
+    """
+    Población virtual (PCV/VCV): sortea los parámetros de `distribuciones`
+    para `muestras` pacientes, los simula en lotes y devuelve bandas de
+    percentiles de las señales del último ciclo e histogramas de las
+    métricas, no las simulaciones individuales. Con la misma semilla el
+    resultado es reproducible.
+    """
+    try:
+        paciente_params, ventilador_params, fisiologia_params = _validar_parametros(
+            request
+        )
+        if request.muestras > MAX_MUESTRAS_POBLACION:
             raise HTTPException(
                 status_code=400,
-                detail=f"Error en parámetros del paciente: {patient_error}",
+                detail=(
+                    f"La población tiene {request.muestras} muestras; "
+                    f"el máximo es {MAX_MUESTRAS_POBLACION}."
+                ),
+            )
+        if any(not 0 <= p <= 100 for p in request.percentiles):
+            raise HTTPException(
+                status_code=400, detail="Los percentiles deben estar entre 0 y 100."
             )
+        return await simulation_service.run_population_async(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            {
+                parametro: distribucion.model_dump()
+                for parametro, distribucion in request.distribuciones.items()
+            },
+            request.muestras,
+            semilla=request.semilla,
+            percentiles=request.percentiles,
+            bins=request.bins,
+            estado_estacionario=request.estado_estacionario,
+            es_valido=_validador_campos(
+                paciente_params, ventilador_params, fisiologia_params
+            ),
+        )
 
-        # Validar parámetros del ventilador
-        ventilator_error = ParameterValidator.validate_ventilator_params(
-            ventilador_params
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Población rechazada: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
         )
-        if ventilator_error:
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+@router.post("/estimate", response_model=Dict[str, Any])
+async def run_estimation(request: EstimationRequest):
+    """
+    Estima los parámetros del paciente (R1, C1, R2, C2) a partir de las
+    señales de un ventilador real, con intervalos de confianza. Requiere la
+    presión y el flujo o el volumen, muestreados en los tiempos `t`.
+    """
+    try:
+        if len(request.t) > MAX_MUESTRAS_ESTIMACION:
             raise HTTPException(
                 status_code=400,
-                detail=f"Error en parámetros del ventilador: {ventilator_error}",
+                detail=(
+                    f"El registro tiene {len(request.t)} muestras; "
+                    f"el máximo es {MAX_MUESTRAS_ESTIMACION}."
+                ),
             )
+        return await simulation_service.run_estimation_async(
+            request.t,
+            request.presion,
+            request.flujo,
+            request.volumen,
+            request.nivel_confianza,
+        )
 
-        # Ejecutar simulación usando el servicio
-        resultado = simulation_service.run_simulation(
-            paciente_params, ventilador_params, fisiologia_params
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Estimación rechazada: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
         )
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
+    except ValueError as ve:
+        logger.error(f"Error de validación: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
 
-        logger.info("Simulación completada exitosamente.")
-        return resultado
 
+@router.post("/scenario", response_model=Dict[str, Any])
+async def run_scenario(request: ScenarioRequest, accept: Optional[str] = Header(None)):
+    """
+    Escenario: simula `duracion_s` segundos en una sola pasada continua
+    aplicando en su tiempo `t` los cambios de parámetros de cada evento
+    (p. ej. subir la PEEP a los 60 s o pasar a ESPONTANEO). Cada cambio
+    rige desde el primer límite de ciclo en `t` o después, conservando los
+    volúmenes, la PaCO2 y el controlador; la configuración resultante se
+    valida igual que en /simulate.
+
+    Devuelve las series de todo el escenario (en JSON o, con
+    `Accept: application/octet-stream`, en el formato binario de /simulate),
+    las métricas de cada segmento entre cambios y el "estado_final".
+    """
+    try:
+        if request.duracion_s > MAX_DURACION_ESCENARIO_S:
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"El escenario dura {request.duracion_s:g} s; "
+                    f"el máximo es {MAX_DURACION_ESCENARIO_S:g} s."
+                ),
+            )
+        configuraciones = [(0.0, *_validar_parametros(request))]
+        for evento in sorted(request.eventos, key=lambda e: e.t):
+            if evento.t >= request.duracion_s:
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"El evento en t = {evento.t:g} s es posterior al fin "
+                        "del escenario."
+                    ),
+                )
+            _, paciente, ventilador, fisiologia = configuraciones[-1]
+            try:
+                siguiente = SimulationRequest(
+                    paciente={**paciente, **evento.paciente},
+                    ventilador={**ventilador, **evento.ventilador},
+                    fisiologia={**fisiologia, **evento.fisiologia},
+                )
+            except ValidationError as ve:
+                error = ve.errors()[0]
+                campo = ".".join(str(parte) for parte in error["loc"])
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Evento en t = {evento.t:g} s: {campo}: {error['msg']}",
+                )
+            desconocidos = [
+                campo
+                for cambios, base in (
+                    (evento.paciente, paciente),
+                    (evento.ventilador, ventilador),
+                    (evento.fisiologia, fisiologia),
+                )
+                for campo in cambios
+                if campo not in base
+            ]
+            if desconocidos:
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Evento en t = {evento.t:g} s: campos desconocidos "
+                        f"{desconocidos}"
+                    ),
+                )
+            configuraciones.append((evento.t, *_validar_parametros(siguiente)))
+
+        cronometro = Cronometro()
+        resultado = await simulation_service.run_scenario_async(
+            configuraciones, request.duracion_s, max_points=request.max_points
+        )
+        return _respuesta_series(resultado, accept, cronometro)
+
+    except HTTPException:
+        raise
+    except ServicioSaturadoError as se:
+        logger.warning(f"Escenario rechazado: {se}")
+        raise HTTPException(
+            status_code=503, detail=str(se), headers={"Retry-After": "1"}
+        )
+    except TiempoAgotadoError as te:
+        logger.error(f"Tiempo agotado: {te}")
+        raise HTTPException(status_code=504, detail=str(te))
     except ValueError as ve:
-        logger.error(f"Error de validación: {ve}", exc_info=True)
+        logger.error(f"Error de validación: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
     except Exception as e:
         logger.error(f"Error inesperado: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def estadisticas_cache():
+    """
+    Estadísticas de la caché de resultados (aciertos, fallos, desalojos).
+    """
+    return simulation_service.cache.estadisticas()
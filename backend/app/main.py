@@ -1,7 +1,13 @@
+import asyncio
 import logging
-from fastapi import FastAPI, Request
+import time
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.endpoints import simulation
+from app.services import arranque
+from app.services.arranque import estado_arranque
 
 # --- Configuración del Logging ---
 logging.basicConfig(
@@ -10,11 +16,50 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+PREFIJO_API = "/api"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ciclo de vida: calienta el worker en segundo plano (las rutas POST y
+    una simulación por modo; /ready responde 200 al terminar) y libera el
+    pool de simulación al apagar el servidor."""
+    estado_arranque.reiniciar()
+    calentamiento = None
+    if arranque.calentamiento_activado():
+        parametros = {
+            modo: simulation.parametros_por_defecto(modo)
+            for modo in arranque.MODOS_CALENTAMIENTO
+        }
+        rutas = [
+            PREFIJO_API + r.path
+            for r in simulation.router.routes
+            if "POST" in getattr(r, "methods", ())
+        ]
+
+        async def calentar():
+            await arranque.calentar_rutas(app, rutas, estado_arranque)
+            await arranque.calentar(
+                simulation.simulation_service, parametros, estado_arranque
+            )
+
+        calentamiento = asyncio.create_task(calentar())
+    else:
+        estado_arranque.marcar_listo()
+    yield
+    if calentamiento is not None:
+        calentamiento.cancel()
+        with suppress(asyncio.CancelledError):
+            await calentamiento
+    simulation.simulation_service.cerrar()
+
+
 # --- Aplicación FastAPI ---
 app = FastAPI(
     title="Simulador de Fisiología Pulmonar API",
     description="API para ejecutar simulaciones de fisiología pulmonar.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- Orígenes permitidos ---
@@ -38,12 +83,58 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Middleware para loggear cada petición recibida."""
+    """Middleware para loggear cada petición recibida, medir su duración
+    (hasta enviar las cabeceras) y añadirla a Server-Timing como "total"."""
     logger.info(f"Petición: {request.method} {request.url}")
+    inicio = time.perf_counter()
     response = await call_next(request)
-    logger.info(f"Respuesta: {response.status_code}")
+    duracion = time.perf_counter() - inicio
+    logger.info(f"Respuesta: {response.status_code} ({duracion * 1e3:.1f} ms)")
+
+    if request.scope.get("calentamiento"):
+        return response
+
+    # Solo las rutas definidas (sin parámetros en la ruta) etiquetan sus
+    # series; el resto se agrupa para acotar la cardinalidad de /metrics
+    ruta = request.url.path if "route" in request.scope else "desconocida"
+    simulation.registro_metricas.observar_peticion(
+        request.method, ruta, response.status_code, duracion
+    )
+    estado_arranque.registrar_peticion(ruta, duracion)
+    total = f"total;dur={duracion * 1e3:.3f}"
+    previo = response.headers.get("Server-Timing")
+    response.headers["Server-Timing"] = f"{previo}, {total}" if previo else total
     return response
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas del proceso en el formato de texto de Prometheus."""
+    cache = simulation.simulation_service.cache.estadisticas()
+    medidores = {
+        "simulador_cache_entradas": cache["entradas"],
+        "simulador_cache_bytes": cache["bytes"],
+        "simulador_cache_aciertos": cache["aciertos"],
+        "simulador_cache_fallos": cache["fallos"],
+        "simulador_sesiones_activas": simulation.registro_sesiones.activas,
+        **estado_arranque.medidores(),
+    }
+    return Response(
+        content=simulation.registro_metricas.exposicion(medidores),
+        media_type=simulation.registro_metricas.TIPO_CONTENIDO,
+    )
+
+
+@app.get("/ready", include_in_schema=False)
+def ready():
+    """Disponibilidad del worker: 503 hasta que termina el calentamiento,
+    200 después. Incluye los tiempos de arranque y de la primera petición."""
+    return JSONResponse(
+        estado_arranque.a_dict(), status_code=200 if estado_arranque.listo else 503
+    )
+
+
 # --- Incluir Routers ---
-app.include_router(simulation.router, prefix="/api")
+app.include_router(simulation.router, prefix=PREFIJO_API)
+
+estado_arranque.marcar_importado()
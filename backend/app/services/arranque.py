@@ -0,0 +1,228 @@
+"""
+Arranque - Calentamiento de los workers, disponibilidad (readiness) y
+medición del arranque en frío
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from app.services.simulation_service import SimulationService, _ejecutar_simulacion
+from app.utils import serializacion
+
+logger = logging.getLogger(__name__)
+
+MODOS_CALENTAMIENTO = ("PCV", "VCV", "ESPONTANEO")
+
+# Rutas de sondeo y observabilidad: no cuentan como primera petición
+RUTAS_SONDEO = ("/ready", "/metrics")
+
+
+def _inicio_proceso() -> float:
+    """Instante (epoch) en que arrancó el proceso, según /proc en Linux; en
+    un worker creado con fork es el instante del fork. Si no está
+    disponible, el momento en que se importa este módulo."""
+    try:
+        with open("/proc/self/stat") as archivo:
+            inicio_ticks = int(archivo.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as archivo:
+            uptime = float(archivo.read().split()[0])
+        return time.time() - uptime + inicio_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return time.time()
+
+
+class EstadoArranque:
+    """
+    Tiempos de arranque de un worker y su disponibilidad.
+
+    Registra, medidos desde el inicio del proceso: la importación de la
+    aplicación, el calentamiento por modo, el momento en que el worker
+    queda listo y la latencia de la primera petición atendida.
+    """
+
+    def __init__(self):
+        self.inicio = _inicio_proceso()
+        self.importacion_s: Optional[float] = None
+        self.precargado = False
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        """Vuelve al estado previo al calentamiento (al iniciar el lifespan)."""
+        self.listo = False
+        self.arranque_s: Optional[float] = None
+        self.calentamiento: Dict[str, float] = {}
+        self.primera_peticion: Optional[Tuple[str, float]] = None
+
+    def tras_fork(self) -> None:
+        """En un worker creado con fork tras precargar la aplicación: el
+        arranque se mide desde el fork y no hay importación propia."""
+        self.inicio = _inicio_proceso()
+        self.importacion_s = 0.0
+        self.precargado = True
+        self.reiniciar()
+
+    def marcar_importado(self) -> None:
+        self.importacion_s = time.time() - self.inicio
+
+    def marcar_listo(self) -> None:
+        self.arranque_s = time.time() - self.inicio
+        self.listo = True
+        logger.info(
+            f"Worker {os.getpid()} listo en {self.arranque_s:.2f} s "
+            f"(importación {self.importacion_s or 0:.2f} s, calentamiento "
+            f"{sum(self.calentamiento.values()):.2f} s, "
+            f"precargado={self.precargado})"
+        )
+
+    def registrar_peticion(self, ruta: str, segundos: float) -> None:
+        """Guarda la latencia de la primera petición que no es de sondeo."""
+        if self.primera_peticion is None and ruta not in RUTAS_SONDEO:
+            self.primera_peticion = (ruta, segundos)
+            logger.info(f"Primera petición ({ruta}): {segundos * 1e3:.1f} ms")
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "listo": self.listo,
+            "pid": os.getpid(),
+            "precargado": self.precargado,
+            "importacion_s": self.importacion_s,
+            "calentamiento_s": dict(self.calentamiento),
+            "arranque_s": self.arranque_s,
+            "primera_peticion": (
+                None
+                if self.primera_peticion is None
+                else {
+                    "ruta": self.primera_peticion[0],
+                    "segundos": self.primera_peticion[1],
+                }
+            ),
+        }
+
+    def medidores(self) -> Dict[str, float]:
+        """Valores para /metrics (solo los ya medidos)."""
+        valores = {
+            "simulador_listo": float(self.listo),
+            "simulador_importacion_segundos": self.importacion_s,
+            "simulador_arranque_segundos": self.arranque_s,
+            "simulador_calentamiento_segundos": sum(self.calentamiento.values()),
+            "simulador_primera_peticion_segundos": (
+                self.primera_peticion[1] if self.primera_peticion else None
+            ),
+        }
+        return {nombre: v for nombre, v in valores.items() if v is not None}
+
+
+def calentamiento_activado() -> bool:
+    """El calentamiento se desactiva con SIMULADOR_CALENTAMIENTO=0."""
+    return os.getenv("SIMULADOR_CALENTAMIENTO", "1") != "0"
+
+
+def calentar_local(parametros: Dict[str, Tuple[Dict, Dict, Dict]]) -> None:
+    """
+    Ejecuta una simulación por modo en este proceso. Pensado para el
+    proceso padre antes del fork: los workers heredan (copy-on-write) los
+    módulos, cachés y código ya inicializados.
+    """
+    for paciente, ventilador, fisiologia in parametros.values():
+        resultado, _ = _ejecutar_simulacion(paciente, ventilador, fisiologia, {})
+        serializacion.a_binario(resultado)
+
+
+async def _peticion_interna(asgi: Callable, ruta: str, cuerpo: bytes) -> int:
+    """POST directo a la aplicación ASGI, sin red. El scope lleva
+    "calentamiento" para que el middleware no la registre en las métricas."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+        ],
+        "client": None,
+        "server": None,
+        "calentamiento": True,
+    }
+    pendientes = [{"type": "http.request", "body": cuerpo, "more_body": False}]
+    completa = asyncio.Event()
+    codigo = {}
+
+    async def receive():
+        if pendientes:
+            return pendientes.pop()
+        await completa.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            codigo["status"] = mensaje["status"]
+        elif not mensaje.get("more_body"):
+            completa.set()
+
+    await asgi(scope, receive, send)
+    return codigo.get("status", 0)
+
+
+async def calentar_rutas(
+    asgi: Callable, rutas: Sequence[str], estado: EstadoArranque
+) -> None:
+    """
+    FastAPI construye el manejador de cada ruta (y los validadores de su
+    cuerpo) en su primera petición. Se envía a cada ruta un cuerpo vacío,
+    que se rechaza con 422 sin simular ni tocar la caché.
+    """
+    inicio = time.perf_counter()
+    for ruta in rutas:
+        await _peticion_interna(asgi, ruta, b"{}")
+    estado.calentamiento["rutas"] = time.perf_counter() - inicio
+
+
+async def calentar(
+    servicio: SimulationService,
+    parametros: Dict[str, Tuple[Dict, Dict, Dict]],
+    estado: EstadoArranque,
+    modos: Sequence[str] = MODOS_CALENTAMIENTO,
+) -> None:
+    """
+    Calienta un worker: por cada modo, una simulación en cada worker del
+    ejecutor (que así arranca su pool) y la serialización de su resultado
+    en JSON y binario. No pasa por la caché, para no ocupar entradas ni
+    alterar sus estadísticas. Al terminar, el worker queda listo aunque
+    algún modo falle (el error se registra).
+    """
+    for modo in modos:
+        paciente, ventilador, fisiologia = parametros[modo]
+        inicio = time.perf_counter()
+        try:
+            resultados = await asyncio.gather(
+                *(
+                    servicio.ejecutor.ejecutar(
+                        _ejecutar_simulacion, paciente, ventilador, fisiologia, {}
+                    )
+                    for _ in range(servicio.ejecutor.max_workers)
+                )
+            )
+            resultado, _ = resultados[0]
+            json.dumps(
+                serializacion.a_json(resultado),
+                default=serializacion.a_nativo,
+                allow_nan=False,
+            )
+            serializacion.a_binario(resultado)
+        except Exception as e:
+            logger.error(f"Falló el calentamiento del modo {modo}: {e}")
+        estado.calentamiento[modo] = time.perf_counter() - inicio
+    estado.marcar_listo()
+
+
+estado_arranque = EstadoArranque()
@@ -0,0 +1,252 @@
+"""
+Caché de resultados - Las simulaciones son deterministas en sus parámetros
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cambiar esta versión cuando cambie el modelo invalida las entradas en disco
+VERSION_CACHE = "6"
+
+
+def _canonico(valor: Any) -> Any:
+    """Normaliza parámetros para que valores equivalentes den la misma clave."""
+    if isinstance(valor, dict):
+        return {str(k): _canonico(v) for k, v in sorted(valor.items())}
+    if isinstance(valor, (list, tuple)):
+        return [_canonico(v) for v in valor]
+    if isinstance(valor, bool) or valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, (int, float, np.number)):
+        return float(valor)
+    return str(valor)
+
+
+def clave_parametros(**parametros: Any) -> str:
+    """Hash SHA-256 de la representación canónica de los parámetros."""
+    texto = json.dumps(
+        {"version": VERSION_CACHE, **_canonico(parametros)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def tamano_aproximado(valor: Any) -> int:
+    """Estimación en bytes de la memoria ocupada por un resultado."""
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            sys.getsizeof(k) + tamano_aproximado(v) for k, v in valor.items()
+        )
+    if isinstance(valor, (list, tuple)):
+        if valor and isinstance(valor[0], float):
+            # Lista de floats: el contenedor más un objeto float por elemento
+            return sys.getsizeof(valor) + len(valor) * sys.getsizeof(0.0)
+        return sys.getsizeof(valor) + sum(tamano_aproximado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheResultados:
+    """
+    Caché LRU de resultados de simulación indexada por el hash de los
+    parámetros validados.
+
+    El nivel en memoria se acota por número de entradas y por bytes
+    aproximados; al superar cualquiera de los dos límites se desaloja la
+    entrada usada hace más tiempo. Opcionalmente, un nivel en disco guarda
+    cada resultado como un archivo pickle en `directorio`, de modo que la
+    caché sobrevive a reinicios del servidor; también se acota por número de
+    archivos, desalojando los de acceso más antiguo. El orden de acceso de
+    los archivos se lleva en memoria, como el del nivel en memoria: el
+    directorio solo se recorre al crear la caché.
+
+    Los valores almacenados se comparten entre peticiones y deben tratarse
+    como inmutables.
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+        directorio: Optional[str] = None,
+        max_entradas_disco: int = 10000,
+    ):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.max_entradas_disco = max_entradas_disco
+        self._entradas: "OrderedDict[str, tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._archivos: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            self._indexar_disco()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "CacheResultados":
+        """Configura la caché con SIMULADOR_CACHE_ENTRADAS, SIMULADOR_CACHE_MB
+        y SIMULADOR_CACHE_DIR (sin nivel en disco si no se define)."""
+        return cls(
+            max_entradas=int(os.getenv("SIMULADOR_CACHE_ENTRADAS", "256")),
+            max_bytes=int(float(os.getenv("SIMULADOR_CACHE_MB", "256")) * 1024**2),
+            directorio=os.getenv("SIMULADOR_CACHE_DIR") or None,
+        )
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.pkl")
+
+    def _indexar_disco(self) -> None:
+        """Ordena los archivos existentes por su último acceso (mtime)."""
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(".pkl"):
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.directorio, nombre)).st_mtime
+            except OSError:
+                continue
+            archivos.append((mtime, nombre[: -len(".pkl")]))
+        for _, clave in sorted(archivos):
+            self._archivos[clave] = None
+        self._podar_disco()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Devuelve el resultado almacenado o None si no está en caché."""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave][0]
+
+        valor = self._leer_disco(clave) if self.directorio else None
+        with self._lock:
+            if valor is None:
+                self.fallos += 1
+                return None
+            self.aciertos_disco += 1
+            self._insertar_memoria(clave, valor)
+        return valor
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        """Almacena un resultado en memoria y, si está configurado, en disco."""
+        with self._lock:
+            self._insertar_memoria(clave, valor)
+        if self.directorio:
+            self._escribir_disco(clave, valor)
+
+    def _insertar_memoria(self, clave: str, valor: Any) -> None:
+        tamano = tamano_aproximado(valor)
+        if tamano > self.max_bytes:
+            return
+        if clave in self._entradas:
+            self._bytes -= self._entradas.pop(clave)[1]
+        self._entradas[clave] = (valor, tamano)
+        self._bytes += tamano
+        while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+            _, (_, tamano_desalojado) = self._entradas.popitem(last=False)
+            self._bytes -= tamano_desalojado
+            self.desalojos += 1
+
+    def _leer_disco(self, clave: str) -> Optional[Any]:
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as archivo:
+                valor = pickle.load(archivo)
+            # Marca de acceso para reconstruir el orden LRU al reiniciar
+            os.utime(ruta)
+        except FileNotFoundError:
+            self._olvidar_archivo(clave)
+            return None
+        except Exception as e:
+            logger.warning(f"Entrada de caché ilegible, se descarta: {e}")
+            self._olvidar_archivo(clave)
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            # Puede haberla escrito otro proceso que comparte el directorio
+            self._archivos[clave] = None
+            self._archivos.move_to_end(clave)
+        return valor
+
+    def _olvidar_archivo(self, clave: str) -> None:
+        with self._lock:
+            self._archivos.pop(clave, None)
+
+    def _escribir_disco(self, clave: str, valor: Any) -> None:
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "wb") as archivo:
+                pickle.dump(valor, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)  # Escritura atómica
+        except OSError as e:
+            logger.warning(f"No se pudo escribir la caché en disco: {e}")
+            return
+        with self._lock:
+            self._archivos[clave] = None
+            self._archivos.move_to_end(clave)
+        self._podar_disco()
+
+    def _podar_disco(self) -> None:
+        """Borra los archivos de acceso más antiguo que exceden el límite."""
+        with self._lock:
+            exceso = len(self._archivos) - self.max_entradas_disco
+            desalojadas = [
+                self._archivos.popitem(last=False)[0] for _ in range(max(exceso, 0))
+            ]
+        for clave in desalojadas:
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                continue
+            with self._lock:
+                self.desalojos += 1
+
+    def limpiar(self) -> None:
+        """Vacía el nivel en memoria (el nivel en disco se conserva)."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Contadores para monitoreo."""
+        with self._lock:
+            consultas = self.aciertos + self.aciertos_disco + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entradas,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": (
+                    (self.aciertos + self.aciertos_disco) / consultas
+                    if consultas
+                    else 0.0
+                ),
+                "disco": self.directorio is not None,
+                "entradas_disco": len(self._archivos),
+            }
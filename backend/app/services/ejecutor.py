@@ -0,0 +1,248 @@
+"""
+Ejecutor de simulaciones - Saca el cálculo intensivo del bucle de eventos
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("procesos", "hilos", "local")
+
+
+class ServicioSaturadoError(RuntimeError):
+    """Se alcanzó el límite de simulaciones en curso más en cola."""
+
+
+class TiempoAgotadoError(TimeoutError):
+    """La simulación superó el tiempo máximo permitido."""
+
+
+def _entero_env(nombre: str, defecto: int) -> int:
+    """Lee un entero de una variable de entorno, con valor por defecto."""
+    valor = os.getenv(nombre)
+    return int(valor) if valor else defecto
+
+
+class Reserva:
+    """
+    Lugar en la capacidad del ejecutor para un trabajo cuyo estado vive en
+    este proceso (p. ej. un stream que calcula ciclo a ciclo): `ejecutar`
+    corre cada cálculo en un hilo del ejecutor, con su tiempo máximo. Al
+    liberarla, el lugar sigue ocupado hasta que termine el cálculo en curso.
+    """
+
+    def __init__(self, ejecutor: "EjecutorSimulaciones"):
+        self._ejecutor = ejecutor
+        self._futuro: Optional[Future] = None
+        self._liberada = False
+
+    async def ejecutar(
+        self,
+        funcion: Callable[..., Any],
+        *args: Any,
+        timeout_s: Optional[float] = None,
+    ) -> Any:
+        if self._liberada:
+            raise RuntimeError("La reserva ya fue liberada.")
+        if self._futuro is not None and not self._futuro.done():
+            # El estado es compartido: no se calcula en paralelo con un
+            # cálculo que superó su tiempo máximo
+            raise TiempoAgotadoError(
+                "El cálculo anterior superó el tiempo máximo y sigue en curso."
+            )
+        if self._ejecutor.backend == "local":
+            return funcion(*args)
+        self._futuro = self._ejecutor._obtener_pool_hilos().submit(funcion, *args)
+        return await self._ejecutor._esperar(self._futuro, timeout_s)
+
+    def liberar(self) -> None:
+        if self._liberada:
+            return
+        self._liberada = True
+        if self._futuro is None:
+            self._ejecutor._liberar()
+        else:
+            self._futuro.add_done_callback(self._ejecutor._liberar)
+
+
+class EjecutorSimulaciones:
+    """
+    Ejecuta funciones intensivas en CPU fuera del bucle de eventos de asyncio.
+
+    Backends disponibles:
+        - "procesos": ProcessPoolExecutor; escala con el número de núcleos.
+        - "hilos": ThreadPoolExecutor; libera el bucle pero comparte el GIL.
+        - "local": ejecuta en línea (útil para pruebas y depuración).
+
+    La cola es acotada: si ya hay `max_workers + max_pendientes` trabajos
+    admitidos, `ejecutar` rechaza el nuevo con ServicioSaturadoError en lugar
+    de encolarlo indefinidamente. Cada trabajo tiene un tiempo máximo; al
+    agotarse se lanza TiempoAgotadoError. Un trabajo aún en cola se cancela,
+    pero uno que ya corre en un proceso no puede interrumpirse: termina en
+    segundo plano y sigue ocupando su lugar hasta entonces, de modo que los
+    trabajos que ocupan el pool nunca superan la capacidad.
+
+    Los valores por defecto se leen de SIMULADOR_EJECUTOR,
+    SIMULADOR_MAX_WORKERS, SIMULADOR_MAX_PENDIENTES y SIMULADOR_TIMEOUT_S.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        max_pendientes: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+    ):
+        self.backend = backend or os.getenv("SIMULADOR_EJECUTOR", "procesos")
+        if self.backend not in BACKENDS:
+            raise ValueError(
+                f"Backend de ejecución inválido: {self.backend}. "
+                f"Debe ser uno de: {BACKENDS}"
+            )
+        self.max_workers = max_workers or _entero_env(
+            "SIMULADOR_MAX_WORKERS", os.cpu_count() or 1
+        )
+        self.max_pendientes = (
+            max_pendientes
+            if max_pendientes is not None
+            else _entero_env("SIMULADOR_MAX_PENDIENTES", 2 * self.max_workers)
+        )
+        self.timeout_s = timeout_s or float(os.getenv("SIMULADOR_TIMEOUT_S", "30"))
+        self._pool: Optional[Executor] = None
+        self._pool_hilos: Optional[ThreadPoolExecutor] = None
+        # Los lugares se liberan desde el hilo que completa cada futuro
+        self._en_curso = 0
+        self._bloqueo = threading.Lock()
+
+    @property
+    def capacidad(self) -> int:
+        """Número máximo de trabajos admitidos a la vez (en curso + en cola)."""
+        return self.max_workers + self.max_pendientes
+
+    @property
+    def en_curso(self) -> int:
+        """Trabajos admitidos que aún no han terminado (incluidos los que
+        superaron su tiempo máximo y siguen corriendo)."""
+        return self._en_curso
+
+    def _admitir(self) -> None:
+        with self._bloqueo:
+            if self._en_curso >= self.capacidad:
+                raise ServicioSaturadoError(
+                    f"Servidor saturado: {self._en_curso} simulaciones en curso "
+                    f"(máximo {self.capacidad}). Intente de nuevo en unos segundos."
+                )
+            self._en_curso += 1
+
+    def _liberar(self, _futuro: Optional[Future] = None) -> None:
+        with self._bloqueo:
+            self._en_curso -= 1
+
+    def _obtener_pool(self) -> Executor:
+        """Crea el pool de forma perezosa en el primer uso."""
+        if self._pool is None:
+            if self.backend == "procesos":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            logger.info(
+                f"Pool de simulación iniciado: backend={self.backend}, "
+                f"workers={self.max_workers}, pendientes={self.max_pendientes}"
+            )
+        return self._pool
+
+    def _obtener_pool_hilos(self) -> ThreadPoolExecutor:
+        """Hilos para los cálculos de las reservas; cada reserva ocupa un
+        lugar, así que nunca hay más de `capacidad` en uso."""
+        if self._pool_hilos is None:
+            self._pool_hilos = ThreadPoolExecutor(max_workers=self.capacidad)
+        return self._pool_hilos
+
+    def reservar(self) -> Reserva:
+        """
+        Ocupa un lugar hasta Reserva.liberar, para trabajos que no pueden
+        enviarse al pool (su estado no es serializable) pero deben respetar
+        la capacidad y el tiempo máximo. Lanza ServicioSaturadoError si no
+        hay lugar.
+        """
+        self._admitir()
+        return Reserva(self)
+
+    async def ejecutar_en_hilo(
+        self,
+        funcion: Callable[..., Any],
+        *args: Any,
+        timeout_s: Optional[float] = None,
+    ) -> Any:
+        """Como ejecutar, pero en un hilo de este proceso (ver reservar):
+        para cálculos que modifican estado local, como un ciclo de una
+        sesión."""
+        reserva = self.reservar()
+        try:
+            return await reserva.ejecutar(funcion, *args, timeout_s=timeout_s)
+        finally:
+            reserva.liberar()
+
+    async def ejecutar(
+        self,
+        funcion: Callable[..., Any],
+        *args: Any,
+        timeout_s: Optional[float] = None,
+    ) -> Any:
+        """
+        Ejecuta `funcion(*args)` en el backend configurado y espera su
+        resultado sin bloquear el bucle de eventos. Con el backend "procesos",
+        la función y sus argumentos deben poder serializarse con pickle.
+        """
+        self._admitir()
+        if self.backend == "local":
+            try:
+                return funcion(*args)
+            finally:
+                self._liberar()
+
+        try:
+            futuro = self._obtener_pool().submit(funcion, *args)
+        except BaseException:
+            self._liberar()
+            raise
+        # El lugar se libera cuando el trabajo termina de verdad, no cuando
+        # se deja de esperarlo
+        futuro.add_done_callback(self._liberar)
+        return await self._esperar(futuro, timeout_s)
+
+    async def _esperar(self, futuro: Future, timeout_s: Optional[float]) -> Any:
+        timeout = timeout_s or self.timeout_s
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout)
+        except asyncio.TimeoutError:
+            # Si aún estaba en cola se cancela (y libera su lugar)
+            futuro.cancel()
+            raise TiempoAgotadoError(
+                f"La simulación superó el tiempo máximo de {timeout} s"
+            ) from None
+        except BrokenProcessPool:
+            # Un worker murió (p. ej. por memoria): se recrea el pool
+            logger.error("Pool de procesos roto; se reiniciará.")
+            self.cerrar()
+            raise RuntimeError("El proceso de simulación terminó inesperadamente")
+
+    def cerrar(self) -> None:
+        """Libera los pools; los trabajos en cola se cancelan."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._pool_hilos is not None:
+            self._pool_hilos.shutdown(wait=False, cancel_futures=True)
+            self._pool_hilos = None
@@ -0,0 +1,211 @@
+"""
+Instrumentación - Tiempos por etapa (Server-Timing) e histogramas en el
+formato de texto de Prometheus
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# Límites superiores de los buckets de los histogramas
+BUCKETS_SEGUNDOS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+BUCKETS_CONTEO = (10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class Cronometro:
+    """
+    Tiempos por etapa y contadores de una simulación.
+
+    Las etapas se acumulan por nombre (en segundos) con `etapa`; los
+    contadores (p. ej. nfev, ciclos, puntos) con `contar`. Es serializable
+    con a_dict, de modo que un worker de otro proceso puede devolver sus
+    mediciones para combinarlas con las del proceso principal.
+    """
+
+    def __init__(self):
+        self.etapas: Dict[str, float] = {}
+        self.contadores: Dict[str, float] = {}
+        self.descripciones: Dict[str, str] = {}
+
+    @contextmanager
+    def etapa(self, nombre: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, time.perf_counter() - inicio)
+
+    def sumar(self, nombre: str, segundos: float) -> None:
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + segundos
+
+    def contar(self, nombre: str, valor: float) -> None:
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + valor
+
+    def describir(self, nombre: str, descripcion: str) -> None:
+        """Descripción de una etapa en Server-Timing (p. ej. acierto de caché)."""
+        self.descripciones[nombre] = descripcion
+
+    def total(self) -> float:
+        return sum(self.etapas.values())
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "etapas": dict(self.etapas),
+            "contadores": dict(self.contadores),
+            "descripciones": dict(self.descripciones),
+        }
+
+    def combinar(self, datos: Dict[str, Any]) -> None:
+        """Añade las mediciones de otro cronómetro (ver a_dict)."""
+        for nombre, segundos in datos.get("etapas", {}).items():
+            self.sumar(nombre, segundos)
+        for nombre, valor in datos.get("contadores", {}).items():
+            self.contar(nombre, valor)
+        self.descripciones.update(datos.get("descripciones", {}))
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing: una métrica por etapa (dur en
+        ms) y una por contador (valor en desc)."""
+        partes = []
+        for nombre, segundos in self.etapas.items():
+            parte = f"{nombre};dur={segundos * 1e3:.3f}"
+            if nombre in self.descripciones:
+                parte += f';desc="{self.descripciones[nombre]}"'
+            partes.append(parte)
+        for nombre, valor in self.contadores.items():
+            partes.append(f'{nombre};desc="{valor:g}"')
+        return ", ".join(partes)
+
+
+class _Histograma:
+    """Histograma acumulativo con buckets fijos, por combinación de
+    etiquetas."""
+
+    def __init__(self, nombre: str, ayuda: str, buckets: Sequence[float]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[Tuple[str, str], ...], list] = {}
+
+    def observar(self, valor: float, **etiquetas: str) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        serie = self.series.get(clave)
+        if serie is None:
+            # Conteos por bucket (+Inf al final), suma y número de muestras
+            serie = self.series[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exposicion(self) -> list:
+        lineas = [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} histogram",
+        ]
+        for clave, (conteos, suma, n) in sorted(self.series.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else f"{limite:g}"
+                etiquetas = _etiquetas(clave + (("le", le),))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(clave)} {suma:.9g}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(clave)} {n}")
+        return lineas
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(pares: Sequence[Tuple[str, str]]) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+class RegistroMetricas:
+    """
+    Agrega las mediciones del proceso en histogramas y contadores y los
+    expone en el formato de texto de Prometheus (versión 0.0.4).
+    """
+
+    TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.etapas = _Histograma(
+            "simulador_etapa_segundos",
+            "Duración de cada etapa de una simulación.",
+            BUCKETS_SEGUNDOS,
+        )
+        self.conteos = {
+            nombre: _Histograma(f"simulador_{nombre}", ayuda, BUCKETS_CONTEO)
+            for nombre, ayuda in (
+                ("nfev", "Evaluaciones del lado derecho de las EDO por simulación."),
+                ("ciclos", "Ciclos respiratorios integrados por simulación."),
+                ("puntos", "Muestras producidas por simulación."),
+            )
+        }
+        self.peticiones = _Histograma(
+            "simulador_peticion_segundos",
+            "Duración de las peticiones HTTP hasta enviar las cabeceras.",
+            BUCKETS_SEGUNDOS,
+        )
+        self.respuestas: Dict[Tuple[str, str, str], int] = {}
+
+    def observar(self, cronometro: Cronometro, modo: Optional[str] = None) -> None:
+        """Registra las etapas y contadores de una simulación."""
+        etiquetas = {"modo": modo} if modo else {}
+        with self._lock:
+            for nombre, segundos in cronometro.etapas.items():
+                self.etapas.observar(segundos, etapa=nombre, **etiquetas)
+            for nombre, valor in cronometro.contadores.items():
+                if nombre in self.conteos:
+                    self.conteos[nombre].observar(valor, **etiquetas)
+
+    def observar_peticion(
+        self, metodo: str, ruta: str, codigo: int, segundos: float
+    ) -> None:
+        with self._lock:
+            self.peticiones.observar(segundos, metodo=metodo, ruta=ruta)
+            clave = (metodo, ruta, str(codigo))
+            self.respuestas[clave] = self.respuestas.get(clave, 0) + 1
+
+    def exposicion(self, medidores: Optional[Dict[str, float]] = None) -> str:
+        """Texto para /metrics; `medidores` añade valores instantáneos
+        (gauges), p. ej. el estado de la caché."""
+        with self._lock:
+            lineas = self.etapas.exposicion()
+            for histograma in self.conteos.values():
+                lineas += histograma.exposicion()
+            lineas += self.peticiones.exposicion()
+            lineas += [
+                "# HELP simulador_respuestas_total Respuestas HTTP por ruta y código.",
+                "# TYPE simulador_respuestas_total counter",
+            ]
+            for (metodo, ruta, codigo), n in sorted(self.respuestas.items()):
+                etiquetas = _etiquetas(
+                    (("codigo", codigo), ("metodo", metodo), ("ruta", ruta))
+                )
+                lineas.append(f"simulador_respuestas_total{etiquetas} {n}")
+        for nombre, valor in (medidores or {}).items():
+            lineas += [f"# TYPE {nombre} gauge", f"{nombre} {valor:g}"]
+        return "\n".join(lineas) + "\n"
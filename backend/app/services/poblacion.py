@@ -0,0 +1,121 @@
+"""
+Población virtual - Muestreo de parámetros y resumen de distribuciones de
+resultados (bandas de percentiles de las señales e histogramas de las
+métricas)
+"""
+
+import zlib
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+TIPOS_DISTRIBUCION = ("normal", "lognormal", "uniforme")
+
+# Rondas de remuestreo de una distribución truncada antes de desistir
+_RONDAS_TRUNCAMIENTO = 100
+
+
+def generador(semilla: int, parametro: str) -> np.random.Generator:
+    """Generador propio de cada parámetro: con la misma semilla, las muestras
+    de un parámetro no dependen de qué otros parámetros se muestrean ni de
+    su orden."""
+    return np.random.default_rng([semilla, zlib.crc32(parametro.encode())])
+
+
+def _requerido(distribucion: Dict[str, Any], campo: str) -> float:
+    valor = distribucion.get(campo)
+    if valor is None:
+        raise ValueError(f"La distribución {distribucion['tipo']} requiere '{campo}'.")
+    return float(valor)
+
+
+def muestrear(
+    distribucion: Dict[str, Any], n: int, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    `n` muestras de una distribución:
+
+        normal     media, desvio
+        lognormal  mediana, desvio (del logaritmo)
+        uniforme   minimo, maximo
+
+    En normal y lognormal, "minimo" y "maximo" opcionales truncan la
+    distribución (las muestras fuera del intervalo se vuelven a sortear).
+    """
+    tipo = distribucion.get("tipo")
+    minimo, maximo = distribucion.get("minimo"), distribucion.get("maximo")
+    if tipo == "uniforme":
+        minimo = _requerido(distribucion, "minimo")
+        maximo = _requerido(distribucion, "maximo")
+        if maximo < minimo:
+            raise ValueError("En la distribución uniforme, minimo > maximo.")
+        return rng.uniform(minimo, maximo, n)
+    if tipo == "normal":
+        media = _requerido(distribucion, "media")
+        desvio = _requerido(distribucion, "desvio")
+
+        def sortear(k):
+            return rng.normal(media, desvio, k)
+
+    elif tipo == "lognormal":
+        mediana = _requerido(distribucion, "mediana")
+        desvio = _requerido(distribucion, "desvio")
+
+        def sortear(k):
+            return rng.lognormal(np.log(mediana), desvio, k)
+
+    else:
+        raise ValueError(
+            f"Distribución desconocida: {tipo}. Opciones: {TIPOS_DISTRIBUCION}"
+        )
+
+    valores = sortear(n)
+    for _ in range(_RONDAS_TRUNCAMIENTO):
+        fuera = (minimo is not None and valores < minimo) | (
+            maximo is not None and valores > maximo
+        )
+        if not np.any(fuera):
+            return valores
+        valores[fuera] = sortear(int(np.count_nonzero(fuera)))
+    raise ValueError(
+        f"El intervalo [{minimo}, {maximo}] tiene una probabilidad demasiado "
+        f"baja en la distribución {tipo}."
+    )
+
+
+def _numero(valor: float) -> Optional[float]:
+    return float(valor) if np.isfinite(valor) else None
+
+
+def resumir(
+    valores: np.ndarray, percentiles: Sequence[float], bins: int
+) -> Dict[str, Any]:
+    """Media, desvío, percentiles e histograma de los valores finitos; los
+    no finitos (p. ej. métricas indefinidas) se cuentan aparte."""
+    finitos = valores[np.isfinite(valores)]
+    resumen: Dict[str, Any] = {"no_finitos": int(len(valores) - len(finitos))}
+    if len(finitos) == 0:
+        return {
+            **resumen,
+            "media": None,
+            "desvio": None,
+            "percentiles": {f"p{p:g}": None for p in percentiles},
+            "histograma": None,
+        }
+    conteos, bordes = np.histogram(finitos, bins=bins)
+    return {
+        **resumen,
+        "media": _numero(finitos.mean()),
+        "desvio": _numero(finitos.std()),
+        "percentiles": {
+            f"p{p:g}": _numero(v)
+            for p, v in zip(percentiles, np.percentile(finitos, percentiles))
+        },
+        "histograma": {"bordes": bordes.tolist(), "conteos": conteos.tolist()},
+    }
+
+
+def bandas(ondas: np.ndarray, percentiles: Sequence[float]) -> Dict[str, list]:
+    """Percentiles muestra a muestra de señales con forma (muestras, K)."""
+    valores = np.percentile(ondas, percentiles, axis=0)
+    return {f"p{p:g}": fila.tolist() for p, fila in zip(percentiles, valores)}
@@ -0,0 +1,135 @@
+"""
+Sesiones interactivas - Simulación continua con cambios de parámetros en vivo
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.simulation_service import SimulationService
+
+
+class SesionSimulacion:
+    """
+    Simulación que avanza respiración a respiración conservando su estado.
+
+    Guarda los volúmenes V1/V2 al final del último ciclo, el tiempo de la
+    sesión, la PaCO2 estimada y el controlador respiratorio (con su término
+    integral), de modo que un cambio de parámetros no reinicia la
+    simulación: el siguiente ciclo parte del estado alcanzado con la nueva
+    configuración. Cada llamada a `avanzar` calcula solo un ciclo nuevo.
+    """
+
+    def __init__(
+        self,
+        servicio: SimulationService,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        pasos_por_ciclo: int = 200,
+    ):
+        self.servicio = servicio
+        self.pasos_por_ciclo = pasos_por_ciclo
+        self.V = np.zeros(2)
+        self.t = 0.0
+        self.paco2 = 55.0  # Misma condición inicial que simular_espontaneo
+        self.ciclos = 0
+        self._control = None
+        self._simulador = None
+        self.actualizar(paciente_params, ventilador_params, fisiologia_params)
+
+    def actualizar(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+    ) -> None:
+        """
+        Aplica una configuración completa desde el próximo ciclo. El estado
+        mecánico y el del controlador se conservan; solo cambian sus
+        ganancias. En modo espontáneo también se conserva la frecuencia que
+        fijó el controlador en el último ciclo. Lanza ValueError si la
+        configuración no es válida, en cuyo caso la sesión sigue con la
+        anterior.
+        """
+        simulador, intercambio, hemodinamica = self.servicio._crear_modelos(
+            paciente_params, ventilador_params, fisiologia_params, False
+        )
+        if simulador.control is not None:
+            if self._control is None:
+                self._control = simulador.control
+            else:
+                self._control.Gp = simulador.control.Gp
+                self._control.Gi = simulador.control.Gi
+                simulador.control = self._control
+            anterior = self._simulador
+            if anterior is not None and anterior.control is not None:
+                # El controlador integra su error con la duración del último
+                # ciclo, que es la de su frecuencia y no la configurada
+                simulador.ventilador.fr = anterior.ventilador.fr
+
+        self.paciente_params = paciente_params
+        self.ventilador_params = ventilador_params
+        self.fisiologia_params = fisiologia_params
+        self._simulador = simulador
+        self._intercambio = intercambio
+        self._hemodinamica = hemodinamica
+
+    def avanzar(self) -> Dict[str, Any]:
+        """
+        Simula el siguiente ciclo y devuelve un evento con sus series (en
+        tiempo de sesión, sin el punto final, que abre el ciclo siguiente) y
+        sus métricas.
+        """
+        simulador = self._simulador
+        if simulador.ventilador.modo == "ESPONTANEO":
+            t, v1, v2, self.paco2 = simulador.ciclo_espontaneo(
+                self.V, self.t, self.paco2, self.pasos_por_ciclo + 1
+            )
+        else:
+            # Un ciclo con punto final desde el estado actual; el tiempo es
+            # relativo al inicio del ciclo
+            ((t, v1, v2),) = simulador.iterar_ciclos(
+                1, self.pasos_por_ciclo + 1, V0=self.V
+            )
+            t = t + self.t
+
+        respuesta = self.servicio._resultados_ciclo(
+            t, v1, v2, simulador, self._intercambio, self._hemodinamica
+        )
+        respuesta["series_tiempo"] = {
+            nombre: serie[:-1] for nombre, serie in respuesta["series_tiempo"].items()
+        }
+
+        duracion = float(t[-1] - t[0])
+        self.V = np.array([v1[-1], v2[-1]])
+        self.t = float(t[-1])
+        self.ciclos += 1
+        return {
+            "tipo": "ciclo",
+            "ciclo": self.ciclos,
+            "t_sesion": self.t,
+            "duracion": duracion,
+            **respuesta,
+        }
+
+
+class RegistroSesiones:
+    """Limita el número de sesiones simultáneas del proceso."""
+
+    def __init__(self, max_sesiones: int):
+        self.max_sesiones = max_sesiones
+        self.activas = 0
+
+    def abrir(self) -> bool:
+        """Reserva un lugar; False si ya se alcanzó el máximo."""
+        if self.activas >= self.max_sesiones:
+            return False
+        self.activas += 1
+        return True
+
+    def cerrar(self) -> None:
+        self.activas = max(self.activas - 1, 0)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {"activas": self.activas, "max_sesiones": self.max_sesiones}
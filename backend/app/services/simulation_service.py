@@ -2,117 +2,1098 @@
 Servicio de simulación - Lógica de negocio separada de endpoints
 """
 
+import asyncio
+import itertools
 import logging
+import time
 import numpy as np
-from typing import Dict, Any, Tuple
+from typing import Callable, Dict, Any, Iterator, List, Optional, Sequence, Tuple
 
 # Clases de simulación
 from models.paciente import Paciente
 from models.ventilador import Ventilador
 from models.simulador import Simulador
+from models.simulador_lote import SimuladorLote
 from models.intercambio import IntercambioGases
 from models.hemodinamica import InteraccionCorazonPulmon
 from models.control import ControlRespiratorio
+from models.estado import EstadoSimulacion
+from models.estimacion import estimar_mecanica
+from models.escenario import simular_escenario
+
+from app.services import poblacion
+from app.services.cache import CacheResultados, clave_parametros
+from app.services.ejecutor import EjecutorSimulaciones
+from app.services.metricas import Cronometro
+from app.utils.decimacion import indices_min_max
 
 logger = logging.getLogger(__name__)
 
+# Configuraciones simuladas a la vez en un barrido; acota la memoria de los
+# arreglos (lote, tiempo) de SimuladorLote
+_TAMANO_SUBLOTE = 512
+
+# Muestras por ciclo de SimuladorLote (su valor por defecto). El último
+# ciclo, sobre el que se miden las métricas, incluye su punto final: su malla
+# tiene _PASOS_POR_CICLO_LOTE - 1 intervalos
+_PASOS_POR_CICLO_LOTE = 200
+
+# Filas por tarea del ejecutor en una población: acota la duración de cada
+# tarea (frente a SIMULADOR_TIMEOUT_S) y la memoria de sus resultados
+_FILAS_POR_TAREA = 2048
+
+# Instancia usada dentro de los workers del ejecutor (una por proceso)
+_servicio_worker: Optional["SimulationService"] = None
+
+
+def _servicio() -> "SimulationService":
+    """Servicio del worker actual, sin caché (vive en el proceso principal)."""
+    global _servicio_worker
+    if _servicio_worker is None:
+        _servicio_worker = SimulationService(
+            EjecutorSimulaciones(backend="local"), CacheResultados(max_entradas=0)
+        )
+    return _servicio_worker
+
+
+def _ejecutar_simulacion(
+    paciente_params: Dict[str, Any],
+    ventilador_params: Dict[str, Any],
+    fisiologia_params: Dict[str, Any],
+    opciones: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Punto de entrada de los workers: ejecuta la simulación de forma síncrona.
+
+    La caché vive en el proceso principal, por lo que el worker siempre
+    calcula. Devuelve el resultado y las mediciones de sus etapas
+    (Cronometro.a_dict)."""
+    cronometro = Cronometro()
+    resultado = _servicio()._calcular(
+        paciente_params,
+        ventilador_params,
+        fisiologia_params,
+        cronometro=cronometro,
+        **opciones,
+    )
+    return resultado, cronometro.a_dict()
+
+
+def _ejecutar_lote(
+    filas: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+    estado_estacionario: bool,
+    ondas: bool = False,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Punto de entrada de los workers para un bloque de un barrido."""
+    return _servicio()._calcular_lote(filas, estado_estacionario, ondas)
+
+
+def _ejecutar_escenario(
+    configuraciones: List[Tuple[float, Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+    duracion_s: float,
+    max_points: Optional[int],
+) -> Dict[str, Any]:
+    """Punto de entrada de los workers para un escenario."""
+    return _servicio()._calcular_escenario(configuraciones, duracion_s, max_points)
+
 
 class SimulationService:
     """Servicio para ejecutar simulaciones de fisiología pulmonar"""
 
-    def __init__(self):
-        """Inicializa el servicio de simulación"""
+    def __init__(
+        self,
+        ejecutor: Optional[EjecutorSimulaciones] = None,
+        cache: Optional[CacheResultados] = None,
+    ):
+        """
+        Inicializa el servicio de simulación
+
+        Args:
+            ejecutor: Backend para run_simulation_async. Por defecto se
+                configura desde variables de entorno (ver EjecutorSimulaciones).
+            cache: Caché de resultados. Por defecto se configura desde
+                variables de entorno (ver CacheResultados.desde_entorno).
+        """
         self.logger = logging.getLogger(__name__)
+        self.ejecutor = ejecutor or EjecutorSimulaciones()
+        self.cache = cache if cache is not None else CacheResultados.desde_entorno()
+
+    async def run_simulation_async(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        cronometro: Optional[Cronometro] = None,
+        **opciones: Any,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta run_simulation en el ejecutor configurado sin bloquear el
+        bucle de eventos.
+
+        Si se pasa un `cronometro`, recibe los tiempos de cada etapa
+        (incluidas las del worker), "cola" (espera en el ejecutor y
+        transferencia del resultado) y los contadores nfev, ciclos y puntos.
+
+        Raises:
+            ServicioSaturadoError: si la cola de simulaciones está llena
+            TiempoAgotadoError: si la simulación supera el tiempo máximo
+        """
+        cronometro = cronometro if cronometro is not None else Cronometro()
+        clave = self._clave_cache(
+            paciente_params, ventilador_params, fisiologia_params, opciones
+        )
+        with cronometro.etapa("cache"):
+            resultado = self.cache.obtener(clave)
+        if resultado is not None:
+            cronometro.describir("cache", "acierto")
+            return resultado
+        cronometro.describir("cache", "fallo")
+
+        inicio = time.perf_counter()
+        resultado, mediciones = await self.ejecutor.ejecutar(
+            _ejecutar_simulacion,
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            opciones,
+        )
+        espera = time.perf_counter() - inicio
+        cronometro.combinar(mediciones)
+        cronometro.sumar("cola", max(espera - sum(mediciones["etapas"].values()), 0.0))
+        self.cache.guardar(clave, resultado)
+        return resultado
+
+    async def run_sweep_async(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        ejes: Sequence[Tuple[str, Sequence[float]]],
+        estado_estacionario: bool = False,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Barrido de parámetros: simula el producto cartesiano de los valores
+        de cada eje sobre la configuración base y devuelve solo las métricas,
+        agrupadas como en run_simulation y cada una como un arreglo con la
+        forma de la rejilla.
+
+        Las configuraciones se reparten en bloques, uno por worker del
+        ejecutor; cada bloque avanza todas sus filas a la vez con
+        SimuladorLote. Solo admite los modos PCV y VCV.
+
+        Args:
+            ejes: Pares (parámetro, valores); el parámetro es cualquier campo
+                de paciente, ventilador o fisiología
+            estado_estacionario: Medir sobre el régimen periódico en lugar
+                de los 30 s desde volúmenes nulos
+        """
+        grupos = {
+            "paciente": paciente_params,
+            "ventilador": ventilador_params,
+            "fisiologia": fisiologia_params,
+        }
+        ubicacion = {
+            campo: grupo for grupo, params in grupos.items() for campo in params
+        }
+        for parametro, _ in ejes:
+            if parametro not in ubicacion:
+                raise ValueError(f"Parámetro de barrido desconocido: {parametro}")
+        if ventilador_params["modo"] not in ("PCV", "VCV"):
+            raise ValueError("El barrido solo admite los modos PCV y VCV.")
+
+        filas = []
+        for combinacion in itertools.product(*(valores for _, valores in ejes)):
+            fila = {grupo: dict(params) for grupo, params in grupos.items()}
+            for (parametro, _), valor in zip(ejes, combinacion):
+                fila[ubicacion[parametro]][parametro] = valor
+            filas.append((fila["paciente"], fila["ventilador"], fila["fisiologia"]))
+
+        forma = tuple(len(valores) for _, valores in ejes)
+        metricas = await self._ejecutar_filas(filas, estado_estacionario)
+        return {
+            grupo: {nombre: valor.reshape(forma) for nombre, valor in valores.items()}
+            for grupo, valores in metricas.items()
+        }
+
+    async def run_sensitivity_async(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        parametros: Sequence[str],
+        paso_relativo: float = 1e-4,
+        estado_estacionario: bool = True,
+        es_valido: Optional[Callable[[str, float], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Sensibilidad local: derivadas de cada métrica respecto a cada
+        parámetro (jacobiano) por diferencias finitas centradas.
+
+        La configuración base y las perturbadas (dos por parámetro) se
+        simulan juntas como un solo lote, igual que un barrido; las filas
+        que solo cambian parámetros de fisiología comparten la simulación
+        mecánica de la base, así que su costo es solo el de los modelos de
+        gases y hemodinámica. Solo admite los modos PCV y VCV.
+
+        El paso es relativo al valor (`paso_relativo`, o absoluto si el valor
+        es 0), salvo para Ti y fr: las métricas se calculan sobre la malla de
+        tiempos del último ciclo, de pasos fijos, y el paso de Ti es una muestra y
+        el de fr el que desplaza el fin de la inspiración exactamente una
+        muestra, de modo que ambas perturbaciones conservan la posición del
+        cambio de fase dentro de la malla. Si un extremo no es válido según
+        `es_valido(parametro, valor)`, la diferencia es hacia un lado.
+
+        Returns:
+            Dict con "parametros" (valor, extremos y esquema de cada uno),
+            "metricas" (valores en la base), "jacobiano" (por métrica, un
+            arreglo con la derivada respecto a cada parámetro),
+            "elasticidades" (∂m/∂p · p/m; NaN si m o p es 0) y
+            "simulaciones" (configuraciones mecánicas simuladas)
+        """
+        grupos = {
+            "paciente": paciente_params,
+            "ventilador": ventilador_params,
+            "fisiologia": fisiologia_params,
+        }
+        ubicacion = {
+            campo: grupo for grupo, params in grupos.items() for campo in params
+        }
+        for parametro in parametros:
+            if parametro not in ubicacion or isinstance(
+                grupos[ubicacion[parametro]][parametro], str
+            ):
+                raise ValueError(f"Parámetro de sensibilidad inválido: {parametro}")
+        if ventilador_params["modo"] not in ("PCV", "VCV"):
+            raise ValueError(
+                "El análisis de sensibilidad solo admite los modos PCV y VCV."
+            )
+
+        filas = [(paciente_params, ventilador_params, fisiologia_params)]
+        puntos = []
+        for parametro in parametros:
+            valor = float(grupos[ubicacion[parametro]][parametro])
+            paso = self._paso_sensibilidad(
+                parametro, valor, ventilador_params, paso_relativo
+            )
+            extremos = []
+            for extremo in (valor - paso, valor + paso):
+                if es_valido is not None and not es_valido(parametro, extremo):
+                    extremos.append((valor, 0))
+                    continue
+                fila = {grupo: dict(params) for grupo, params in grupos.items()}
+                fila[ubicacion[parametro]][parametro] = extremo
+                filas.append((fila["paciente"], fila["ventilador"], fila["fisiologia"]))
+                extremos.append((extremo, len(filas) - 1))
+            if extremos[0][1] == extremos[1][1]:
+                raise ValueError(
+                    f"No se puede perturbar {parametro} dentro de su rango válido"
+                )
+            puntos.append((parametro, valor, *extremos))
+
+        metricas = await self._ejecutar_filas(filas, estado_estacionario)
+
+        valores_base = np.array([valor for _, valor, _, _ in puntos])
+        base, jacobiano, elasticidades = {}, {}, {}
+        for grupo, valores in metricas.items():
+            base[grupo], jacobiano[grupo], elasticidades[grupo] = {}, {}, {}
+            for nombre, columna in valores.items():
+                derivadas = np.array(
+                    [
+                        (columna[i_mas] - columna[i_menos]) / (mas - menos)
+                        for _, _, (menos, i_menos), (mas, i_mas) in puntos
+                    ]
+                )
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    escala = np.where(
+                        (valores_base != 0) & (columna[0] != 0),
+                        valores_base / columna[0],
+                        np.nan,
+                    )
+                base[grupo][nombre] = float(columna[0])
+                jacobiano[grupo][nombre] = derivadas
+                elasticidades[grupo][nombre] = derivadas * escala
+
+        esquemas = {(True, True): "central", (False, True): "adelante"}
+        return {
+            "parametros": [
+                {
+                    "parametro": parametro,
+                    "valor": valor,
+                    "extremos": [menos, mas],
+                    "esquema": esquemas.get((i_menos > 0, i_mas > 0), "atras"),
+                }
+                for parametro, valor, (menos, i_menos), (mas, i_mas) in puntos
+            ],
+            "metricas": base,
+            "jacobiano": jacobiano,
+            "elasticidades": elasticidades,
+            "simulaciones": len(
+                {
+                    self._clave_mecanica(paciente, ventilador)
+                    for paciente, ventilador, _ in filas
+                }
+            ),
+        }
+
+    @staticmethod
+    def _paso_sensibilidad(
+        parametro: str,
+        valor: float,
+        ventilador_params: Dict[str, Any],
+        paso_relativo: float,
+    ) -> float:
+        """Paso de la diferencia finita de un parámetro (ver
+        run_sensitivity_async)."""
+        intervalos = _PASOS_POR_CICLO_LOTE - 1
+        if parametro == "Ti":
+            return 60.0 / ventilador_params["fr"] / intervalos
+        if parametro == "fr":
+            return 60.0 / (ventilador_params["Ti"] * intervalos)
+        return paso_relativo * (abs(valor) if valor else 1.0)
+
+    async def _ejecutar_filas(
+        self,
+        filas: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+        estado_estacionario: bool,
+        ondas: bool = False,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """Métricas de cada fila (un arreglo por métrica). Las filas se
+        reparten en bloques, uno por worker del ejecutor."""
+        n_bloques = min(self.ejecutor.max_workers, len(filas))
+        limites = np.linspace(0, len(filas), n_bloques + 1).astype(int)
+        tareas = [
+            asyncio.ensure_future(
+                self.ejecutor.ejecutar(
+                    _ejecutar_lote, filas[inicio:fin], estado_estacionario, ondas
+                )
+            )
+            for inicio, fin in zip(limites[:-1], limites[1:])
+        ]
+        try:
+            bloques = await asyncio.gather(*tareas)
+        except BaseException:
+            # Si un bloque falla (p. ej. ServicioSaturadoError) se cancelan
+            # los demás en lugar de dejarlos ocupando el ejecutor
+            for tarea in tareas:
+                tarea.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+            raise
+        return {
+            grupo: {
+                metrica: np.concatenate([b[grupo][metrica] for b in bloques])
+                for metrica in metricas
+            }
+            for grupo, metricas in bloques[0].items()
+        }
+
+    def _calcular_lote(
+        self,
+        filas: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+        estado_estacionario: bool,
+        ondas: bool = False,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """Métricas de un bloque de configuraciones PCV/VCV, una por fila. Las
+        filas se simulan en sublotes para acotar la memoria. Con `ondas` se
+        añade el grupo "ondas": P_aw, flow y Vt del último ciclo de cada
+        fila, forma (filas, _PASOS_POR_CICLO_LOTE), en float32."""
+        sublotes = [
+            self._calcular_sublote(
+                filas[i : i + _TAMANO_SUBLOTE], estado_estacionario, ondas
+            )
+            for i in range(0, len(filas), _TAMANO_SUBLOTE)
+        ]
+        return {
+            grupo: {
+                metrica: np.concatenate([s[grupo][metrica] for s in sublotes])
+                for metrica in metricas
+            }
+            for grupo, metricas in sublotes[0].items()
+        }
+
+    def _calcular_sublote(
+        self,
+        filas: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+        estado_estacionario: bool,
+        ondas: bool = False,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        modelos = [
+            self._crear_modelos(paciente, ventilador, fisiologia, False)
+            for paciente, ventilador, fisiologia in filas
+        ]
+        # Las filas que solo difieren en fisiología comparten la simulación
+        # mecánica: se simula una vez cada combinación paciente-ventilador
+        unicas: Dict[str, int] = {}
+        mecanica_de_fila = np.array(
+            [
+                unicas.setdefault(
+                    self._clave_mecanica(paciente, ventilador), len(unicas)
+                )
+                for paciente, ventilador, _ in filas
+            ]
+        )
+        representantes = np.unique(mecanica_de_fila, return_index=True)[1]
+        lote = SimuladorLote.desde_modelos(
+            [modelos[i][0].paciente for i in representantes],
+            [modelos[i][0].ventilador for i in representantes],
+        )
+        if estado_estacionario:
+            t, V1, V2 = lote.simular_estado_estacionario(ciclos=2)
+        else:
+            t, V1, V2 = lote.simular(tiempo_total_deseado=30.0)
+        mecanica = lote.procesar_resultados(t, V1, V2)
+
+        gases, hemo = [], []
+        for fila_modelos, (simulador, intercambio, hemodinamica) in enumerate(modelos):
+            fila = mecanica_de_fila[fila_modelos]
+            n = mecanica["n_muestras"][fila]
+            resultados_fila = {
+                clave: mecanica[clave][fila, :n] for clave in ("t", "flow", "P_aw")
+            }
+            resultados_fila["auto_peep"] = mecanica["auto_peep"][fila]
+            # Los modelos de gases y hemodinámica solo leen la última
+            # respiración
+            resultados_fila["por_ciclo"] = {
+                metrica: valores[fila, None]
+                for metrica, valores in mecanica["ultimo_ciclo"].items()
+            }
+            gases_fila, hemo_fila = self._calcular_fisiologia(
+                resultados_fila, simulador, intercambio, hemodinamica
+            )
+            gases.append(gases_fila)
+            hemo.append(hemo_fila)
+
+        def columnas(filas_metricas):
+            return {
+                metrica: np.array([f[metrica] for f in filas_metricas], dtype=float)
+                for metrica in filas_metricas[0]
+            }
+
+        resultado = {
+            "metricas_mecanicas": {
+                "volumen_tidal_entregado": mecanica["volumen_tidal"][mecanica_de_fila],
+                "presion_pico": mecanica["presion_pico"][mecanica_de_fila],
+                "auto_peep": mecanica["auto_peep"][mecanica_de_fila],
+            },
+            "metricas_gases": columnas(gases),
+            "metricas_hemodinamicas": columnas(hemo),
+        }
+        if ondas:
+            # El último ciclo ocupa las últimas muestras de cada fila; todas
+            # las filas comparten la malla relativa linspace(0, T, K)
+            K = _PASOS_POR_CICLO_LOTE
+            indices = mecanica["n_muestras"][:, None] - K + np.arange(K)
+            resultado["ondas"] = {
+                clave: np.take_along_axis(mecanica[clave], indices, axis=1)[
+                    mecanica_de_fila
+                ].astype(np.float32)
+                for clave in ("P_aw", "flow", "Vt")
+            }
+        return resultado
+
+    @staticmethod
+    def _clave_mecanica(
+        paciente_params: Dict[str, Any], ventilador_params: Dict[str, Any]
+    ) -> str:
+        """Identifica los parámetros que determinan la simulación mecánica
+        (FiO2 solo interviene en el intercambio de gases)."""
+        ventilador = {k: v for k, v in ventilador_params.items() if k != "FiO2"}
+        return clave_parametros(paciente=paciente_params, ventilador=ventilador)
+
+    @staticmethod
+    def _clave_cache(
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        opciones: Dict[str, Any],
+    ) -> str:
+        """Clave de caché: las opciones con valor por defecto no la alteran."""
+        opciones = {
+            "estado_estacionario": False,
+            "max_points": None,
+            "estado": None,
+            "precision": "float64",
+            **opciones,
+        }
+        return clave_parametros(
+            paciente=paciente_params,
+            ventilador=ventilador_params,
+            fisiologia=fisiologia_params,
+            opciones=opciones,
+        )
+
+    async def run_population_async(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        distribuciones: Dict[str, Dict[str, Any]],
+        muestras: int,
+        semilla: int = 0,
+        percentiles: Sequence[float] = (5, 25, 50, 75, 95),
+        bins: int = 30,
+        estado_estacionario: bool = True,
+        es_valido: Optional[Callable[[str, float], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Población virtual (Monte Carlo): simula `muestras` pacientes cuyos
+        parámetros se sortean de `distribuciones` (ver poblacion.muestrear)
+        sobre la configuración base, y devuelve solo resúmenes: bandas de
+        percentiles de P_aw, flujo y volumen a lo largo del último ciclo e
+        histogramas y percentiles de cada métrica y de cada parámetro
+        sorteado. Solo admite los modos PCV y VCV.
+
+        Las filas se simulan igual que un barrido (SimuladorLote en bloques,
+        uno por worker del ejecutor), en tandas de a lo sumo
+        _FILAS_POR_TAREA filas por worker. De cada fila solo se conservan
+        sus métricas y su último ciclo en float32, de modo que 10 000
+        pacientes ocupan unas decenas de MB.
+
+        Las restricciones de cada parámetro son intervalos, así que basta
+        comprobar con `es_valido(parametro, valor)` la menor y la mayor
+        muestra.
+        """
+        grupos = {
+            "paciente": paciente_params,
+            "ventilador": ventilador_params,
+            "fisiologia": fisiologia_params,
+        }
+        ubicacion = {
+            campo: grupo for grupo, params in grupos.items() for campo in params
+        }
+        for parametro in distribuciones:
+            if parametro not in ubicacion or isinstance(
+                grupos[ubicacion[parametro]][parametro], str
+            ):
+                raise ValueError(f"Parámetro de población inválido: {parametro}")
+        if ventilador_params["modo"] not in ("PCV", "VCV"):
+            raise ValueError("La población solo admite los modos PCV y VCV.")
+
+        sorteos = {
+            parametro: poblacion.muestrear(
+                distribucion, muestras, poblacion.generador(semilla, parametro)
+            )
+            for parametro, distribucion in distribuciones.items()
+        }
+        for parametro, valores in sorteos.items():
+            for extremo in (valores.min(), valores.max()):
+                if es_valido is not None and not es_valido(parametro, float(extremo)):
+                    raise ValueError(
+                        f"Hay muestras de {parametro} fuera de su rango válido "
+                        f"({extremo:g}); acote la distribución con 'minimo' y "
+                        f"'maximo'."
+                    )
+
+        def fila(i: int):
+            valores = {grupo: dict(params) for grupo, params in grupos.items()}
+            for parametro, muestra in sorteos.items():
+                valores[ubicacion[parametro]][parametro] = float(muestra[i])
+            return valores["paciente"], valores["ventilador"], valores["fisiologia"]
+
+        tandas = []
+        por_tanda = self.ejecutor.max_workers * _FILAS_POR_TAREA
+        for inicio in range(0, muestras, por_tanda):
+            filas = [fila(i) for i in range(inicio, min(inicio + por_tanda, muestras))]
+            tandas.append(
+                await self._ejecutar_filas(filas, estado_estacionario, ondas=True)
+            )
+        resultados = {
+            grupo: {
+                nombre: np.concatenate([t[grupo][nombre] for t in tandas])
+                for nombre in valores
+            }
+            for grupo, valores in tandas[0].items()
+        }
+
+        ondas = resultados.pop("ondas")
+        fase = np.linspace(0.0, 1.0, _PASOS_POR_CICLO_LOTE)
+        return {
+            "muestras": muestras,
+            "semilla": semilla,
+            "ondas": {
+                "fase": fase.tolist(),
+                # Con fr fija, el tiempo del ciclo; si no, solo la fase
+                "t": (
+                    None
+                    if "fr" in sorteos
+                    else (fase * 60.0 / ventilador_params["fr"]).tolist()
+                ),
+                **{
+                    nombre: poblacion.bandas(valores, percentiles)
+                    for nombre, valores in ondas.items()
+                },
+            },
+            "metricas": {
+                grupo: {
+                    nombre: poblacion.resumir(valores, percentiles, bins)
+                    for nombre, valores in metricas.items()
+                }
+                for grupo, metricas in resultados.items()
+            },
+            "parametros": {
+                parametro: poblacion.resumir(valores, percentiles, bins)
+                for parametro, valores in sorteos.items()
+            },
+        }
+
+    async def run_estimation_async(
+        self,
+        t: Sequence[float],
+        presion: Sequence[float],
+        flujo: Optional[Sequence[float]] = None,
+        volumen: Optional[Sequence[float]] = None,
+        nivel_confianza: float = 0.95,
+    ) -> Dict[str, Any]:
+        """
+        Estima R1, C1, R2 y C2 a partir de señales registradas (ver
+        models.estimacion.estimar_mecanica). Se ejecuta en el ejecutor, con
+        sus límites de concurrencia y tiempo; no usa la caché.
+        """
+        return await self.ejecutor.ejecutar(
+            estimar_mecanica,
+            np.asarray(t, dtype=float),
+            np.asarray(presion, dtype=float),
+            None if flujo is None else np.asarray(flujo, dtype=float),
+            None if volumen is None else np.asarray(volumen, dtype=float),
+            nivel_confianza,
+        )
+
+    async def run_scenario_async(
+        self,
+        configuraciones: Sequence[
+            Tuple[float, Dict[str, Any], Dict[str, Any], Dict[str, Any]]
+        ],
+        duracion_s: float,
+        max_points: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta un escenario (ver _calcular_escenario) en el ejecutor. El
+        resultado es determinista y se guarda en la caché.
+        """
+        clave = clave_parametros(
+            escenario=list(configuraciones),
+            duracion_s=duracion_s,
+            max_points=max_points,
+        )
+        resultado = self.cache.obtener(clave)
+        if resultado is not None:
+            return resultado
+        resultado = await self.ejecutor.ejecutar(
+            _ejecutar_escenario, list(configuraciones), duracion_s, max_points
+        )
+        self.cache.guardar(clave, resultado)
+        return resultado
+
+    def _calcular_escenario(
+        self,
+        configuraciones: Sequence[
+            Tuple[float, Dict[str, Any], Dict[str, Any], Dict[str, Any]]
+        ],
+        duracion_s: float,
+        max_points: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Simula un protocolo en una sola pasada continua.
+
+        `configuraciones` es una lista de (inicio_s, paciente, ventilador,
+        fisiología) con parámetros completos, ordenada por inicio_s; la
+        primera empieza en 0. Cada configuración rige desde el primer
+        límite de ciclo en su inicio_s o después y hasta el de la
+        siguiente (ver models.escenario.simular_escenario): el estado
+        mecánico, la PaCO2 y el controlador se conservan a través de los
+        cambios.
+
+        Devuelve las series de todo el escenario (decimadas a max_points si
+        se indica), un resumen por segmento con sus tiempos efectivos,
+        número de ciclos y métricas mecánicas, de gases y hemodinámicas, y
+        el "estado_final" desde el que continuar.
+        """
+        modelos = [
+            self._crear_modelos(paciente, ventilador, fisiologia, False)
+            for _, paciente, ventilador, fisiologia in configuraciones
+        ]
+        fines = [inicio for inicio, *_ in configuraciones[1:]] + [duracion_s]
+        registro = simular_escenario(
+            [(simulador, fin) for (simulador, _, _), fin in zip(modelos, fines)]
+        )
+        t, V1, V2 = registro["t"], registro["V1"], registro["V2"]
+        limites, inicios = registro["limites"], registro["inicios"]
+
+        series, segmentos = [], []
+        for i, (simulador, intercambio_gases, hemodinamica) in enumerate(modelos):
+            a, b = limites[i], limites[i + 1]
+            propios = inicios[(inicios >= a) & (inicios < b)]
+            # Un segmento termina donde empieza el siguiente (el último, en
+            # su última muestra); uno sin ciclos no tiene tiempos efectivos
+            segmento = {
+                "inicio_programado_s": configuraciones[i][0],
+                "inicio_s": float(t[a]) if b > a else None,
+                "fin_s": float(t[min(b, len(t) - 1)]) if b > a else None,
+                "ciclos": len(propios),
+            }
+            if b > a:
+                resultados_mecanica = simulador.procesar_resultados(
+                    t[a:b], V1[a:b], V2[a:b], inicios_ciclo=propios - a
+                )
+                respuesta = self._prepare_final_response(
+                    resultados_mecanica,
+                    *self._calcular_fisiologia(
+                        resultados_mecanica,
+                        simulador,
+                        intercambio_gases,
+                        hemodinamica,
+                    ),
+                )
+                series.append(respuesta.pop("series_tiempo"))
+                segmento.update(respuesta)
+            segmentos.append(segmento)
+
+        series_tiempo = {
+            nombre: np.concatenate([s[nombre] for s in series]) for nombre in series[0]
+        }
+        if max_points:
+            series_tiempo = self._decimar_series(series_tiempo, max_points)
+        return {
+            "series_tiempo": series_tiempo,
+            "segmentos": segmentos,
+            "estado_final": registro["estado_final"].a_dict(),
+        }
+
+    def cerrar(self) -> None:
+        """Libera los recursos del ejecutor"""
+        self.ejecutor.cerrar()
 
     def run_simulation(
         self,
         paciente_params: Dict[str, Any],
         ventilador_params: Dict[str, Any],
         fisiologia_params: Dict[str, Any],
+        estado_estacionario: bool = False,
+        max_points: Optional[int] = None,
+        estado: Optional[Dict[str, Any]] = None,
+        cronometro: Optional[Cronometro] = None,
+        precision: str = "float64",
     ) -> Dict[str, Any]:
         """
         Ejecuta una simulación cardiorrespiratoria integral.
 
+        La simulación es determinista en sus parámetros: si el mismo conjunto
+        ya se calculó, se devuelve el resultado almacenado en la caché.
+
         Args:
             paciente_params: Parámetros del paciente
             ventilador_params: Parámetros del ventilador
             fisiologia_params: Parámetros fisiológicos avanzados
+            estado_estacionario: En PCV/VCV, resolver directamente el régimen
+                periódico y devolver solo dos ciclos en lugar de 30 s
+            max_points: Número máximo de muestras en series_tiempo; las
+                métricas se calculan siempre a resolución completa
+            estado: Instantánea (EstadoSimulacion.a_dict) desde la que
+                continuar; típicamente el "estado_final" de una respuesta
+                anterior. El coste depende solo del tiempo nuevo simulado
+            cronometro: Recibe el tiempo de cada etapa y los contadores
+                nfev, ciclos y puntos (ver app.services.metricas)
+            precision: Tipo de las series, "float64" o "float32" (la mitad
+                de memoria en el worker, en la transferencia y en la caché;
+                las métricas se calculan sobre las series de ese tipo)
 
         Returns:
-            Dict con los resultados de la simulación
+            Dict con los resultados de la simulación, incluido
+            "estado_final" para continuarla
         """
+        opciones = {
+            "estado_estacionario": estado_estacionario,
+            "max_points": max_points,
+            "estado": estado,
+            "precision": precision,
+        }
+        cronometro = cronometro if cronometro is not None else Cronometro()
+        clave = self._clave_cache(
+            paciente_params, ventilador_params, fisiologia_params, opciones
+        )
+        with cronometro.etapa("cache"):
+            resultado = self.cache.obtener(clave)
+        if resultado is not None:
+            cronometro.describir("cache", "acierto")
+            return resultado
+        cronometro.describir("cache", "fallo")
+
+        resultado = self._calcular(
+            paciente_params,
+            ventilador_params,
+            fisiologia_params,
+            cronometro=cronometro,
+            **opciones,
+        )
+        self.cache.guardar(clave, resultado)
+        return resultado
+
+    def _calcular(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        estado_estacionario: bool = False,
+        max_points: Optional[int] = None,
+        estado: Optional[Dict[str, Any]] = None,
+        cronometro: Optional[Cronometro] = None,
+        precision: str = "float64",
+    ) -> Dict[str, Any]:
+        """Ejecuta la simulación sin consultar la caché. Si se pasa un
+        `cronometro`, registra en él el tiempo de cada etapa y los
+        contadores nfev, ciclos y puntos."""
+        cronometro = cronometro if cronometro is not None else Cronometro()
         try:
             self.logger.info(
                 f"Iniciando simulación con parámetros: paciente={paciente_params}, "
                 f"ventilador={ventilador_params}, fisiologia={fisiologia_params}"
             )
 
-            # Crear instancias de las clases de simulación
-            paciente = Paciente(**paciente_params)
-            ventilador = Ventilador(**ventilador_params)
+            with cronometro.etapa("modelos"):
+                simulador, intercambio_gases, hemodinamica = self._crear_modelos(
+                    paciente_params,
+                    ventilador_params,
+                    fisiologia_params,
+                    estado_estacionario,
+                    precision,
+                )
+                estado_inicial = self._estado_inicial(estado, estado_estacionario)
 
-            # Crear instancias de los modelos fisiológicos con parámetros dinámicos
-            hemodinamica = InteraccionCorazonPulmon(
-                k_sensibilidad=fisiologia_params["k_sensibilidad"]
-            )
+            # Ejecutar simulación según el modo
+            with cronometro.etapa("simulacion"):
+                if simulador.ventilador.modo == "ESPONTANEO":
+                    t, v1, v2 = simulador.simular_espontaneo(estado=estado_inicial)
+                else:
+                    t, v1, v2 = self._simular_controlado(
+                        simulador, estado_estacionario, estado_inicial
+                    )
+            cronometro.contar("nfev", simulador.nfev)
+            cronometro.contar("ciclos", len(simulador.inicios_ciclo))
+            cronometro.contar("puntos", len(t))
 
-            intercambio_gases = IntercambioGases(
-                ventilador=ventilador,
-                hemodinamica=hemodinamica,
-                V_D=fisiologia_params["V_D"],
-                Qs_Qt=fisiologia_params["Qs_Qt"],
-                FiO2=ventilador.FiO2,  # Usar el FiO2 del ventilador
-                VCO2=200,  # Valor fijo por ahora
-                R=0.8,  # Valor fijo por ahora
-                Pb=560,  # Presión barométrica de Bogotá (mmHg)
+            # Procesar resultados
+            with cronometro.etapa("procesamiento"):
+                resultados_mecanica = simulador.procesar_resultados(t, v1, v2)
+                # Las señales se derivan al pedirlas: las métricas por ciclo
+                # (que usa la fisiología) las calculan aquí
+                resultados_mecanica["por_ciclo"]
+            resultados_gases, resultados_hemo = self._calcular_fisiologia(
+                resultados_mecanica,
+                simulador,
+                intercambio_gases,
+                hemodinamica,
+                cronometro,
             )
 
-            # Ejecutar simulación según el modo
-            if ventilador.modo == "ESPONTANEO":
-                control = ControlRespiratorio(
-                    Gp=fisiologia_params["Gp_control"],
-                    Gi=fisiologia_params["Gi_control"],
+            # Preparar respuesta final
+            with cronometro.etapa("respuesta"):
+                respuesta_final = self._prepare_final_response(
+                    resultados_mecanica, resultados_gases, resultados_hemo
                 )
-                simulador = Simulador(paciente, ventilador, control)
-                t, v1, v2 = simulador.simular_espontaneo()
-            elif ventilador.modo == "VCV":
-                if ventilador.Vt is None:
-                    raise ValueError(
-                        "El volumen tidal (Vt) es requerido para el modo VCV"
+                if max_points:
+                    respuesta_final["series_tiempo"] = self._decimar_series(
+                        respuesta_final["series_tiempo"], max_points
                     )
-                simulador = Simulador(paciente, ventilador)
-                t, v1, v2 = simulador.simular(tiempo_total_deseado=30.0)
-            elif ventilador.modo == "PCV":
-                simulador = Simulador(paciente, ventilador)
-                t, v1, v2 = simulador.simular(tiempo_total_deseado=30.0)
-            else:
-                raise ValueError(f"Modo ventilatorio no soportado: {ventilador.modo}")
+                respuesta_final["estado_final"] = simulador.estado_final.a_dict()
 
-            # Procesar resultados
-            resultados_mecanica = simulador.procesar_resultados(t, v1, v2)
+            self.logger.info("Simulación completada exitosamente.")
+            return respuesta_final
+
+        except Exception as e:
+            self.logger.error(f"Error en simulación: {str(e)}")
+            raise
+
+    def iterar_simulacion(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        estado_estacionario: bool = False,
+        estado: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Versión incremental de run_simulation para respuestas en streaming.
+
+        Los modelos se construyen (y los parámetros se validan) al llamar,
+        de modo que los errores de configuración se lanzan antes de empezar a
+        transmitir. Devuelve un iterador de eventos: uno de tipo "ciclo" por
+        respiración, con sus series y métricas, y uno final de tipo "fin".
+        Las métricas de cada ciclo se calculan sobre ese ciclo; el flujo se
+        deriva dentro del ciclo, por lo que en sus bordes puede diferir
+        ligeramente del de la simulación completa. El evento "fin" lleva el
+        "estado_final" desde el que continuar.
+        """
+        simulador, intercambio_gases, hemodinamica = self._crear_modelos(
+            paciente_params, ventilador_params, fisiologia_params, estado_estacionario
+        )
+        estado_inicial = self._estado_inicial(estado, estado_estacionario)
 
-            # Calcular intercambio de gases y hemodinámica con las instancias ya creadas
+        if simulador.ventilador.modo == "ESPONTANEO":
+            ciclos = simulador.iterar_espontaneo(estado=estado_inicial)
+        elif estado_estacionario:
+            ciclos = simulador.iterar_ciclos(2, V0=simulador.estado_estacionario())
+        else:
+            ciclos = simulador.iterar_ciclos(
+                simulador.ciclos_para(30.0), estado=estado_inicial
+            )
+        return self._eventos_ciclo(ciclos, simulador, intercambio_gases, hemodinamica)
+
+    def _eventos_ciclo(
+        self,
+        ciclos: Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        simulador: Simulador,
+        intercambio_gases: IntercambioGases,
+        hemodinamica: InteraccionCorazonPulmon,
+    ) -> Iterator[Dict[str, Any]]:
+        """Convierte cada ciclo simulado en un evento con series y métricas."""
+        numero = 0
+        for numero, (t, v1, v2) in enumerate(ciclos, start=1):
+            respuesta = self._resultados_ciclo(
+                t, v1, v2, simulador, intercambio_gases, hemodinamica
+            )
+            yield {"tipo": "ciclo", "ciclo": numero, **respuesta}
+        fin = {"tipo": "fin", "ciclos": numero}
+        if simulador.estado_final is not None:
+            fin["estado_final"] = simulador.estado_final.a_dict()
+        yield fin
+
+    def _resultados_ciclo(
+        self,
+        t: np.ndarray,
+        v1: np.ndarray,
+        v2: np.ndarray,
+        simulador: Simulador,
+        intercambio_gases: IntercambioGases,
+        hemodinamica: InteraccionCorazonPulmon,
+    ) -> Dict[str, Any]:
+        """Series y métricas de una sola respiración."""
+        resultados_mecanica = simulador.procesar_resultados(t, v1, v2)
+        resultados_gases, resultados_hemo = self._calcular_fisiologia(
+            resultados_mecanica, simulador, intercambio_gases, hemodinamica
+        )
+        respuesta = self._prepare_final_response(
+            resultados_mecanica, resultados_gases, resultados_hemo
+        )
+        return respuesta
+
+    def _crear_modelos(
+        self,
+        paciente_params: Dict[str, Any],
+        ventilador_params: Dict[str, Any],
+        fisiologia_params: Dict[str, Any],
+        estado_estacionario: bool,
+        precision: str = "float64",
+    ) -> Tuple[Simulador, IntercambioGases, InteraccionCorazonPulmon]:
+        """Crea el simulador y los modelos fisiológicos para los parámetros;
+        `precision` es el tipo de las señales del simulador."""
+        # Crear instancias de las clases de simulación
+        paciente = Paciente(**paciente_params)
+        ventilador = Ventilador(**ventilador_params)
+
+        # Crear instancias de los modelos fisiológicos con parámetros dinámicos
+        hemodinamica = InteraccionCorazonPulmon(
+            k_sensibilidad=fisiologia_params["k_sensibilidad"],
+            curva_o2=fisiologia_params.get("curva_o2", "lineal"),
+        )
+
+        intercambio_gases = IntercambioGases(
+            ventilador=ventilador,
+            hemodinamica=hemodinamica,
+            V_D=fisiologia_params["V_D"],
+            Qs_Qt=fisiologia_params["Qs_Qt"],
+            FiO2=ventilador.FiO2,  # Usar el FiO2 del ventilador
+            VCO2=200,  # Valor fijo por ahora
+            R=0.8,  # Valor fijo por ahora
+            Pb=560,  # Presión barométrica de Bogotá (mmHg)
+        )
+
+        if ventilador.modo == "ESPONTANEO":
+            if estado_estacionario:
+                raise ValueError(
+                    "El estado estacionario directo no aplica al modo ESPONTANEO"
+                )
+            control = ControlRespiratorio(
+                Gp=fisiologia_params["Gp_control"],
+                Gi=fisiologia_params["Gi_control"],
+            )
+            simulador = Simulador(
+                paciente, ventilador, control, motor="fusionado", dtype=precision
+            )
+        elif ventilador.modo == "VCV":
+            if ventilador.Vt is None:
+                raise ValueError("El volumen tidal (Vt) es requerido para el modo VCV")
+            simulador = Simulador(
+                paciente, ventilador, motor="analitico", dtype=precision
+            )
+        elif ventilador.modo == "PCV":
+            simulador = Simulador(
+                paciente, ventilador, motor="analitico", dtype=precision
+            )
+        else:
+            raise ValueError(f"Modo ventilatorio no soportado: {ventilador.modo}")
+
+        return simulador, intercambio_gases, hemodinamica
+
+    def _calcular_fisiologia(
+        self,
+        resultados_mecanica: Dict[str, Any],
+        simulador: Simulador,
+        intercambio_gases: IntercambioGases,
+        hemodinamica: InteraccionCorazonPulmon,
+        cronometro: Optional[Cronometro] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Intercambio de gases y hemodinámica a partir de la mecánica."""
+        cronometro = cronometro if cronometro is not None else Cronometro()
+        with cronometro.etapa("gases"):
             resultados_gases = intercambio_gases.calcular(resultados_mecanica)
 
-            auto_peep_calculado = resultados_mecanica.get("auto_peep", 0.0)
+        auto_peep_calculado = resultados_mecanica.get("auto_peep", 0.0)
+        with cronometro.etapa("hemodinamica"):
             resultados_hemo = hemodinamica.calcular(
                 resultados_mecanica,
                 resultados_gases,
-                ventilador,
+                simulador.ventilador,
                 auto_peep_cmH2O=auto_peep_calculado,
             )
+        return resultados_gases, resultados_hemo
 
-            # Preparar respuesta final
-            respuesta_final = self._prepare_final_response(
-                resultados_mecanica, resultados_gases, resultados_hemo
+    @staticmethod
+    def _estado_inicial(
+        estado: Optional[Dict[str, Any]], estado_estacionario: bool
+    ) -> Optional[EstadoSimulacion]:
+        """Instantánea desde la que continuar, o None para empezar en t = 0."""
+        if estado is None:
+            return None
+        if estado_estacionario:
+            raise ValueError(
+                "El estado estacionario directo no admite un estado inicial"
             )
+        return EstadoSimulacion.desde_dict(estado)
 
-            self.logger.info("Simulación completada exitosamente.")
-            return respuesta_final
+    def _simular_controlado(
+        self,
+        simulador: Simulador,
+        estado_estacionario: bool,
+        estado: Optional[EstadoSimulacion] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Simula un modo controlado (PCV/VCV): 30 s desde volúmenes nulos (o
+        desde `estado`) o directamente el régimen periódico."""
+        if estado_estacionario:
+            return simulador.simular_estado_estacionario(ciclos=2)
+        return simulador.simular(tiempo_total_deseado=30.0, estado=estado)
 
-        except Exception as e:
-            self.logger.error(f"Error en simulación: {str(e)}")
-            raise
+    def _decimar_series(
+        self, series_tiempo: Dict[str, np.ndarray], max_points: int
+    ) -> Dict[str, np.ndarray]:
+        """Reduce las series a max_points conservando mínimos y máximos de
+        presión, flujo y volumen."""
+        indices = indices_min_max(
+            [
+                series_tiempo["presion_via_aerea"],
+                series_tiempo["flujo_total"],
+                series_tiempo["volumen_total"],
+            ],
+            max_points,
+        )
+        return {nombre: serie[indices] for nombre, serie in series_tiempo.items()}
 
     def _prepare_final_response(
         self,
@@ -125,11 +1106,11 @@ class SimulationService:
         volumen_tidal_entregado = 0
         presion_pico = 0
 
-        # Siempre calculamos el volumen tidal a partir de los datos, si están disponibles
-        if len(resultados_mecanica.get("Vt", [])) > 200:
-            volumen_tidal_entregado = np.max(resultados_mecanica["Vt"][-200:]) - np.min(
-                resultados_mecanica["Vt"][-200:]
-            )
+        # Volumen tidal de la última respiración del registro
+        if "por_ciclo" in resultados_mecanica:
+            volumen_tidal_entregado = resultados_mecanica["por_ciclo"]["volumen_tidal"][
+                -1
+            ]
 
         # La presión pico solo aplica en modos controlados
         if resultados_mecanica.get("modo") == "ESPONTANEO":
@@ -139,11 +1120,13 @@ class SimulationService:
                 presion_pico = np.max(resultados_mecanica["P_aw"])
 
         return {
+            # Las series se conservan como arreglos de NumPy; el endpoint las
+            # serializa a JSON o binario según la cabecera Accept
             "series_tiempo": {
-                "tiempo": resultados_mecanica.get("t", []).tolist(),
-                "presion_via_aerea": resultados_mecanica.get("P_aw", []).tolist(),
-                "flujo_total": resultados_mecanica.get("flow", []).tolist(),
-                "volumen_total": resultados_mecanica.get("Vt", []).tolist(),
+                "tiempo": np.asarray(resultados_mecanica.get("t", [])),
+                "presion_via_aerea": np.asarray(resultados_mecanica.get("P_aw", [])),
+                "flujo_total": np.asarray(resultados_mecanica.get("flow", [])),
+                "volumen_total": np.asarray(resultados_mecanica.get("Vt", [])),
             },
             "metricas_mecanicas": {
                 "volumen_tidal_entregado": volumen_tidal_entregado,
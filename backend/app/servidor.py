@@ -0,0 +1,134 @@
+"""
+Servidor prefork - Precarga la aplicación en el proceso padre y crea los
+workers de uvicorn con fork, de modo que comparten copy-on-write lo ya
+importado (numpy, scipy, FastAPI, modelos) y lo inicializado al calentar.
+
+`uvicorn --workers N` arranca cada worker con spawn, y cada uno vuelve a
+importar todo. Aquí el padre importa y ejecuta una simulación por modo una
+sola vez, congela el recolector (gc.freeze, para que las recolecciones de
+los hijos no escriban en las páginas heredadas) y abre el socket; cada
+worker solo ejecuta el lifespan (su calentamiento arranca el pool del
+ejecutor, ver /ready) y atiende peticiones. El padre reemplaza a los
+workers que terminan inesperadamente y reenvía SIGINT/SIGTERM para un
+apagado ordenado.
+
+Uso (desde backend/):
+
+    python -m app.servidor --workers 4 --host 0.0.0.0 --port 8000
+
+Los valores por defecto se leen de SIMULADOR_WORKERS, SIMULADOR_HOST y
+SIMULADOR_PUERTO. Cada worker tiene su propio pool de simulación; con
+varios workers conviene repartir los núcleos con SIMULADOR_MAX_WORKERS.
+Requiere fork (Linux, macOS).
+"""
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import List, Optional
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+def precargar():
+    """Importa y calienta la aplicación en este proceso; devuelve la app."""
+    # El motor numérico importa scipy de forma diferida; aquí se precarga
+    # para que los workers lo compartan
+    import scipy.integrate  # noqa: F401
+
+    from app.endpoints import simulation
+    from app.main import app
+    from app.services import arranque
+
+    arranque.calentar_local(
+        {
+            modo: simulation.parametros_por_defecto(modo)
+            for modo in arranque.MODOS_CALENTAMIENTO
+        }
+    )
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def _lanzar_worker(config: uvicorn.Config, sock: socket.socket) -> int:
+    """Crea un worker con fork; devuelve su pid en el padre."""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    codigo = 0
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        from app.services.arranque import estado_arranque
+
+        estado_arranque.tras_fork()
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception("Error en el worker")
+        codigo = 1
+    finally:
+        os._exit(codigo)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.servidor",
+        description="Servidor con precarga y workers copy-on-write.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("SIMULADOR_WORKERS", "1"))
+    )
+    parser.add_argument("--host", default=os.getenv("SIMULADOR_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port", type=int, default=int(os.getenv("SIMULADOR_PUERTO", "8000"))
+    )
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    app = precargar()
+    logger.info(f"Aplicación precargada en {time.perf_counter() - inicio:.2f} s")
+
+    config = uvicorn.Config(app, host=args.host, port=args.port, lifespan="on")
+    sock = config.bind_socket()
+    workers = {_lanzar_worker(config, sock) for _ in range(args.workers)}
+    apagando = False
+
+    def terminar(signum, frame):
+        nonlocal apagando
+        apagando = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, terminar)
+    signal.signal(signal.SIGTERM, terminar)
+
+    while workers:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in workers:
+            continue
+        workers.discard(pid)
+        if not apagando:
+            logger.warning(f"Worker {pid} terminó (estado {estado}); se reemplaza")
+            time.sleep(1.0)
+            workers.add(_lanzar_worker(config, sock))
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+"""
+Decimación de series - Reduce las curvas sin perder picos
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+
+def indices_min_max(series: Sequence[np.ndarray], max_puntos: int) -> np.ndarray:
+    """
+    Índices de muestra que conservan la forma de varias series con la misma
+    malla de tiempo, como máximo `max_puntos`.
+
+    Las muestras se agrupan en cubetas consecutivas y de cada cubeta se
+    conservan el mínimo y el máximo de cada serie, además de la primera y la
+    última muestra. Así los picos de presión y flujo (y en general los
+    extremos globales de cada serie) sobreviven a la reducción, cosa que un
+    submuestreo uniforme no garantiza.
+    """
+    n = len(series[0])
+    if n <= max_puntos:
+        return np.arange(n)
+
+    # Cada cubeta aporta hasta 2 índices por serie; se reservan 2 para los
+    # extremos de la malla
+    n_cubetas = max((max_puntos - 2) // (2 * len(series)), 1)
+    tamano = -(-n // n_cubetas)
+    # Con el tamaño redondeado hacia arriba pueden sobrar cubetas; ninguna
+    # debe quedar formada solo por relleno
+    n_cubetas = -(-n // tamano)
+    relleno = n_cubetas * tamano - n
+    base = np.arange(n_cubetas) * tamano
+
+    elegidos = [np.array([0, n - 1])]
+    for serie in series:
+        serie = np.asarray(serie, dtype=float)
+        altos = np.pad(serie, (0, relleno), constant_values=-np.inf)
+        bajos = np.pad(serie, (0, relleno), constant_values=np.inf)
+        elegidos.append(base + altos.reshape(n_cubetas, tamano).argmax(axis=1))
+        elegidos.append(base + bajos.reshape(n_cubetas, tamano).argmin(axis=1))
+    return np.unique(np.concatenate(elegidos))
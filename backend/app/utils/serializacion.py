@@ -0,0 +1,155 @@
+"""
+Serialización de resultados - JSON o binario columnar según el cliente
+"""
+
+import json
+import math
+import struct
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+TIPO_BINARIO = "application/octet-stream"
+TIPO_NDJSON = "application/x-ndjson"
+TIPO_SSE = "text/event-stream"
+MAGIA_BINARIO = b"SIMB"
+VERSION_BINARIO = 1
+_ALINEACION = 8
+
+
+def acepta_binario(accept: Optional[str]) -> bool:
+    """Indica si la cabecera Accept pide el formato binario."""
+    return bool(accept) and TIPO_BINARIO in accept
+
+
+def acepta_sse(accept: Optional[str]) -> bool:
+    """Indica si la cabecera Accept pide Server-Sent Events."""
+    return bool(accept) and TIPO_SSE in accept
+
+
+def linea_ndjson(evento: Dict[str, Any]) -> str:
+    """Un evento como una línea de JSON delimitado por saltos de línea."""
+    return _json_evento(evento) + "\n"
+
+
+def evento_sse(evento: Dict[str, Any]) -> str:
+    """Un evento en formato Server-Sent Events, con su tipo como nombre."""
+    datos = _json_evento(evento)
+    return f"event: {evento.get('tipo', 'message')}\ndata: {datos}\n\n"
+
+
+def _json_evento(evento: Dict[str, Any]) -> str:
+    # JSON estricto, como la respuesta completa: NaN e infinitos no son JSON
+    # válido y los clientes de streaming los rechazan
+    return json.dumps(_finitos(evento), default=a_nativo, allow_nan=False)
+
+
+def _finitos(valor: Any) -> Any:
+    """Copia de `valor` (dicts, listas, escalares y arreglos de NumPy) con
+    NaN e infinitos como None, que se serializa como null."""
+    if isinstance(valor, dict):
+        return {clave: _finitos(v) for clave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_finitos(v) for v in valor]
+    if isinstance(valor, np.ndarray):
+        if valor.dtype.kind == "f" and not np.isfinite(valor).all():
+            return np.where(np.isfinite(valor), valor, None).tolist()
+        return valor.tolist()
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+
+def a_json(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte las series de NumPy a listas para la respuesta JSON."""
+    return {
+        **resultado,
+        "series_tiempo": {
+            nombre: np.asarray(serie).tolist()
+            for nombre, serie in resultado["series_tiempo"].items()
+        },
+    }
+
+
+def a_binario(resultado: Dict[str, Any], dtype: str = "<f4") -> bytes:
+    """
+    Codifica el resultado en un formato columnar compacto:
+
+        MAGIA_BINARIO (4 bytes) | versión (uint8) | 3 bytes de relleno |
+        longitud de la cabecera (uint32 LE) | cabecera JSON (UTF-8) |
+        relleno hasta múltiplo de 8 | buffers de las series
+
+    La cabecera contiene las métricas tal como en la respuesta JSON y, en
+    "series", el nombre, tipo, longitud y desplazamiento (relativo al inicio
+    de los buffers) de cada serie. Por defecto las series se envían como
+    float32 little-endian; cada buffer empieza alineado a 8 bytes para que
+    el cliente pueda crear vistas tipadas sin copiar (p. ej. Float32Array).
+    """
+    series = {
+        nombre: np.ascontiguousarray(serie, dtype=dtype)
+        for nombre, serie in resultado["series_tiempo"].items()
+    }
+
+    descriptores, desplazamiento = [], 0
+    for nombre, serie in series.items():
+        descriptores.append(
+            {
+                "nombre": nombre,
+                "dtype": serie.dtype.str,
+                "longitud": int(serie.size),
+                "offset": desplazamiento,
+            }
+        )
+        desplazamiento += -(-serie.nbytes // _ALINEACION) * _ALINEACION
+
+    metricas = {k: v for k, v in resultado.items() if k != "series_tiempo"}
+    cabecera = json.dumps(
+        {"series": descriptores, **metricas}, default=a_nativo
+    ).encode("utf-8")
+
+    prefijo = MAGIA_BINARIO + struct.pack("<B3xI", VERSION_BINARIO, len(cabecera))
+    partes = [prefijo, cabecera, _relleno(len(prefijo) + len(cabecera))]
+    for serie in series.values():
+        partes.append(memoryview(serie).cast("B"))
+        partes.append(_relleno(serie.nbytes))
+    return b"".join(partes)
+
+
+def desde_binario(datos: bytes) -> Dict[str, Any]:
+    """Decodifica a_binario; las series se devuelven como vistas de NumPy."""
+    if datos[:4] != MAGIA_BINARIO:
+        raise ValueError("Formato binario de simulación no reconocido")
+    version, longitud = struct.unpack_from("<B3xI", datos, 4)
+    if version != VERSION_BINARIO:
+        raise ValueError(f"Versión de formato binario no soportada: {version}")
+
+    inicio_cabecera = 4 + struct.calcsize("<B3xI")
+    fin_cabecera = inicio_cabecera + longitud
+    cabecera = json.loads(datos[inicio_cabecera:fin_cabecera])
+    inicio_buffers = fin_cabecera + len(_relleno(fin_cabecera))
+
+    series = {
+        d["nombre"]: np.frombuffer(
+            datos,
+            dtype=d["dtype"],
+            count=d["longitud"],
+            offset=inicio_buffers + d["offset"],
+        )
+        for d in cabecera.pop("series")
+    }
+    return {"series_tiempo": series, **cabecera}
+
+
+def _relleno(n: int) -> bytes:
+    return b"\0" * (-n % _ALINEACION)
+
+
+def a_nativo(valor: Any) -> Any:
+    """Convierte escalares y arreglos de NumPy en las métricas a tipos JSON."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
@@ -0,0 +1,18 @@
+"""
+Suite de rendimiento de los modelos y del servicio de simulación.
+
+Uso (desde backend/):
+
+    python -m benchmarks --guardar benchmarks/linea_base.json
+    python -m benchmarks --comparar benchmarks/linea_base.json --umbral 0.25
+
+Ver benchmarks.suite para el detalle de los casos y del formato JSON.
+
+Prueba de carga de la API (ver benchmarks.carga):
+
+    python -m benchmarks.carga --escenario escenario.json --salida carga.json
+
+Arranque en frío y primera petición (ver benchmarks.arranque):
+
+    python -m benchmarks.arranque --modo prefork --workers 2
+"""
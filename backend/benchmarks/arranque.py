@@ -0,0 +1,155 @@
+"""
+Medición del arranque en frío del servidor.
+
+Lanza el servidor en un puerto libre y mide, por repetición: el tiempo
+hasta que /ready responde 200 (arranque en frío, visto desde fuera), la
+latencia de la primera petición a /api/simulate por modo y la de una
+segunda petición idéntica. También recoge el cuerpo de /ready, con los
+tiempos medidos por el propio worker (importación, calentamiento,
+arranque).
+
+Uso (desde backend/):
+
+    python -m benchmarks.arranque --modo uvicorn
+    python -m benchmarks.arranque --modo prefork --workers 2 --salida arranque.json
+    SIMULADOR_CALENTAMIENTO=0 python -m benchmarks.arranque --modo uvicorn
+
+"uvicorn" ejecuta `uvicorn app.main:app`; "prefork" ejecuta app.servidor.
+Las peticiones evitan la caché variando ligeramente los parámetros.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+MODOS_SERVIDOR = ("uvicorn", "prefork")
+MODOS_VENTILACION = ("PCV", "VCV", "ESPONTANEO")
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _comando(modo: str, puerto: int, workers: int) -> List[str]:
+    if modo == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto)]
+    return [
+        sys.executable,
+        *("-m", "app.servidor", "--port", str(puerto), "--workers", str(workers)),
+    ]
+
+
+def _peticion(modo: str, repeticion: int) -> Dict[str, Any]:
+    return {
+        "paciente": {"R1": 10.0 + 1e-6 * repeticion},
+        "ventilador": {"modo": modo},
+        "fisiologia": {},
+    }
+
+
+def medir_arranque(
+    modo: str, workers: int = 1, repeticion: int = 0, timeout_s: float = 60.0
+) -> Dict[str, Any]:
+    puerto = _puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        _comando(modo, puerto, workers),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=url, timeout=timeout_s) as cliente:
+            listo = None
+            while time.perf_counter() - inicio < timeout_s:
+                try:
+                    respuesta = cliente.get("/ready")
+                    if respuesta.status_code == 200:
+                        listo = respuesta
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            if listo is None:
+                raise TimeoutError(f"El servidor no quedó listo en {timeout_s} s")
+            resultado = {
+                "hasta_listo_s": time.perf_counter() - inicio,
+                "worker": listo.json(),
+                "primera_peticion_s": {},
+                "segunda_peticion_s": {},
+            }
+            for modo_ventilacion in MODOS_VENTILACION:
+                cuerpo = _peticion(modo_ventilacion, repeticion)
+                for clave in ("primera_peticion_s", "segunda_peticion_s"):
+                    t0 = time.perf_counter()
+                    cliente.post("/api/simulate", json=cuerpo).raise_for_status()
+                    resultado[clave][modo_ventilacion] = time.perf_counter() - t0
+                    # La segunda petición no debe ser un acierto de caché
+                    cuerpo = _peticion(modo_ventilacion, repeticion + 0.5)
+            return resultado
+    finally:
+        proceso.send_signal(signal.SIGTERM)
+        try:
+            proceso.wait(10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+
+def _mediana(valores: List[float]) -> float:
+    return statistics.median(valores) if valores else float("nan")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.arranque",
+        description="Arranque en frío y latencia de la primera petición.",
+    )
+    parser.add_argument("--modo", choices=MODOS_SERVIDOR, default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", metavar="RUTA", help="Guardar el resultado JSON")
+    args = parser.parse_args(argv)
+
+    mediciones = [
+        medir_arranque(args.modo, args.workers, i) for i in range(args.repeticiones)
+    ]
+    print(
+        f"{args.modo} (calentamiento "
+        f"{os.getenv('SIMULADOR_CALENTAMIENTO', '1') != '0'}), "
+        f"{args.repeticiones} repeticiones, medianas:"
+    )
+    print(
+        f"  hasta /ready      "
+        f"{_mediana([m['hasta_listo_s'] for m in mediciones]) * 1e3:8.1f} ms"
+    )
+    for modo in MODOS_VENTILACION:
+        primera = _mediana([m["primera_peticion_s"][modo] for m in mediciones])
+        segunda = _mediana([m["segunda_peticion_s"][modo] for m in mediciones])
+        print(
+            f"  {modo:<10} primera {primera * 1e3:8.1f} ms   "
+            f"segunda {segunda * 1e3:8.1f} ms"
+        )
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(
+                {"modo": args.modo, "workers": args.workers, "mediciones": mediciones},
+                archivo,
+                indent=2,
+            )
+            archivo.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
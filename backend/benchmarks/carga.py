@@ -0,0 +1,329 @@
+"""
+Generador de carga asíncrono para la API de simulación.
+
+Dirige peticiones concurrentes a /api/simulate, dentro del mismo proceso a
+través de la interfaz ASGI de app.main:app (por defecto) o contra un
+servidor en ejecución (--url, p. ej. un uvicorn local), y reporta por
+etapa de concurrencia: peticiones por segundo, latencias p50/p95/p99,
+errores por código y uso de CPU.
+
+Uso (desde backend/):
+
+    python -m benchmarks.carga
+    python -m benchmarks.carga --escenario escenario.json --salida carga.json
+    python -m benchmarks.carga --url http://localhost:8000 --pid-servidor 1234
+
+Un escenario es un JSON con las mismas claves que ESCENARIO_POR_DEFECTO:
+
+    modos       Proporción de peticiones por modo ventilatorio.
+    parametros  Distribución de cada campo, "grupo.campo": {"uniforme":
+                [min, max]}, {"valores": [...]} (elección equiprobable) o
+                un valor fijo.
+    repeticion  Probabilidad de repetir una petición ya enviada (ejercita
+                la caché de resultados).
+    opciones    Campos adicionales de la petición (p. ej. max_points).
+    binario     Pedir la respuesta en el formato binario.
+    etapas      Rampa de concurrencia: lista de {"concurrencia": usuarios
+                simultáneos, "duracion_s": segundos}.
+
+La CPU se mide como tiempo de CPU del proceso generador más el de sus
+procesos hijos vivos (los workers del ejecutor cuando la app corre en el
+mismo proceso) o, con --pid-servidor, el del servidor y sus hijos. La
+lectura de procesos hijos y de otros procesos usa /proc (Linux).
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.utils import serializacion
+
+ESCENARIO_POR_DEFECTO: Dict[str, Any] = {
+    "modos": {"PCV": 0.5, "VCV": 0.3, "ESPONTANEO": 0.2},
+    "parametros": {
+        "paciente.R1": {"uniforme": [5.0, 30.0]},
+        "paciente.C1": {"uniforme": [0.02, 0.08]},
+        "paciente.R2": {"uniforme": [5.0, 30.0]},
+        "paciente.C2": {"uniforme": [0.02, 0.08]},
+        "ventilador.PEEP": {"valores": [0.0, 5.0, 8.0, 10.0, 12.0]},
+        "ventilador.fr": {"uniforme": [10.0, 30.0]},
+        "ventilador.Vt": {"uniforme": [0.3, 0.6]},
+    },
+    "repeticion": 0.2,
+    "opciones": {"max_points": 1000},
+    "binario": False,
+    "etapas": [
+        {"concurrencia": 1, "duracion_s": 5.0},
+        {"concurrencia": 4, "duracion_s": 5.0},
+        {"concurrencia": 16, "duracion_s": 5.0},
+    ],
+}
+
+_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+class GeneradorPeticiones:
+    """Cuerpos de /api/simulate según las distribuciones del escenario."""
+
+    def __init__(self, escenario: Dict[str, Any], semilla: Optional[int] = None):
+        self.escenario = escenario
+        self.rng = random.Random(semilla)
+        self.modos = list(escenario["modos"])
+        self.pesos = [escenario["modos"][m] for m in self.modos]
+        self.enviadas: List[Dict[str, Any]] = []
+
+    def _muestrear(self, distribucion: Any) -> Any:
+        if isinstance(distribucion, dict) and "uniforme" in distribucion:
+            return self.rng.uniform(*distribucion["uniforme"])
+        if isinstance(distribucion, dict) and "valores" in distribucion:
+            return self.rng.choice(distribucion["valores"])
+        return distribucion
+
+    def siguiente(self) -> Dict[str, Any]:
+        if self.enviadas and self.rng.random() < self.escenario.get("repeticion", 0):
+            return self.rng.choice(self.enviadas)
+        cuerpo = {
+            "paciente": {},
+            "ventilador": {"modo": self.rng.choices(self.modos, self.pesos)[0]},
+            "fisiologia": {},
+            **copy.deepcopy(self.escenario.get("opciones", {})),
+        }
+        for campo, distribucion in self.escenario.get("parametros", {}).items():
+            grupo, nombre = campo.split(".", 1)
+            cuerpo[grupo][nombre] = self._muestrear(distribucion)
+        self.enviadas.append(cuerpo)
+        return cuerpo
+
+
+def _cpu_proceso(pid: int) -> float:
+    """Segundos de CPU (usuario + sistema) de un proceso según /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as archivo:
+            campos = archivo.read().rsplit(")", 1)[1].split()
+        return (int(campos[11]) + int(campos[12])) / _TICKS
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def _hijos(pid: int) -> List[int]:
+    hijos = []
+    try:
+        for tarea in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tarea}/children") as archivo:
+                hijos += [int(h) for h in archivo.read().split()]
+    except OSError:
+        pass
+    return hijos
+
+
+def cpu_por_proceso(pid: Optional[int] = None) -> Dict[int, float]:
+    """CPU acumulada de un proceso (por defecto, este) y de sus hijos vivos."""
+    if pid is None:
+        pid = os.getpid()
+        cpu = {pid: time.process_time()}
+    else:
+        cpu = {pid: _cpu_proceso(pid)}
+    for hijo in _hijos(pid):
+        cpu[hijo] = _cpu_proceso(hijo)
+    return cpu
+
+
+def _cpu_consumida(inicio: Dict[int, float], fin: Dict[int, float]) -> float:
+    # Los procesos creados durante la etapa empiezan en cero
+    return sum(valor - inicio.get(pid, 0.0) for pid, valor in fin.items())
+
+
+async def esperar_listo(
+    cliente: httpx.AsyncClient, timeout_s: float = 60.0
+) -> Dict[str, Any]:
+    """Espera a que /ready responda 200 (worker caliente) y devuelve cuánto
+    se esperó y el estado de arranque que informa el worker."""
+    inicio = time.perf_counter()
+    while True:
+        try:
+            respuesta = await cliente.get("/ready")
+            if respuesta.status_code in (200, 404):
+                break
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() - inicio > timeout_s:
+            raise TimeoutError(f"El servidor no quedó listo en {timeout_s} s")
+        await asyncio.sleep(0.05)
+    return {
+        "espera_s": time.perf_counter() - inicio,
+        "worker": respuesta.json() if respuesta.status_code == 200 else None,
+    }
+
+
+async def _usuario(
+    cliente: httpx.AsyncClient,
+    generador: GeneradorPeticiones,
+    cabeceras: Dict[str, str],
+    limite: float,
+    registros: List[tuple],
+) -> None:
+    """Un usuario simulado: envía peticiones una tras otra hasta `limite`."""
+    while time.perf_counter() < limite:
+        cuerpo = generador.siguiente()
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.post(
+                "/api/simulate", json=cuerpo, headers=cabeceras
+            )
+            await respuesta.aread()
+            codigo = str(respuesta.status_code)
+        except httpx.HTTPError as e:
+            codigo = type(e).__name__
+        registros.append(
+            (time.perf_counter() - inicio, codigo, cuerpo["ventilador"]["modo"])
+        )
+
+
+def resumir(
+    registros: List[tuple], duracion_s: float, cpu_s: float, concurrencia: int
+) -> Dict[str, Any]:
+    latencias = np.array([r[0] for r in registros]) * 1e3
+    codigos: Dict[str, int] = {}
+    modos: Dict[str, int] = {}
+    for _, codigo, modo in registros:
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+        modos[modo] = modos.get(modo, 0) + 1
+    errores = sum(n for codigo, n in codigos.items() if not codigo.startswith("2"))
+    p50, p95, p99 = (
+        np.percentile(latencias, [50, 95, 99]) if len(latencias) else (np.nan,) * 3
+    )
+    return {
+        "concurrencia": concurrencia,
+        "duracion_s": duracion_s,
+        "peticiones": len(registros),
+        "rps": len(registros) / duracion_s if duracion_s > 0 else 0.0,
+        "latencia_ms": {
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencias.max()) if len(latencias) else float("nan"),
+        },
+        "errores": errores,
+        "tasa_errores": errores / len(registros) if registros else 0.0,
+        "codigos": codigos,
+        "modos": modos,
+        "cpu_s": cpu_s,
+        "cpu_porcentaje": 100.0 * cpu_s / duracion_s if duracion_s > 0 else 0.0,
+    }
+
+
+async def ejecutar_escenario(
+    escenario: Dict[str, Any],
+    url: Optional[str] = None,
+    semilla: Optional[int] = 0,
+    pid_servidor: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Ejecuta las etapas del escenario y devuelve el resumen de cada una.
+    Sin `url`, la app se carga en este proceso y se ejecuta su lifespan.
+    Las etapas empiezan cuando /ready indica que el worker está caliente.
+    """
+    generador = GeneradorPeticiones(escenario, semilla)
+    cabeceras = (
+        {"Accept": serializacion.TIPO_BINARIO} if escenario.get("binario") else {}
+    )
+    tiempo_max = httpx.Timeout(60.0)
+    arranque: Dict[str, Any] = {}
+
+    async def etapas(cliente: httpx.AsyncClient) -> List[Dict[str, Any]]:
+        arranque.update(await esperar_listo(cliente))
+        resumenes = []
+        for etapa in escenario["etapas"]:
+            registros: List[tuple] = []
+            cpu_inicio = cpu_por_proceso(pid_servidor)
+            inicio = time.perf_counter()
+            limite = inicio + etapa["duracion_s"]
+            await asyncio.gather(
+                *(
+                    _usuario(cliente, generador, cabeceras, limite, registros)
+                    for _ in range(etapa["concurrencia"])
+                )
+            )
+            duracion = time.perf_counter() - inicio
+            cpu = _cpu_consumida(cpu_inicio, cpu_por_proceso(pid_servidor))
+            resumenes.append(resumir(registros, duracion, cpu, etapa["concurrencia"]))
+        return resumenes
+
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=tiempo_max) as cliente:
+            resumenes = await etapas(cliente)
+    else:
+        from app.main import app
+
+        transporte = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transporte, base_url="http://carga", timeout=tiempo_max
+            ) as cliente:
+                resumenes = await etapas(cliente)
+
+    return {
+        "destino": url or "asgi",
+        "escenario": escenario,
+        "arranque": arranque,
+        "etapas": resumenes,
+    }
+
+
+def _tabla(resultado: Dict[str, Any]) -> str:
+    filas = [
+        f"{'usuarios':>8} {'pet.':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'errores':>8} {'CPU %':>7}"
+    ]
+    for e in resultado["etapas"]:
+        latencia = e["latencia_ms"]
+        filas.append(
+            f"{e['concurrencia']:>8} {e['peticiones']:>6} {e['rps']:>8.1f} "
+            f"{latencia['p50']:>8.1f} {latencia['p95']:>8.1f} {latencia['p99']:>8.1f} "
+            f"{e['tasa_errores']:>7.1%} {e['cpu_porcentaje']:>7.0f}"
+        )
+    return "\n".join(filas)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.carga",
+        description="Prueba de carga de /api/simulate.",
+    )
+    parser.add_argument("--url", help="Servidor destino; por defecto, la app ASGI")
+    parser.add_argument("--escenario", metavar="RUTA", help="Escenario JSON")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", metavar="RUTA", help="Guardar el resultado JSON")
+    parser.add_argument(
+        "--pid-servidor", type=int, help="Medir la CPU de este proceso y sus hijos"
+    )
+    args = parser.parse_args(argv)
+
+    escenario = copy.deepcopy(ESCENARIO_POR_DEFECTO)
+    if args.escenario:
+        with open(args.escenario, encoding="utf-8") as archivo:
+            escenario.update(json.load(archivo))
+
+    resultado = asyncio.run(
+        ejecutar_escenario(escenario, args.url, args.semilla, args.pid_servidor)
+    )
+    print(_tabla(resultado))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2)
+            archivo.write("\n")
+
+    errores = sum(e["errores"] for e in resultado["etapas"])
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
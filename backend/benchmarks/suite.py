@@ -0,0 +1,298 @@
+"""
+Casos de rendimiento, medición y comparación con líneas base JSON.
+
+Cada caso se mide por modo ventilatorio (PCV, VCV, ESPONTANEO) y por perfil
+de paciente (normal, rígido, obstructivo):
+
+    simular/<modo>/<paciente>           Simulador.simular o simular_espontaneo
+    procesar_resultados/<modo>/<paciente>
+    intercambio/<modo>/<paciente>       IntercambioGases.calcular
+    hemodinamica/<modo>/<paciente>      InteraccionCorazonPulmon.calcular
+    servicio/<modo>/<paciente>          SimulationService.run_simulation sin
+                                        caché, más la serialización a JSON
+
+Además, para PCV y VCV y un pulmón heterogéneo de N = 10, 100 y 500
+unidades:
+
+    multicompartimental/<modo>/<N>      SimuladorMulticompartimental.simular
+
+Una línea base es un JSON con el entorno de la medición y, por caso, la
+mediana y el mínimo de los tiempos (s):
+
+    {"version": 1, "entorno": {...},
+     "casos": {"simular/PCV/normal": {"mediana_s": ..., "minimo_s": ...,
+                                       "repeticiones": ...}, ...}}
+
+La comparación falla cuando la mediana de un caso supera la de la línea
+base en más del umbral relativo (por defecto 25 %, configurable con
+--umbral o SIMULADOR_BENCH_UMBRAL).
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy
+
+from app.services.cache import CacheResultados
+from app.services.ejecutor import EjecutorSimulaciones
+from app.services.simulation_service import SimulationService
+from app.utils import serializacion
+from models.paciente import PacienteMulticompartimental
+from models.simulador_multicompartimental import SimuladorMulticompartimental
+from models.ventilador import Ventilador
+
+VERSION_LINEA_BASE = 1
+UMBRAL_POR_DEFECTO = 0.25
+
+MODOS = ("PCV", "VCV", "ESPONTANEO")
+PACIENTES = {
+    "normal": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+    "rigido": {"R1": 10.0, "C1": 0.02, "R2": 12.0, "C2": 0.015},
+    "obstructivo": {"R1": 25.0, "C1": 0.06, "R2": 40.0, "C2": 0.05},
+}
+VENTILADOR = {
+    "PEEP": 5.0,
+    "P_driving": 15.0,
+    "fr": 15.0,
+    "Ti": 1.0,
+    "Vt": 0.5,
+    "FiO2": 0.21,
+}
+COMPARTIMENTOS = (10, 100, 500)
+FISIOLOGIA = {
+    "k_sensibilidad": 0.1,
+    "Gp_control": 0.3,
+    "Gi_control": 0.01,
+    "Qs_Qt": 0.05,
+    "V_D": 0.15,
+    "curva_o2": "lineal",
+}
+
+
+def _parametros(modo: str, paciente: str) -> Tuple[Dict, Dict, Dict]:
+    return dict(PACIENTES[paciente]), {"modo": modo, **VENTILADOR}, dict(FISIOLOGIA)
+
+
+def _casos_configuracion(
+    servicio: SimulationService, modo: str, paciente: str
+) -> Dict[str, Callable[[], Any]]:
+    """Funciones sin argumentos a medir para una configuración. Las etapas
+    posteriores a la simulación se miden sobre un resultado precalculado."""
+    paciente_params, ventilador_params, fisiologia_params = _parametros(modo, paciente)
+
+    def modelos():
+        return servicio._crear_modelos(
+            paciente_params, ventilador_params, fisiologia_params, False
+        )
+
+    def simular():
+        simulador, _, _ = modelos()
+        if modo == "ESPONTANEO":
+            return simulador, simulador.simular_espontaneo()
+        return simulador, simulador.simular(tiempo_total_deseado=30.0)
+
+    simulador, intercambio, hemodinamica = modelos()
+    if modo == "ESPONTANEO":
+        t, V1, V2 = simulador.simular_espontaneo()
+    else:
+        t, V1, V2 = simulador.simular(tiempo_total_deseado=30.0)
+    mecanica = simulador.procesar_resultados(t, V1, V2)
+    gases = intercambio.calcular(mecanica)
+
+    def servicio_completo():
+        resultado = servicio.run_simulation(
+            paciente_params, ventilador_params, fisiologia_params
+        )
+        return json.dumps(
+            serializacion.a_json(resultado), default=serializacion.a_nativo
+        )
+
+    sufijo = f"{modo}/{paciente}"
+    return {
+        f"simular/{sufijo}": simular,
+        # Las señales se derivan al pedirlas: se piden las que usa el servicio
+        f"procesar_resultados/{sufijo}": lambda: simulador.procesar_resultados(
+            t, V1, V2
+        )["por_ciclo"],
+        f"intercambio/{sufijo}": lambda: intercambio.calcular(mecanica),
+        f"hemodinamica/{sufijo}": lambda: hemodinamica.calcular(
+            mecanica, gases, simulador.ventilador, mecanica["auto_peep"]
+        ),
+        f"servicio/{sufijo}": servicio_completo,
+    }
+
+
+def _casos_multicompartimentales() -> Dict[str, Callable[[], Any]]:
+    """30 s de simulación de un pulmón con constantes de tiempo muy dispersas
+    (dispersión lognormal 2), que hace al sistema rígido."""
+
+    def caso(modo: str, n: int):
+        paciente = PacienteMulticompartimental.heterogeneo(n, dispersion=2.0, semilla=0)
+        ventilador = Ventilador(modo=modo, **VENTILADOR)
+        return lambda: SimuladorMulticompartimental(paciente, ventilador).simular(
+            tiempo_total_deseado=30.0
+        )
+
+    return {
+        f"multicompartimental/{modo}/{n}": caso(modo, n)
+        for modo in ("PCV", "VCV")
+        for n in COMPARTIMENTOS
+    }
+
+
+def medir(
+    funcion: Callable[[], Any],
+    repeticiones_min: int = 5,
+    tiempo_min_s: float = 0.2,
+    repeticiones_max: int = 1000,
+) -> Dict[str, Any]:
+    """Ejecuta `funcion` tras una llamada de calentamiento hasta reunir al
+    menos `repeticiones_min` tiempos y `tiempo_min_s` segundos medidos."""
+    funcion()
+    tiempos: List[float] = []
+    while len(tiempos) < repeticiones_max and (
+        len(tiempos) < repeticiones_min or sum(tiempos) < tiempo_min_s
+    ):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {
+        "mediana_s": statistics.median(tiempos),
+        "minimo_s": min(tiempos),
+        "repeticiones": len(tiempos),
+    }
+
+
+def entorno() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "plataforma": platform.platform(),
+        "procesador": platform.processor() or platform.machine(),
+    }
+
+
+def ejecutar_suite(
+    patron: str = "*", tiempo_min_s: float = 0.2, repeticiones_min: int = 5
+) -> Dict[str, Any]:
+    """Mide los casos cuyo nombre coincide con `patron` (estilo fnmatch)."""
+    servicio = SimulationService(
+        EjecutorSimulaciones(backend="local"), CacheResultados(max_entradas=0)
+    )
+    casos = {}
+    for modo in MODOS:
+        for paciente in PACIENTES:
+            for nombre, funcion in _casos_configuracion(
+                servicio, modo, paciente
+            ).items():
+                if fnmatch.fnmatch(nombre, patron):
+                    casos[nombre] = medir(funcion, repeticiones_min, tiempo_min_s)
+    for nombre, funcion in _casos_multicompartimentales().items():
+        if fnmatch.fnmatch(nombre, patron):
+            casos[nombre] = medir(funcion, repeticiones_min, tiempo_min_s)
+    servicio.cerrar()
+    return {"version": VERSION_LINEA_BASE, "entorno": entorno(), "casos": casos}
+
+
+def guardar_linea_base(resultados: Dict[str, Any], ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(resultados, archivo, indent=2, sort_keys=True)
+        archivo.write("\n")
+
+
+def cargar_linea_base(ruta: str) -> Dict[str, Any]:
+    with open(ruta, encoding="utf-8") as archivo:
+        linea_base = json.load(archivo)
+    if linea_base.get("version") != VERSION_LINEA_BASE:
+        raise ValueError(
+            f"Versión de línea base no soportada: {linea_base.get('version')}"
+        )
+    return linea_base
+
+
+def comparar(
+    resultados: Dict[str, Any],
+    linea_base: Dict[str, Any],
+    umbral: float = UMBRAL_POR_DEFECTO,
+) -> List[Dict[str, Any]]:
+    """
+    Regresiones de `resultados` frente a `linea_base`: casos presentes en
+    ambas cuya mediana crece más que `umbral` (fracción). Los casos nuevos
+    o ausentes en la línea base no se consideran.
+    """
+    regresiones = []
+    for nombre, actual in resultados["casos"].items():
+        base = linea_base["casos"].get(nombre)
+        if base is None:
+            continue
+        razon = actual["mediana_s"] / base["mediana_s"]
+        if razon > 1 + umbral:
+            regresiones.append(
+                {
+                    "caso": nombre,
+                    "base_s": base["mediana_s"],
+                    "actual_s": actual["mediana_s"],
+                    "razon": razon,
+                }
+            )
+    return regresiones
+
+
+def _tabla(resultados: Dict[str, Any], linea_base: Optional[Dict[str, Any]]) -> str:
+    filas = []
+    for nombre, actual in sorted(resultados["casos"].items()):
+        fila = f"{nombre:<44} {actual['mediana_s'] * 1e3:10.3f} ms"
+        base = (linea_base or {}).get("casos", {}).get(nombre)
+        if base:
+            fila += f"  x{actual['mediana_s'] / base['mediana_s']:.2f}"
+        filas.append(fila)
+    return "\n".join(filas)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--filtro", default="*", help="Patrón de casos (fnmatch)")
+    parser.add_argument("--guardar", metavar="RUTA", help="Guardar línea base JSON")
+    parser.add_argument("--comparar", metavar="RUTA", help="Línea base a comparar")
+    parser.add_argument(
+        "--umbral",
+        type=float,
+        default=float(os.getenv("SIMULADOR_BENCH_UMBRAL", UMBRAL_POR_DEFECTO)),
+        help="Aumento relativo tolerado de la mediana (0.25 = 25 %%)",
+    )
+    parser.add_argument(
+        "--tiempo-min",
+        type=float,
+        default=0.2,
+        help="Segundos mínimos de medición por caso",
+    )
+    args = parser.parse_args(argv)
+
+    resultados = ejecutar_suite(args.filtro, tiempo_min_s=args.tiempo_min)
+    linea_base = cargar_linea_base(args.comparar) if args.comparar else None
+    print(_tabla(resultados, linea_base))
+
+    if args.guardar:
+        guardar_linea_base(resultados, args.guardar)
+        print(f"Línea base guardada en {args.guardar}")
+
+    if linea_base is not None:
+        regresiones = comparar(resultados, linea_base, args.umbral)
+        for r in regresiones:
+            print(
+                f"REGRESIÓN {r['caso']}: {r['base_s'] * 1e3:.3f} ms -> "
+                f"{r['actual_s'] * 1e3:.3f} ms (x{r['razon']:.2f})"
+            )
+        if regresiones:
+            return 1
+    return 0
@@ -3,19 +3,30 @@ Este paquete contiene las clases fundamentales para
 la simulación de fisiología pulmonar.
 """
 
-from .paciente import Paciente
+from .paciente import Paciente, PacienteMulticompartimental
 from .ventilador import Ventilador
 from .simulador import Simulador
 from .intercambio import IntercambioGases
 from .hemodinamica import InteraccionCorazonPulmon
 from .control import ControlRespiratorio
+from .motor_analitico import MotorAnalitico
+from .simulador_lote import SimuladorLote
+from .simulador_multicompartimental import SimuladorMulticompartimental
+from .estado import EstadoSimulacion
+from .estimacion import estimar_mecanica
 
 # Opcional: define qué se importa con 'from models import *'
 __all__ = [
     "Paciente",
+    "PacienteMulticompartimental",
     "Ventilador",
     "Simulador",
     "IntercambioGases",
     "InteraccionCorazonPulmon",
     "ControlRespiratorio",
+    "MotorAnalitico",
+    "SimuladorLote",
+    "SimuladorMulticompartimental",
+    "EstadoSimulacion",
+    "estimar_mecanica",
 ]
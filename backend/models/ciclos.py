@@ -0,0 +1,97 @@
+# Librerías
+import numpy as np
+
+
+def inicios_regulares(num_ciclos: int, pasos_por_ciclo: int) -> np.ndarray:
+    """Índice de muestra en que empieza cada ciclo de una malla regular."""
+    return np.arange(num_ciclos) * pasos_por_ciclo
+
+
+def fase_en_ciclo(t: np.ndarray, inicios: np.ndarray) -> np.ndarray:
+    """
+    Tiempo transcurrido desde el inicio de su respiración en cada muestra.
+
+    Los motores simulan cada ciclo desde su propio origen, que no tiene por
+    qué ser múltiplo del periodo (una simulación reanudada desde un estado,
+    un cambio de frecuencia en un escenario o en una sesión): la fase del
+    ventilador se mide desde ahí y no desde t = 0.
+    """
+    inicios = np.asarray(inicios, dtype=int)
+    longitudes = np.diff(np.append(inicios, len(t)))
+    return t - np.repeat(t[inicios], longitudes)
+
+
+def metricas_por_ciclo(
+    t: np.ndarray,
+    Vt: np.ndarray,
+    P_aw: np.ndarray,
+    P_alv: np.ndarray,
+    flujo: np.ndarray,
+    inicios: np.ndarray,
+) -> dict:
+    """
+    Métricas de cada respiración en una sola pasada con reducciones
+    segmentadas (np.ufunc.reduceat) sobre los registros completos.
+
+    La respiración b abarca las muestras [inicios[b], inicios[b+1]); las
+    integrales en el tiempo (regla del trapecio) incluyen además el tramo
+    hasta la primera muestra de la respiración siguiente, de modo que la
+    suma de sus duraciones cubre todo el registro.
+
+    Parámetros
+    ----------
+    P_alv : np.ndarray
+        Presión alveolar media ponderada por la conductancia de cada
+        compartimento; su valor al final de la respiración es el Auto-PEEP.
+
+    Devuelve
+    -------
+    dict con un arreglo por métrica (una entrada por respiración):
+        inicio, duracion, volumen_tidal (máx - mín de Vt), volumen_inspirado
+        (integral del flujo positivo), presion_pico, presion_meseta (máxima
+        presión alveolar), presion_media, volumen_fin_espiracion y auto_peep.
+    """
+    inicios = np.asarray(inicios, dtype=int)
+    n = len(t)
+    finales = np.append(inicios[1:], n) - 1  # Última muestra de cada respiración
+
+    # Tramos entre muestras consecutivas; el tramo i pertenece a la
+    # respiración que contiene la muestra i. Las áreas de presión y de flujo
+    # comparten un arreglo y se calculan en el lugar, para que los registros
+    # largos no multipliquen su memoria en temporales
+    dt = np.diff(t)
+    inicio_tramos = np.minimum(inicios, max(n - 2, 0))
+    area = np.add(P_aw[1:], P_aw[:-1])
+    area *= 0.5
+    area *= dt
+    integral_presion = np.add.reduceat(area, inicio_tramos)
+    flujo_insp = np.maximum(flujo, 0.0)
+    np.add(flujo_insp[1:], flujo_insp[:-1], out=area)
+    area *= 0.5
+    area *= dt
+    volumen_inspirado = np.add.reduceat(area, inicio_tramos)
+    # Una respiración sin tramos propios (p. ej. de una sola muestra al final)
+    # no acumula área
+    sin_tramos = inicios >= n - 1
+    integral_presion[sin_tramos] = 0.0
+    volumen_inspirado[sin_tramos] = 0.0
+
+    limite = np.append(inicios[1:], n - 1)
+    duracion = t[limite] - t[inicios]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        presion_media = np.where(
+            duracion > 0, integral_presion / duracion, P_aw[inicios]
+        )
+
+    return {
+        "inicio": inicios,
+        "duracion": duracion,
+        "volumen_tidal": np.maximum.reduceat(Vt, inicios)
+        - np.minimum.reduceat(Vt, inicios),
+        "volumen_inspirado": volumen_inspirado,
+        "presion_pico": np.maximum.reduceat(P_aw, inicios),
+        "presion_meseta": np.maximum.reduceat(P_alv, inicios),
+        "presion_media": presion_media,
+        "volumen_fin_espiracion": Vt[finales],
+        "auto_peep": P_alv[finales],
+    }
@@ -0,0 +1,55 @@
+# Librerías
+import numpy as np
+
+from . import resultado as resultado_util
+
+
+def simular_escenario(segmentos, pasos_por_ciclo: int = None, estado=None) -> dict:
+    """
+    Simula sin interrupción una secuencia de configuraciones.
+
+    `segmentos` es una lista de (simulador, fin_s): cada simulador (con su
+    paciente, ventilador y, en ESPONTANEO, control) continúa desde el
+    estado_final del anterior (volúmenes, tiempo, PaCO2 y controlador) y
+    simula con iterar_hasta hasta el primer fin de ciclo en fin_s o
+    después; el cambio de configuración ocurre siempre en un límite de
+    ciclo. Un segmento que empieza en su fin_s o después no simula ningún
+    ciclo. Solo el último segmento conserva el punto final de su último
+    ciclo (en los demás es la primera muestra del siguiente).
+
+    `estado` es el de partida (por defecto, volúmenes nulos en t = 0) y
+    `pasos_por_ciclo` el de iterar_hasta (por defecto, 200 en PCV y VCV y
+    100 en ESPONTANEO).
+
+    Returns
+    -------
+    dict con "t", "V1" y "V2" (filas de un único arreglo), "inicios" (la
+    muestra en que empieza cada ciclo), "limites" (la primera muestra de
+    cada segmento más el total de muestras) y "estado_final".
+    """
+    ciclos, limites, n = [], [], 0
+    for i, (simulador, fin_s) in enumerate(segmentos):
+        limites.append(n)
+        pasos = pasos_por_ciclo or (
+            100 if simulador.ventilador.modo == "ESPONTANEO" else 200
+        )
+        propios = list(simulador.iterar_hasta(fin_s, pasos, estado))
+        if not propios:
+            continue
+        if i < len(segmentos) - 1 and simulador.ventilador.modo != "ESPONTANEO":
+            propios[-1] = tuple(senal[:-1] for senal in propios[-1])
+        ciclos.extend(propios)
+        n += sum(len(ciclo[0]) for ciclo in propios)
+        estado = simulador.estado_final
+    limites.append(n)
+
+    dtype = segmentos[0][0].dtype if segmentos else "float64"
+    datos, inicios = resultado_util.llenar(ciclos, resultado_util.reservar(n, dtype))
+    return {
+        "t": datos[0],
+        "V1": datos[1],
+        "V2": datos[2],
+        "inicios": inicios,
+        "limites": np.array(limites),
+        "estado_final": estado,
+    }
@@ -0,0 +1,91 @@
+# Librerías
+import math
+from typing import Optional
+
+
+class EstadoSimulacion:
+    """
+    Instantánea serializable del estado de una simulación al final de una
+    respiración, suficiente para continuarla sin recalcular desde t = 0.
+
+    Atributos
+    ---------
+    V1, V2 : float
+        Volúmenes de cada compartimento (L).
+    t : float
+        Tiempo de la simulación (s) en que termina el último ciclo.
+    paco2 : float
+        PaCO2 estimada (mmHg) con la que el controlador ajusta el siguiente
+        ciclo (modo espontáneo).
+    integral_error : float
+        Acumulador del término integral de ControlRespiratorio.
+    amplitud, frecuencia : float o None
+        Salidas del controlador en el último ciclo (cmH2O y Hz); None si
+        aún no ha actuado.
+    """
+
+    CAMPOS = ("V1", "V2", "t", "paco2", "integral_error", "amplitud", "frecuencia")
+
+    def __init__(
+        self,
+        V1: float = 0.0,
+        V2: float = 0.0,
+        t: float = 0.0,
+        paco2: float = 55.0,  # Condición inicial de simular_espontaneo
+        integral_error: float = 0.0,
+        amplitud: Optional[float] = None,
+        frecuencia: Optional[float] = None,
+    ):
+        self.V1 = float(V1)
+        self.V2 = float(V2)
+        self.t = float(t)
+        self.paco2 = float(paco2)
+        self.integral_error = float(integral_error)
+        self.amplitud = None if amplitud is None else float(amplitud)
+        self.frecuencia = None if frecuencia is None else float(frecuencia)
+        for campo in self.CAMPOS:
+            valor = getattr(self, campo)
+            if valor is not None and not math.isfinite(valor):
+                raise ValueError(f"Estado de simulación no finito en '{campo}'")
+        if self.t < 0:
+            raise ValueError("El tiempo del estado de simulación no puede ser negativo")
+        if (self.amplitud is None) != (self.frecuencia is None):
+            raise ValueError("'amplitud' y 'frecuencia' se definen juntas o ninguna")
+
+    @property
+    def V0(self) -> list[float]:
+        """Volúmenes como condición inicial [V1, V2] de los integradores."""
+        return [self.V1, self.V2]
+
+    def a_dict(self) -> dict:
+        """Representación como diccionario de tipos nativos (JSON)."""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "EstadoSimulacion":
+        """Inversa de a_dict; lanza ValueError ante campos desconocidos."""
+        desconocidos = set(datos) - set(cls.CAMPOS)
+        if desconocidos:
+            raise ValueError(
+                "Campos desconocidos en el estado de simulación: "
+                f"{sorted(desconocidos)}"
+            )
+        return cls(**datos)
+
+    def restaurar_control(self, control, ventilador) -> None:
+        """Devuelve al controlador (y a la frecuencia del ventilador, que el
+        lazo espontáneo modifica) el estado guardado."""
+        control.integral_error = self.integral_error
+        control.amplitud = self.amplitud
+        control.frecuencia = self.frecuencia
+        if self.frecuencia is not None:
+            ventilador.fr = self.frecuencia * 60.0
+
+    def __eq__(self, otro) -> bool:
+        if not isinstance(otro, EstadoSimulacion):
+            return NotImplemented
+        return self.a_dict() == otro.a_dict()
+
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{k}={v!r}" for k, v in self.a_dict().items())
+        return f"EstadoSimulacion({campos})"
@@ -0,0 +1,268 @@
+# Librerías
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+# Parámetros del ajuste: log τ1, log C1, log τ2, log C2, V1(0), V2(0)
+_N_PARAMETROS = 6
+
+# Relaciones τ2/τ1 de los puntos de partida (alrededor de la τ del ajuste
+# unicompartimental); el modelo es simétrico, por lo que basta τ1 <= τ2
+_PARTIDAS = ((0.5, 2.0), (0.25, 4.0), (0.9, 1.1))
+
+
+def _malla_uniforme(t: np.ndarray, *senales: np.ndarray):
+    """Devuelve el paso y las señales sobre una malla uniforme. Si el
+    muestreo ya es uniforme (variación < 0.1 %) no se interpola."""
+    dt = np.diff(t)
+    h = float(np.median(dt))
+    if np.all(np.abs(dt - h) <= 1e-3 * h):
+        return h, senales
+    malla = np.arange(t[0], t[-1] + 0.5 * h, h)
+    return h, tuple(None if s is None else np.interp(malla, t, s) for s in senales)
+
+
+def ajustar_unicompartimental(
+    presion: np.ndarray, flujo: np.ndarray, volumen: np.ndarray
+) -> dict:
+    """
+    Ecuación de movimiento de un compartimento, P = R·Q + E·V + P0, por
+    mínimos cuadrados lineales. El desplazamiento del volumen medido queda
+    absorbido en P0. C es None si la elastancia ajustada no es positiva.
+    """
+    A = np.column_stack([flujo, volumen, np.ones_like(flujo)])
+    (R, E, P0), *_ = np.linalg.lstsq(A, presion, rcond=None)
+    return {"R": float(R), "C": float(1 / E) if E > 0 else None, "P0": float(P0)}
+
+
+def _respuesta_compartimento(
+    presion: np.ndarray, h: float, tau: float, C: float, V0: float
+):
+    """
+    Volumen de un compartimento, dV/dt = (C·P - V)/τ, con la presión lineal
+    entre muestras (solución exacta en cada intervalo):
+
+        V[n] = α·V[n-1] + β1·P[n] + β0·P[n-1],   α = e^(-h/τ)
+
+    Devuelve V y sus derivadas respecto a log τ, log C y V(0). La derivada
+    respecto a τ es la de la recursión discreta, que es otra recursión con
+    el mismo α; ambas se evalúan como filtros IIR.
+    """
+    from scipy.signal import lfilter
+
+    n = len(presion)
+    alfa = math.exp(-h / tau)
+    u = tau * (1 - alfa) / h
+    b1, b0 = C * (1 - u), C * (u - alfa)
+
+    forzada = np.zeros(n)
+    forzada[1:] = lfilter([b1, b0], [1.0, -alfa], presion[1:], zi=[b0 * presion[0]])[0]
+    decaimiento = alfa ** np.arange(n)
+    V = forzada + V0 * decaimiento
+
+    d_alfa = alfa * h / tau**2
+    d_u = ((1 - alfa) - tau * d_alfa) / h
+    entrada = (
+        d_alfa * V[:-1] - C * d_u * presion[1:] + C * (d_u - d_alfa) * presion[:-1]
+    )
+    dV_dtau = np.zeros(n)
+    dV_dtau[1:] = lfilter([1.0], [1.0, -alfa], entrada)
+
+    # La parte forzada es proporcional a C: su derivada respecto a log C es ella misma
+    return V, tau * dV_dtau, forzada, decaimiento
+
+
+def _modelo(theta: np.ndarray, presion: np.ndarray, h: float):
+    """Flujo total del modelo bicompartimental y su jacobiano (n, 6)."""
+    flujo = np.zeros(len(presion))
+    jacobiano = np.empty((len(presion), _N_PARAMETROS))
+    for i in range(2):
+        tau, C = math.exp(theta[2 * i]), math.exp(theta[2 * i + 1])
+        V, dV_dlog_tau, dV_dlog_C, dV_dV0 = _respuesta_compartimento(
+            presion, h, tau, C, theta[4 + i]
+        )
+        flujo_i = (C * presion - V) / tau
+        flujo += flujo_i
+        jacobiano[:, 2 * i] = -flujo_i - dV_dlog_tau / tau
+        jacobiano[:, 2 * i + 1] = (C * presion - dV_dlog_C) / tau
+        jacobiano[:, 4 + i] = -dV_dV0 / tau
+    return flujo, jacobiano
+
+
+def estimar_mecanica(
+    t,
+    presion,
+    flujo=None,
+    volumen=None,
+    nivel_confianza: float = 0.95,
+) -> dict:
+    """
+    Estima R1, C1, R2 y C2 del modelo bicompartimental de Paciente a partir
+    de un registro de ventilador.
+
+    La presión en la vía aérea medida es la entrada del modelo y se ajusta
+    el flujo total (error de salida) con Levenberg-Marquardt, en escala
+    logarítmica para τ = R·C y C (lo que mantiene los parámetros positivos),
+    más los volúmenes iniciales de cada compartimento. Cada evaluación es
+    la respuesta exacta del modelo lineal con la presión lineal entre
+    muestras y su jacobiano analítico, ambos como filtros IIR: el costo es
+    lineal en el número de muestras. El punto de partida sale del ajuste
+    unicompartimental por mínimos cuadrados lineales; se prueban varias
+    relaciones τ2/τ1 y se conserva el mejor ajuste.
+
+    Los intervalos de confianza son los asintóticos de la matriz de
+    covarianza s²·(JᵀJ)⁻¹, inflada por (1 + ρ)/(1 - ρ) según la
+    autocorrelación de primer orden ρ de los residuos (las muestras de una
+    señal de ventilador no son independientes). Se calculan en escala
+    logarítmica, por lo que son asimétricos. El compartimento 1 es el de
+    constante de tiempo menor. Si el registro no identifica los seis
+    parámetros (presión o flujo constantes, o ambas constantes de tiempo
+    iguales, en que el reparto entre compartimentos queda indeterminado)
+    se lanza ValueError en lugar de devolver un ajuste arbitrario.
+
+    Args:
+        t: Tiempos (s), crecientes. Si el muestreo no es uniforme, las
+            señales se interpolan a una malla uniforme
+        presion: Presión en la vía aérea (cmH2O)
+        flujo: Flujo total (L/s); si falta, se deriva del volumen
+        volumen: Volumen (L), con cualquier desplazamiento; si falta, se
+            integra el flujo
+        nivel_confianza: Nivel de los intervalos (0-1)
+
+    Returns:
+        Dict con "parametros" (valor e intervalo de R1, C1, R2, C2),
+        "constantes_tiempo", "unicompartimental" y "ajuste" (muestras,
+        error cuadrático medio y R² del flujo, evaluaciones, autocorrelación)
+    """
+    from scipy.optimize import least_squares
+
+    t = np.asarray(t, dtype=float)
+    presion = np.asarray(presion, dtype=float)
+    flujo = None if flujo is None else np.asarray(flujo, dtype=float)
+    volumen = None if volumen is None else np.asarray(volumen, dtype=float)
+    if flujo is None and volumen is None:
+        raise ValueError("Se requiere el flujo o el volumen.")
+    for nombre, senal in (("presion", presion), ("flujo", flujo), ("volumen", volumen)):
+        if senal is not None and senal.shape != t.shape:
+            raise ValueError(f"'{nombre}' debe tener la misma longitud que 't'.")
+        if senal is not None and not np.all(np.isfinite(senal)):
+            raise ValueError(f"'{nombre}' contiene valores no finitos.")
+    if t.ndim != 1 or len(t) < 20:
+        raise ValueError("Se requieren al menos 20 muestras.")
+    if not np.all(np.diff(t) > 0):
+        raise ValueError("Los tiempos deben ser estrictamente crecientes.")
+    if not 0 < nivel_confianza < 1:
+        raise ValueError("El nivel de confianza debe estar entre 0 y 1.")
+
+    h, (presion, flujo, volumen) = _malla_uniforme(t, presion, flujo, volumen)
+    if flujo is None:
+        flujo = np.gradient(volumen, h)
+    if volumen is None:
+        volumen = np.concatenate(([0.0], np.cumsum((flujo[1:] + flujo[:-1]) * h / 2)))
+    n = len(presion)
+    for nombre, senal in (("presión", presion), ("flujo", flujo)):
+        if np.ptp(senal) <= 1e-9 * max(float(np.max(np.abs(senal))), 1.0):
+            raise ValueError(
+                f"La señal de {nombre} es constante: el registro no permite "
+                "estimar la mecánica."
+            )
+
+    unico = ajustar_unicompartimental(presion, flujo, volumen)
+    C0 = unico["C"] or 0.05
+    tau0 = max(unico["R"], 1e-3) * C0
+
+    # least_squares pide residuos y jacobiano por separado en el mismo
+    # punto: se evalúan juntos y se reutilizan
+    ultimo = {}
+
+    def evaluar(theta):
+        if ultimo.get("theta") is None or not np.array_equal(ultimo["theta"], theta):
+            ultimo["theta"] = theta.copy()
+            ultimo["flujo"], ultimo["jacobiano"] = _modelo(theta, presion, h)
+        return ultimo
+
+    def residuos(theta):
+        return evaluar(theta)["flujo"] - flujo
+
+    def jacobiano(theta):
+        return evaluar(theta)["jacobiano"]
+
+    mejor, evaluaciones = None, 0
+    for relacion1, relacion2 in _PARTIDAS:
+        theta0 = np.array(
+            [
+                math.log(tau0 * relacion1),
+                math.log(C0 / 2),
+                math.log(tau0 * relacion2),
+                math.log(C0 / 2),
+                C0 / 2 * presion[0],
+                C0 / 2 * presion[0],
+            ]
+        )
+        ajuste = least_squares(
+            residuos, theta0, jac=jacobiano, method="lm", x_scale="jac"
+        )
+        evaluaciones += ajuste.nfev
+        if mejor is None or ajuste.cost < mejor.cost:
+            mejor = ajuste
+
+    theta, r = mejor.x, mejor.fun
+    J = jacobiano(theta)
+
+    # Compartimento 1: el de constante de tiempo menor
+    if theta[2] < theta[0]:
+        orden = [2, 3, 0, 1, 5, 4]
+        theta, J = theta[orden], J[:, orden]
+
+    # (JᵀJ)⁻¹ = V·S⁻²·Vᵀ a partir de la SVD de J, sin formar JᵀJ (que
+    # eleva al cuadrado su condicionamiento)
+    _, singulares, Vt = np.linalg.svd(J, full_matrices=False)
+    if singulares[-1] <= singulares[0] * max(J.shape) * np.finfo(float).eps:
+        raise ValueError(
+            "El registro no identifica los parámetros de ambos compartimentos "
+            "(jacobiano de rango incompleto; p. ej. constantes de tiempo iguales)."
+        )
+
+    rss = float(r @ r)
+    s2 = rss / max(n - _N_PARAMETROS, 1)
+    rho = float(np.clip((r[1:] @ r[:-1]) / rss, 0.0, 0.99)) if rss > 0 else 0.0
+    covarianza = s2 * (1 + rho) / (1 - rho) * ((Vt.T / singulares**2) @ Vt)
+    z = NormalDist().inv_cdf(0.5 + nivel_confianza / 2)
+
+    def estimacion(gradiente):
+        # Valor e intervalo de exp(gradiente · θ) (combinación de logaritmos)
+        gradiente = np.asarray(gradiente, dtype=float)
+        log_valor = float(gradiente @ theta)
+        desvio = math.sqrt(max(float(gradiente @ covarianza @ gradiente), 0.0))
+        return {
+            "valor": math.exp(log_valor),
+            "ic": [math.exp(log_valor - z * desvio), math.exp(log_valor + z * desvio)],
+        }
+
+    # log R = log τ - log C
+    parametros = {
+        "R1": estimacion([1, -1, 0, 0, 0, 0]),
+        "C1": estimacion([0, 1, 0, 0, 0, 0]),
+        "R2": estimacion([0, 0, 1, -1, 0, 0]),
+        "C2": estimacion([0, 0, 0, 1, 0, 0]),
+    }
+    variacion = float(np.sum((flujo - flujo.mean()) ** 2))
+    return {
+        "parametros": parametros,
+        "constantes_tiempo": {
+            "tau1": math.exp(theta[0]),
+            "tau2": math.exp(theta[2]),
+        },
+        "unicompartimental": unico,
+        "ajuste": {
+            "muestras": n,
+            "paso_s": h,
+            "rmse_flujo": math.sqrt(rss / n),
+            "r2_flujo": 1 - rss / variacion if variacion > 0 else None,
+            "evaluaciones": evaluaciones,
+            "autocorrelacion_residuos": rho,
+            "volumenes_iniciales": [float(theta[4]), float(theta[5])],
+            "nivel_confianza": nivel_confianza,
+        },
+    }
@@ -1,6 +1,6 @@
 # Librerías
-import numpy as np
 from .ventilador import Ventilador
+from . import oxigeno
 
 
 class InteraccionCorazonPulmon:
@@ -15,6 +15,7 @@ class InteraccionCorazonPulmon:
         GC_base_L_min: float = 5.0,
         k_sensibilidad: float = 0.1,
         hb_g_dl: float = 15.0,
+        curva_o2: str = "lineal",
     ):
         """
         Inicializa el estado cardiovascular basal del paciente.
@@ -30,28 +31,28 @@ class InteraccionCorazonPulmon:
             disfunción cardíaca.
         hb_g_dl : float
             Concentración de hemoglobina en g/dL.
+        curva_o2 : str
+            Curva de disociación de la hemoglobina (ver oxigeno.CURVAS).
         """
+        if curva_o2 not in oxigeno.CURVAS:
+            raise ValueError(
+                f"Curva de disociación desconocida: {curva_o2}. "
+                f"Opciones: {oxigeno.CURVAS}"
+            )
         self.GC_base_L_min = GC_base_L_min
         self.k_sensibilidad = k_sensibilidad
         self.hb_g_dl = hb_g_dl
+        self.curva_o2 = curva_o2
         # Constantes fisiológicas
-        self.O2_CAP_HB = 1.34  # Capacidad de O2 por gramo de Hb (mL O2/g Hb)
-        self.O2_SOL_PLASMA = 0.003  # Solubilidad de O2 en plasma (mL O2/dL/mmHg)
+        self.O2_CAP_HB = oxigeno.O2_CAP_HB  # mL O2/g Hb
+        self.O2_SOL_PLASMA = oxigeno.O2_SOL_PLASMA  # mL O2/dL/mmHg
 
     def _estimar_sao2(self, pao2: float) -> float:
         """
-        Estima la SaO2 a partir de la PaO2.
-        NOTA: Simplificación educativa; no implementa la curva de disociación
-        de la hemoglobina (Ecuación de Hill).
+        Estima la SaO2 a partir de la PaO2 con la curva configurada
+        (ver oxigeno.saturacion).
         """
-        if pao2 >= 100:
-            return 1.0
-        elif pao2 >= 60:
-            # Aproximación lineal груба entre 90% (a 60 mmHg) y 100% (a 100 mmHg)
-            return 0.90 + 0.10 * ((pao2 - 60) / 40)
-        else:
-            # Aproximación para hipoxemia severa
-            return 0.90 * (pao2 / 60)
+        return oxigeno.saturacion(pao2, self.curva_o2)
 
     def calcular(
         self,
@@ -82,17 +83,11 @@ class InteraccionCorazonPulmon:
             CAO2_ml_dl: Contenido arterial de O2.
             DO2_ml_min: Entrega de oxígeno a los tejidos.
         """
-        t = resultados_mecanica["t"]
-        P_aw = resultados_mecanica["P_aw"]
         PAO2_mmHg = resultados_gases["PAO2_mmHg"]
 
-        # 1. Calcular Presión Media en la Vía Aérea (P_mean)
-        # Se integra el área bajo la curva de presión y se divide por la duración
-        tiempo_total_ciclo = t[-1] - t[-2 - 1] if len(t) > 1 else t[-1]
-        p_aw_ultimo_ciclo = P_aw[t >= t[-1] - tiempo_total_ciclo]
-        t_ultimo_ciclo = t[t >= t[-1] - tiempo_total_ciclo]
-        area_bajo_curva = np.trapz(p_aw_ultimo_ciclo, t_ultimo_ciclo)
-        P_mean = area_bajo_curva / (t_ultimo_ciclo[-1] - t_ultimo_ciclo[0])
+        # 1. Presión Media en la Vía Aérea (P_mean) de la última respiración:
+        # área bajo la curva de presión dividida por la duración del ciclo
+        P_mean = resultados_mecanica["por_ciclo"]["presion_media"][-1]
 
         # 2. Calcular Gasto Cardíaco Actual
         # GC_actual = GC_base - k * (P_mean - PEEP_base)
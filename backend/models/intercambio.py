@@ -1,7 +1,7 @@
 # Librerías
-import numpy as np
 from .ventilador import Ventilador
 from .hemodinamica import InteraccionCorazonPulmon
+from . import oxigeno
 
 
 class IntercambioGases:
@@ -43,7 +43,7 @@ class IntercambioGases:
         ----------
         resultados : dict
             Diccionario de salida de Simulador.procesar_resultados(),
-            con claves 't' (tiempo) y 'Vt' (volumen total alveolar, L).
+            con las métricas por respiración en 'por_ciclo'.
 
         Devuelve
         -------
@@ -54,7 +54,6 @@ class IntercambioGases:
             PAO2_mmHg: presión alveolar de O2 (mmHg)
             PaO2_mmHg: presión arterial de O2 (mmHg)
         """
-        t = resultados["t"]
         # 1. Frecuencia respiratoria (ciclos/min)
         f = self.ventilador.fr
 
@@ -62,16 +61,8 @@ class IntercambioGases:
         if self.ventilador.modo == "VCV":
             VT = self.ventilador.Vt
         else:
-            flujo = resultados["flow"]
-            flujo_inspiratorio = np.maximum(0, flujo)
-            volumen_inspirado_total = np.trapz(flujo_inspiratorio, t)
-            duracion_chunk = t[-1] - t[0] if len(t) > 1 else 0
-            num_respiraciones = duracion_chunk * (f / 60.0)
-            VT = (
-                volumen_inspirado_total / num_respiraciones
-                if num_respiraciones > 0
-                else 0
-            )
+            # Volumen inspirado en la última respiración del registro
+            VT = resultados["por_ciclo"]["volumen_inspirado"][-1]
 
         # 3. Ventilaciones minuto
         VE = VT * f
@@ -98,10 +89,9 @@ class IntercambioGases:
         # Se requiere el contenido de O2 en sangre capilar (CcO2), arterial (CaO2) y venosa mixta (CvO2)
 
         # Contenido de O2 en sangre capilar final (asumiendo equilibrio con PAO2)
-        sao2_capilar = self.hemodinamica._estimar_sao2(PAO2)
-        CcO2 = (
-            self.hemodinamica.hb_g_dl * sao2_capilar * self.hemodinamica.O2_CAP_HB
-        ) + (PAO2 * self.hemodinamica.O2_SOL_PLASMA)
+        hb = self.hemodinamica.hb_g_dl
+        curva = self.hemodinamica.curva_o2
+        CcO2 = oxigeno.contenido_o2(PAO2, hb, curva)
 
         # Contenido de O2 en sangre venosa mixta (estimación)
         # Asumimos una extracción de O2 de 5 mL/dL (diferencia arterio-venosa normal)
@@ -116,21 +106,7 @@ class IntercambioGases:
         CaO2 = (CcO2 * (1 - self.Qs_Qt)) + (CvO2_estimado * self.Qs_Qt)
 
         # Calcular PaO2 a partir de CaO2 (inverso de la ecuación de contenido)
-        # Esta es una aproximación, ya que la relación no es lineal.
-        # PaO2 ≈ (CaO2 - O2_disuelto) / (Hb * 1.34 * SaO2_estimada)
-        # Para simplificar, usamos una búsqueda iterativa o una aproximación lineal.
-
-        # Aproximación para encontrar PaO2 desde CaO2 (requiere _estimar_sao2)
-        PaO2_estimada = 0
-        for p_test in range(20, 150):
-            sao2_test = self.hemodinamica._estimar_sao2(p_test)
-            cao2_test = (
-                self.hemodinamica.hb_g_dl * sao2_test * self.hemodinamica.O2_CAP_HB
-            ) + (p_test * self.hemodinamica.O2_SOL_PLASMA)
-            if cao2_test >= CaO2:
-                PaO2_estimada = p_test
-                break
-        PaO2_estimada = PaO2_estimada if PaO2_estimada > 0 else PAO2 * (1 - self.Qs_Qt)
+        PaO2_estimada = oxigeno.po2_desde_contenido(CaO2, hb, curva)
 
         return {
             "VE_min": VE,
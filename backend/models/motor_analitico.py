@@ -0,0 +1,294 @@
+# Librerías
+import numpy as np
+
+# Por debajo de este valor (1/s) un autovalor se considera nulo: el modo
+# correspondiente integra la entrada en lugar de relajarse exponencialmente.
+_LAMBDA_MIN = 1e-10
+
+
+def _columna(valor, n: int) -> np.ndarray:
+    """Convierte un escalar o secuencia en un arreglo float de forma (n,)."""
+    return np.broadcast_to(np.asarray(valor, dtype=float), (n,)).copy()
+
+
+class _Fase:
+    """
+    Fase del ciclo respiratorio con dinámica lineal de coeficientes constantes:
+
+        dV/dt = G · diag(E) · V + b
+
+    donde G es una matriz simétrica de conductancias y E el vector de
+    elastancias. Como G·diag(E) es semejante a la matriz simétrica
+    diag(√E)·G·diag(√E), se diagonaliza con `eigh` y la exponencial
+    matricial se evalúa en coordenadas modales.
+
+    Todas las magnitudes llevan un eje inicial de lote (configuraciones).
+    """
+
+    def __init__(self, G: np.ndarray, E: np.ndarray, b: np.ndarray):
+        d = np.sqrt(E)
+        simetrica = d[:, :, None] * G * d[:, None, :]
+        self.lam, U = np.linalg.eigh(simetrica)
+        # V = S·z  y  z = W·V, con W = S⁻¹
+        self.S = U / d[:, :, None]
+        self.W = np.swapaxes(U, -1, -2) * d[:, None, :]
+        self.beta = np.einsum("bnm,bm->bn", self.W, b)
+        self._nulo = np.abs(self.lam) < _LAMBDA_MIN
+        self._lam_seguro = np.where(self._nulo, 1.0, self.lam)
+
+    def _factores(self, tau: np.ndarray):
+        """exp(λτ) y ∫₀^τ exp(λs) ds para cada modo, con `tau` de forma (B, ...)."""
+        forma = (tau.shape[0],) + (1,) * (tau.ndim - 1) + (-1,)
+        lam = self.lam.reshape(forma)
+        lt = lam * tau[..., None]
+        phi = np.where(
+            self._nulo.reshape(forma),
+            tau[..., None],
+            np.expm1(lt) / self._lam_seguro.reshape(forma),
+        )
+        return np.exp(lt), phi
+
+    def transicion(self, duracion: np.ndarray, previo=None):
+        """
+        Mapa afín exacto V(τ) = Φ(τ)·V(0) + Γ(τ) tras una duración τ dentro de
+        la fase, compuesto opcionalmente con un mapa `previo` (Φ0, Γ0) que
+        lleva hasta el inicio de la fase. `duracion` tiene forma (B,) o
+        (B, K); devuelve Φ con forma (B, [K,] N, N) y Γ con forma (B, [K,] N).
+
+        Φ(τ) = Σ_m exp(λ_m τ)·S[:, m]·W[m, :] se evalúa como combinación de
+        proyectores espectrales: un único producto matricial sobre la malla
+        en lugar de un producto 2×2 por muestra.
+        """
+        B, N = self.lam.shape
+        forma = (B,) + (1,) * (duracion.ndim - 1) + (N,)
+        exp_lt, phi = self._factores(duracion)
+        W = self.W
+        z = phi * self.beta.reshape(forma)
+        if previo is not None:
+            Phi0, Gamma0 = previo
+            z = z + exp_lt * np.einsum("bnm,bm->bn", self.W, Gamma0).reshape(forma)
+            W = W @ Phi0
+        proyectores = (self.S[:, :, :, None] * W[:, None, :, :]).transpose(0, 2, 1, 3)
+        Phi = exp_lt.reshape(B, -1, N) @ proyectores.reshape(B, N, N * N)
+        Gamma = z.reshape(B, -1, N) @ np.swapaxes(self.S, -1, -2)
+        return (
+            Phi.reshape(duracion.shape + (N, N)),
+            Gamma.reshape(duracion.shape + (N,)),
+        )
+
+
+class MotorAnalitico:
+    """
+    Solución exacta del modelo lineal de compartimentos R/C en PCV y VCV.
+
+    En ambos modos la entrada del ventilador es constante a trozos (presión
+    en PCV; flujo en la inspiración de VCV y PEEP en la espiración), así que
+    dentro de cada fase del ciclo el sistema es dV/dt = A·V + b con A y b
+    constantes. Los volúmenes se obtienen directamente sobre la malla de
+    tiempos con exponenciales matriciales, sin llamar a un integrador de EDOs.
+
+    La implementación es vectorizada sobre un eje de configuraciones: R y C
+    tienen forma (B, N) y los parámetros del ventilador forma (B,). Un único
+    paciente corresponde a B = 1.
+    """
+
+    def __init__(
+        self,
+        R,
+        C,
+        modo,
+        PEEP,
+        P_driving,
+        fr,
+        Ti,
+        Vt=None,
+    ):
+        self.R = np.atleast_2d(np.asarray(R, dtype=float))
+        self.C = np.atleast_2d(np.asarray(C, dtype=float))
+        B = self.R.shape[0]
+        self.n_configuraciones = B
+
+        modo = np.broadcast_to(np.asarray(modo), (B,))
+        if not set(modo.tolist()) <= {"PCV", "VCV"}:
+            raise ValueError("El motor analítico solo admite los modos PCV y VCV.")
+        self.es_vcv = modo == "VCV"
+
+        self.PEEP = _columna(PEEP, B)
+        self.P_driving = _columna(P_driving, B)
+        self.fr = _columna(fr, B)
+        if np.any(self.fr <= 0):
+            raise ValueError("La frecuencia respiratoria debe ser mayor que cero.")
+        self.T_total = 60.0 / self.fr
+        Ti = _columna(Ti, B)
+        self.Ti = np.minimum(Ti, self.T_total)
+
+        if np.any(self.es_vcv):
+            if Vt is None or np.any(np.isnan(_columna(Vt, B)[self.es_vcv])):
+                raise ValueError("Se requiere Vt para modo VCV")
+            flujo = np.where(self.es_vcv, _columna(Vt, B) / Ti, 0.0)
+        else:
+            flujo = np.zeros(B)
+
+        g = 1.0 / self.R
+        E = 1.0 / self.C
+        G_presion = -g[:, :, None] * np.eye(g.shape[1])
+        # Inspiración en VCV: la presión en la vía aérea se ajusta para que
+        # la suma de los flujos compartimentales sea el flujo programado.
+        G_flujo = (
+            G_presion + (g[:, :, None] * g[:, None, :]) / g.sum(axis=1)[:, None, None]
+        )
+        b_presion_insp = g * (self.PEEP + self.P_driving)[:, None]
+        b_flujo = g * (flujo / g.sum(axis=1))[:, None]
+
+        vcv = self.es_vcv[:, None]
+        self._insp = _Fase(
+            np.where(vcv[:, :, None], G_flujo, G_presion),
+            E,
+            np.where(vcv, b_flujo, b_presion_insp),
+        )
+        self._esp = _Fase(G_presion, E, g * self.PEEP[:, None])
+        # Transición de la inspiración completa, común a todos los ciclos
+        self._Phi_i, self._Gamma_i = self._insp.transicion(self.Ti)
+
+    @classmethod
+    def desde_modelos(cls, paciente, ventilador) -> "MotorAnalitico":
+        """Construye el motor para un único par Paciente/Ventilador."""
+        return cls(
+            R=[[paciente.R1, paciente.R2]],
+            C=[[paciente.C1, paciente.C2]],
+            modo=ventilador.modo,
+            PEEP=ventilador.PEEP,
+            P_driving=ventilador.P_driving,
+            fr=ventilador.fr,
+            Ti=ventilador.Ti,
+            Vt=ventilador.Vt,
+        )
+
+    def mapa_ciclo(self):
+        """
+        Mapa afín exacto de un ciclo completo: V(T_total) = P·V(0) + q.
+        Devuelve P (B, N, N) y q (B, N).
+        """
+        return self._esp.transicion(
+            self.T_total - self.Ti, previo=(self._Phi_i, self._Gamma_i)
+        )
+
+    def estado_estacionario(self) -> np.ndarray:
+        """
+        Punto fijo V* = P·V* + q del mapa de un ciclo, es decir, el estado al
+        inicio de cada ciclo en régimen periódico. Devuelve (B, N).
+        """
+        if np.any(self.es_vcv & (self.Ti >= self.T_total)):
+            raise ValueError(
+                "Sin fase espiratoria el volumen crece sin límite: "
+                "no existe estado estacionario."
+            )
+        P, q = self.mapa_ciclo()
+        identidad = np.eye(P.shape[-1])
+        return np.linalg.solve(identidad - P, q[..., None])[..., 0]
+
+    def _propagadores(self, tau: np.ndarray):
+        """
+        Mapas afines V(τ_k) = P_k·V(0) + q_k desde el inicio del ciclo hasta
+        cada tiempo relativo `tau` (B, K). Devuelve P (B, K, N, N) y q (B, K, N).
+        """
+        Ti = self.Ti[:, None]
+        Phi_i, Gamma_i = self._insp.transicion(np.minimum(tau, Ti))
+        P_esp, q_esp = self._esp.transicion(
+            np.maximum(tau - Ti, 0.0), previo=(self._Phi_i, self._Gamma_i)
+        )
+        en_insp = tau < Ti
+        return (
+            np.where(en_insp[..., None, None], Phi_i, P_esp),
+            np.where(en_insp[..., None], Gamma_i, q_esp),
+        )
+
+    def _evaluar_ciclos(self, tau: np.ndarray, V0: np.ndarray) -> np.ndarray:
+        """Volúmenes a los tiempos relativos `tau` (B, K), comunes a todos los
+        ciclos, cuyos estados iniciales son `V0` (B, C, N). Devuelve
+        (B, C, K, N)."""
+        P, q = self._propagadores(tau)
+        B, K, N, _ = P.shape
+        # V[b, c, k, n] = Σ_m V0[b, c, m]·P[b, k, n, m], como un único producto
+        # matricial (C × N)·(N × K·N) por configuración
+        Pt = P.transpose(0, 3, 1, 2).reshape(B, N, K * N)
+        return (V0 @ Pt).reshape(B, -1, K, N) + q[:, None]
+
+    def simular(
+        self,
+        tiempo_total_deseado: float = 15.0,
+        pasos_por_ciclo: int = 200,
+        V0=None,
+        num_ciclos: int = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Simula los ciclos necesarios para cubrir `tiempo_total_deseado` (más
+        dos de margen, igual que Simulador.simular) sobre la misma malla de
+        tiempos que el integrador numérico. Si se indica `num_ciclos`, todas
+        las configuraciones simulan exactamente ese número de ciclos. `V0` es
+        el estado inicial, (N,) o (B, N); por defecto, volúmenes nulos.
+
+        Devuelve t con forma (B, L) y V con forma (B, L, N). Si las
+        configuraciones requieren distinto número de ciclos, las muestras
+        sobrantes de las más cortas se rellenan con NaN.
+        """
+        B, N = self.R.shape
+        K = pasos_por_ciclo
+        if num_ciclos is None:
+            num_ciclos = np.ceil(tiempo_total_deseado / self.T_total).astype(int) + 2
+        else:
+            num_ciclos = np.full(B, num_ciclos)
+        C = int(num_ciclos.max())
+
+        # Estados al inicio de cada ciclo a partir del mapa de un ciclo
+        P, q = self.mapa_ciclo()
+        inicios = np.empty((B, C, N))
+        inicios[:, 0] = 0.0 if V0 is None else V0
+        for c in range(1, C):
+            inicios[:, c] = np.einsum("bnm,bm->bn", P, inicios[:, c - 1]) + q
+
+        # Malla relativa común a todos los ciclos (endpoint=False). El último
+        # ciclo de cada configuración incluye además su punto final, por lo
+        # que se evalúa aparte sobre su propia malla. Los propagadores se
+        # calculan una vez por malla y se aplican a todos los ciclos.
+        fila = np.arange(B)
+        ultimo = num_ciclos - 1
+        tau = (np.arange(K) / K) * self.T_total[:, None]
+        tau_fin = np.linspace(0.0, 1.0, K) * self.T_total[:, None]
+
+        V = self._evaluar_ciclos(tau, inicios)
+        V[fila, ultimo] = self._evaluar_ciclos(
+            tau_fin, inicios[fila, ultimo][:, None, :]
+        )[:, 0]
+        t = np.arange(C)[None, :, None] * self.T_total[:, None, None] + tau[:, None]
+        t[fila, ultimo] = (ultimo * self.T_total)[:, None] + tau_fin
+
+        sobrantes = np.arange(C)[None, :] >= num_ciclos[:, None]
+        if np.any(sobrantes):
+            t[sobrantes] = np.nan
+            V[sobrantes] = np.nan
+
+        return t.reshape(B, C * K), V.reshape(B, C * K, N)
+
+    def iterar_ciclos(self, num_ciclos: int, pasos_por_ciclo: int = 200, V0=None):
+        """
+        Versión incremental de simular con `num_ciclos` fijo: genera un ciclo
+        a la vez como (t, V) con formas (B, K) y (B, K, N), sobre la misma
+        malla y con los mismos valores. La memoria no crece con el número de
+        ciclos.
+        """
+        B, N = self.R.shape
+        K = pasos_por_ciclo
+        P, q = self.mapa_ciclo()
+        inicio = np.zeros((B, N)) if V0 is None else np.broadcast_to(V0, (B, N))
+
+        tau = (np.arange(K) / K) * self.T_total[:, None]
+        tau_fin = np.linspace(0.0, 1.0, K) * self.T_total[:, None]
+        P_k, q_k = self._propagadores(tau)
+        for c in range(num_ciclos):
+            if c == num_ciclos - 1:
+                P_k, q_k = self._propagadores(tau_fin)
+                tau = tau_fin
+            V = np.einsum("bknm,bm->bkn", P_k, inicio) + q_k
+            yield c * self.T_total[:, None] + tau, V
+            inicio = np.einsum("bnm,bm->bn", P, inicio) + q
@@ -0,0 +1,69 @@
+# Librerías
+import numpy as np
+
+
+class MotorEspontaneo:
+    """
+    Solución exacta de la mecánica en modo espontáneo para el lazo cerrado
+    de Simulador.
+
+    Sin ventilador, cada compartimento es un circuito RC independiente
+    excitado por la presión muscular de ControlRespiratorio.generar_Pmus:
+
+        R_i · dV_i/dt = P_mus(t) - E_i · V_i,
+        P_mus(t) = -A · max(0, sin(ω t)),   ω = 2π f
+
+    Entre dos ceros consecutivos de sin(ω t) la entrada es una senoide o es
+    nula, y la solución es la respuesta forzada de un filtro de primer orden
+    más un transitorio exponencial. Un ciclo se evalúa así en unas pocas
+    operaciones vectoriales sobre la malla de muestras, en lugar de una
+    integración RK45 paso a paso.
+    """
+
+    def __init__(self, R, E):
+        self.R = np.asarray(R, dtype=float)
+        self.E = np.asarray(E, dtype=float)
+        self.tau = self.R / self.E  # Constante de tiempo de cada compartimento
+
+    @classmethod
+    def desde_modelos(cls, paciente) -> "MotorEspontaneo":
+        return cls([paciente.R1, paciente.R2], [paciente.E1, paciente.E2])
+
+    def _forzada(self, t: np.ndarray, amplitud: float, omega: float) -> np.ndarray:
+        """Respuesta forzada (régimen senoidal) a P = -A·sin(ω t), forma
+        (..., 2)."""
+        wt = omega * self.tau
+        a = -amplitud / self.R * self.tau / (1 + wt**2)
+        fase = omega * np.asarray(t, dtype=float)[..., None]
+        return a * (np.sin(fase) - wt * np.cos(fase))
+
+    def ciclo(
+        self, V0, t0: float, t1: float, pasos: int, amplitud: float, frecuencia: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evalúa V(t) en np.linspace(t0, t1, pasos) partiendo de V(t0) = V0,
+        con amplitud (cmH2O) y frecuencia (Hz) constantes en el intervalo.
+        Devuelve t y V con forma (pasos, 2).
+        """
+        t = np.linspace(t0, t1, pasos)
+        V = np.empty((pasos, 2))
+        omega = 2 * np.pi * frecuencia
+
+        # Tramos delimitados por los ceros de sin(ω t) dentro de [t0, t1]
+        k = np.arange(np.floor(t0 * omega / np.pi) + 1, np.ceil(t1 * omega / np.pi))
+        bordes = np.concatenate(([t0], k * np.pi / omega, [t1]))
+        estado = np.asarray(V0, dtype=float)
+        for inicio, fin in zip(bordes[:-1], bordes[1:]):
+            activo = np.sin(omega * 0.5 * (inicio + fin)) > 0
+            en_tramo = (t >= inicio) & (t <= fin)
+            tiempos = np.append(t[en_tramo], fin)
+            decaimiento = np.exp(-(tiempos - inicio)[:, None] / self.tau)
+            if activo:
+                forzada = self._forzada(tiempos, amplitud, omega)
+                inicial = self._forzada(inicio, amplitud, omega)
+                valores = forzada + (estado - inicial) * decaimiento
+            else:
+                valores = estado * decaimiento
+            V[en_tramo] = valores[:-1]
+            estado = valores[-1]
+        return t, V
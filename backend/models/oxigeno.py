@@ -0,0 +1,74 @@
+# Librerías
+from functools import lru_cache
+
+import numpy as np
+
+CURVAS = ("lineal", "severinghaus")
+
+O2_CAP_HB = 1.34  # Capacidad de O2 por gramo de Hb (mL O2/g Hb)
+O2_SOL_PLASMA = 0.003  # Solubilidad de O2 en plasma (mL O2/dL/mmHg)
+
+# Malla de PaO2 de la tabla de inversión (mmHg). Incluye los quiebres de la
+# curva lineal (60 y 100 mmHg), de modo que su inversa es exacta.
+_PO2_MAX = 800.0
+_PASO_TABLA = 0.05
+
+
+def saturacion(po2, curva: str = "lineal"):
+    """
+    Saturación de la hemoglobina (0-1) para una PO2 en mmHg, escalar o
+    arreglo.
+
+    Curvas:
+        - "lineal": aproximación por tramos del simulador (0.90 a 60 mmHg,
+          1.0 desde 100 mmHg). Simplificación educativa.
+        - "severinghaus": curva de disociación de Severinghaus (1979),
+          S = 1 / (23400 / (P³ + 150·P) + 1).
+    """
+    po2 = np.asarray(po2, dtype=float)
+    if curva == "lineal":
+        sat = np.where(
+            po2 >= 100,
+            1.0,
+            np.where(po2 >= 60, 0.90 + 0.10 * ((po2 - 60) / 40), 0.90 * (po2 / 60)),
+        )
+    elif curva == "severinghaus":
+        p = np.maximum(po2, 0.0)
+        with np.errstate(divide="ignore"):
+            sat = 1.0 / (23400.0 / (p**3 + 150.0 * p) + 1.0)
+    else:
+        raise ValueError(
+            f"Curva de disociación desconocida: {curva}. Opciones: {CURVAS}"
+        )
+    return sat if sat.ndim else float(sat)
+
+
+def contenido_o2(po2, hb_g_dl: float = 15.0, curva: str = "lineal"):
+    """Contenido de O2 en sangre (mL O2/dL) a una PO2 dada: O2 unido a la
+    hemoglobina más O2 disuelto."""
+    return (
+        hb_g_dl * saturacion(po2, curva) * O2_CAP_HB
+        + np.asarray(po2, dtype=float) * O2_SOL_PLASMA
+    )
+
+
+@lru_cache(maxsize=32)
+def _tabla_contenido(hb_g_dl: float, curva: str) -> tuple[np.ndarray, np.ndarray]:
+    """Tabla monótona (contenido, PO2) para invertir contenido_o2."""
+    po2 = np.linspace(0.0, _PO2_MAX, int(round(_PO2_MAX / _PASO_TABLA)) + 1)
+    contenido = contenido_o2(po2, hb_g_dl, curva)
+    return contenido, po2
+
+
+def po2_desde_contenido(contenido, hb_g_dl: float = 15.0, curva: str = "lineal"):
+    """
+    Inversa de contenido_o2: PO2 (mmHg) que produce el contenido de O2 dado,
+    escalar o arreglo. El contenido es estrictamente creciente con la PO2
+    (el O2 disuelto crece aun con la hemoglobina saturada), por lo que la
+    inversa es única; se obtiene interpolando sobre una tabla precalculada
+    por (hb_g_dl, curva). Los contenidos fuera del rango 0-800 mmHg se
+    acotan a sus extremos.
+    """
+    tabla_contenido, tabla_po2 = _tabla_contenido(float(hb_g_dl), curva)
+    po2 = np.interp(contenido, tabla_contenido, tabla_po2)
+    return po2 if np.ndim(po2) else float(po2)
@@ -1,3 +1,7 @@
+# Librerías
+import numpy as np
+
+
 class Paciente:
     """Clase que define un paciente con parámetros normales;
     para agregar pacientes con patologías, crear una subclase con modificaciones
@@ -10,3 +14,55 @@ class Paciente:
         self.C2 = C2
         self.E1 = 1 / self.C1
         self.E2 = 1 / self.C2
+
+
+class PacienteMulticompartimental:
+    """
+    Paciente con N compartimentos R/C en paralelo (p. ej. un pulmón
+    heterogéneo de SDRA con decenas o cientos de unidades). Las
+    resistencias, compliancias y elastancias se guardan como arreglos de
+    forma (N,).
+    """
+
+    def __init__(self, R, C):
+        self.R = np.atleast_1d(np.asarray(R, dtype=float)).ravel()
+        self.C = np.atleast_1d(np.asarray(C, dtype=float)).ravel()
+        if self.R.shape != self.C.shape:
+            raise ValueError("R y C deben tener el mismo número de compartimentos.")
+        if np.any(self.R <= 0) or np.any(self.C <= 0):
+            raise ValueError("Las resistencias y compliancias deben ser positivas.")
+        self.E = 1 / self.C
+        self.n_compartimentos = len(self.R)
+
+    @classmethod
+    def desde_paciente(cls, paciente: Paciente) -> "PacienteMulticompartimental":
+        """Los dos compartimentos de un Paciente."""
+        return cls([paciente.R1, paciente.R2], [paciente.C1, paciente.C2])
+
+    @classmethod
+    def heterogeneo(
+        cls,
+        n: int,
+        R: float = 10.0,
+        C: float = 0.05,
+        dispersion: float = 0.5,
+        semilla=None,
+    ) -> "PacienteMulticompartimental":
+        """
+        `n` unidades con resistencias y compliancias lognormales
+        independientes (`dispersion` es el desvío de su logaritmo),
+        escaladas para que la resistencia equivalente en paralelo sea `R` y
+        la compliancia total `C`.
+        """
+        rng = np.random.default_rng(semilla)
+        r = np.exp(rng.normal(0.0, dispersion, n))
+        c = np.exp(rng.normal(0.0, dispersion, n))
+        return cls(R * r * np.sum(1 / r), C * c / np.sum(c))
+
+    @property
+    def conductancia_total(self) -> float:
+        return float(np.sum(1 / self.R))
+
+    @property
+    def compliancia_total(self) -> float:
+        return float(np.sum(self.C))
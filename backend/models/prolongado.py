@@ -0,0 +1,181 @@
+# Librerías
+from collections import deque
+
+import numpy as np
+
+
+class BufferCircular:
+    """
+    Últimas muestras de una simulación en un arreglo (filas, capacidad)
+    reservado una vez: cada ciclo se escribe a continuación del anterior y,
+    al llenarse, sobre los más antiguos. Solo se conservan ciclos completos.
+    """
+
+    def __init__(self, capacidad: int, filas: int = 3, dtype="float64"):
+        if capacidad < 1:
+            raise ValueError("La capacidad del buffer debe ser positiva.")
+        self.capacidad = capacidad
+        self._datos = np.empty((filas, capacidad), dtype=dtype)
+        # Muestras escritas en total y muestra (absoluta) en que empieza
+        # cada ciclo aún disponible
+        self._escritas = 0
+        self._inicios = deque()
+
+    def agregar(self, *senales: np.ndarray) -> None:
+        """Agrega un ciclo, una señal por fila."""
+        m = len(senales[0])
+        if m > self.capacidad:
+            raise ValueError("El ciclo no cabe en el buffer.")
+        posicion = self._escritas % self.capacidad
+        primera = min(m, self.capacidad - posicion)
+        for fila, senal in zip(self._datos, senales):
+            fila[posicion : posicion + primera] = senal[:primera]
+            fila[: m - primera] = senal[primera:]
+        self._inicios.append(self._escritas)
+        self._escritas += m
+        while self._inicios[0] < self._escritas - self.capacidad:
+            self._inicios.popleft()
+
+    def contenido(self) -> tuple[np.ndarray, np.ndarray]:
+        """Copia en orden cronológico de los ciclos disponibles, forma
+        (filas, n), y el índice de inicio de cada uno."""
+        if not self._inicios:
+            return self._datos[:, :0].copy(), np.array([], dtype=int)
+        primera = self._inicios[0]
+        indices = np.arange(primera, self._escritas) % self.capacidad
+        return (
+            np.take(self._datos, indices, axis=1),
+            np.array(self._inicios, dtype=int) - primera,
+        )
+
+
+class VolcadoNpy:
+    """
+    Escritura incremental de un archivo .npy con forma (muestras, columnas).
+
+    Las filas se añaden al final del archivo a medida que llegan, sin
+    conservarlas en memoria; la cabecera, que NumPy escribe con espacio de
+    reserva para que la primera dimensión crezca, se reescribe en su lugar
+    al cerrar. El resultado se abre sin cargarlo con
+    np.load(ruta, mmap_mode="r").
+    """
+
+    def __init__(self, ruta, columnas: int, dtype="float64"):
+        self.ruta = ruta
+        self.columnas = columnas
+        self.dtype = np.dtype(dtype)
+        self.filas = 0
+        self._archivo = open(ruta, "wb")
+        self._escribir_cabecera()
+
+    def _escribir_cabecera(self) -> None:
+        self._archivo.seek(0)
+        np.lib.format.write_array_header_1_0(
+            self._archivo,
+            {
+                "descr": np.lib.format.dtype_to_descr(self.dtype),
+                "fortran_order": False,
+                "shape": (self.filas, self.columnas),
+            },
+        )
+
+    def agregar(self, *senales: np.ndarray) -> None:
+        """Añade las muestras de un bloque, una señal por columna."""
+        bloque = np.empty((len(senales[0]), self.columnas), dtype=self.dtype)
+        for columna, senal in enumerate(senales):
+            bloque[:, columna] = senal
+        bloque.tofile(self._archivo)
+        self.filas += len(bloque)
+
+    def cerrar(self) -> None:
+        if self._archivo.closed:
+            return
+        self._escribir_cabecera()
+        self._archivo.close()
+
+
+class AgregadosPorMinuto:
+    """
+    Acumula las métricas de cada respiración (ver ciclos.metricas_por_ciclo)
+    y los valores de intercambio de gases en periodos de `periodo` segundos
+    (por defecto, minutos). Cada respiración cuenta en el periodo en que
+    empieza. Por periodo:
+
+        inicio_s            tiempo de inicio del periodo
+        ciclos              respiraciones que empiezan en él
+        presion_media       presión media en la vía aérea, ponderada por la
+                            duración de cada respiración
+        presion_pico        máxima presión pico
+        volumen_tidal       volumen tidal medio
+        ventilacion_minuto  volumen inspirado por minuto (L/min)
+        auto_peep           Auto-PEEP de la última respiración
+
+    más la media de cada valor de intercambio de gases.
+    """
+
+    def __init__(self, t0: float = 0.0, periodo: float = 60.0):
+        self.t0 = t0
+        self.periodo = periodo
+        self._periodos = []
+        self._actual = None
+
+    def agregar(self, metricas: dict, gases: dict = None) -> None:
+        """Agrega una respiración: `metricas` con un valor por métrica."""
+        numero = int((metricas["inicio_s"] - self.t0) // self.periodo)
+        if self._actual is None or self._actual["numero"] != numero:
+            self._cerrar()
+            self._actual = {
+                "numero": numero,
+                "ciclos": 0,
+                "duracion": 0.0,
+                "integral_presion": 0.0,
+                "presion_pico": -np.inf,
+                "volumen_tidal": 0.0,
+                "volumen_inspirado": 0.0,
+                "gases": {},
+            }
+        actual = self._actual
+        actual["ciclos"] += 1
+        actual["duracion"] += metricas["duracion"]
+        actual["integral_presion"] += metricas["presion_media"] * metricas["duracion"]
+        actual["presion_pico"] = max(actual["presion_pico"], metricas["presion_pico"])
+        actual["volumen_tidal"] += metricas["volumen_tidal"]
+        actual["volumen_inspirado"] += metricas["volumen_inspirado"]
+        actual["auto_peep"] = metricas["auto_peep"]
+        for nombre, valor in (gases or {}).items():
+            actual["gases"][nombre] = actual["gases"].get(nombre, 0.0) + valor
+
+    def _cerrar(self) -> None:
+        actual = self._actual
+        if actual is None:
+            return
+        n, duracion = actual["ciclos"], actual["duracion"]
+        self._periodos.append(
+            {
+                "inicio_s": self.t0 + actual["numero"] * self.periodo,
+                "ciclos": n,
+                "presion_media": (
+                    actual["integral_presion"] / duracion if duracion > 0 else np.nan
+                ),
+                "presion_pico": actual["presion_pico"],
+                "volumen_tidal": actual["volumen_tidal"] / n,
+                "ventilacion_minuto": (
+                    actual["volumen_inspirado"] * 60.0 / duracion
+                    if duracion > 0
+                    else np.nan
+                ),
+                "auto_peep": actual["auto_peep"],
+                **{nombre: suma / n for nombre, suma in actual["gases"].items()},
+            }
+        )
+        self._actual = None
+
+    def resultado(self) -> dict:
+        """Un arreglo por agregado, con una entrada por periodo."""
+        self._cerrar()
+        if not self._periodos:
+            return {}
+        return {
+            nombre: np.array([p[nombre] for p in self._periodos])
+            for nombre in self._periodos[0]
+        }
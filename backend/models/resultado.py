@@ -0,0 +1,189 @@
+# Librerías
+from collections.abc import Mapping
+
+import numpy as np
+
+from . import ciclos as ciclos_util
+
+DTYPES = ("float64", "float32")
+
+# Filas del arreglo de datos
+_FILAS = {"t": 0, "V1": 1, "V2": 2}
+
+# Muestras por bloque de gradiente: np.gradient crea varios temporales del
+# tamaño de su entrada
+_BLOQUE_GRADIENTE = 1 << 14
+
+
+def reservar(muestras: int, dtype="float64") -> np.ndarray:
+    """Arreglo (3, muestras) para t, V1 y V2, sin inicializar."""
+    return np.empty((len(_FILAS), muestras), dtype=dtype)
+
+
+def llenar(ciclos, datos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Escribe los (t, V1, V2) de cada ciclo, uno tras otro, en `datos`
+    (reservado con capacidad suficiente) en lugar de acumularlos en listas
+    y concatenarlos. Devuelve los datos escritos (una vista) y el índice de
+    inicio de cada ciclo.
+    """
+    inicios, n = [], 0
+    for ciclo in ciclos:
+        m = len(ciclo[0])
+        for fila, senal in zip(datos, ciclo):
+            fila[n : n + m] = senal
+        inicios.append(n)
+        n += m
+    return datos[:, :n], np.array(inicios, dtype=int)
+
+
+def gradiente(f: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """np.gradient(f, t) por bloques solapados en una muestra: el resultado
+    es idéntico (las diferencias centradas solo usan muestras vecinas) y los
+    temporales no crecen con la longitud del registro."""
+    derivada = np.empty_like(f)
+    n = len(f)
+    for inicio in range(0, n, _BLOQUE_GRADIENTE):
+        fin = min(inicio + _BLOQUE_GRADIENTE, n)
+        a, b = max(inicio - 1, 0), min(fin + 1, n)
+        derivada[inicio:fin] = np.gradient(f[a:b], t[a:b])[inicio - a : fin - a]
+    return derivada
+
+
+def _es_fila(senal: np.ndarray, fila: np.ndarray) -> bool:
+    return (
+        senal.dtype == fila.dtype
+        and senal.shape == fila.shape
+        and senal.strides == fila.strides
+        and senal.ctypes.data == fila.ctypes.data
+    )
+
+
+def son_filas(registro, t, V1, V2) -> bool:
+    """Si t, V1 y V2 son las filas de `registro` (los mismos datos en
+    memoria, no solo de la misma longitud)."""
+    return registro is not None and all(
+        _es_fila(np.asarray(s), f) for s, f in zip((t, V1, V2), registro)
+    )
+
+
+def como_datos(t, V1, V2, dtype="float64", registro=None) -> np.ndarray:
+    """Arreglo (3, n) con t, V1 y V2. Si ya son las filas de `registro` (p.
+    ej. el de la última simulación) con ese dtype, se usa sin copiar."""
+    if (
+        registro is not None
+        and registro.dtype == np.dtype(dtype)
+        and son_filas(registro, t, V1, V2)
+    ):
+        return registro
+    datos = reservar(len(t), dtype)
+    datos[0], datos[1], datos[2] = t, V1, V2
+    return datos
+
+
+class ResultadoSimulacion(Mapping):
+    """
+    Resultado de Simulador.procesar_resultados con la interfaz de un dict
+    ("t", "V1", "V2", "Vt", "flow1", "flow2", "flow", "P_aw", "P_alv",
+    "auto_peep", "por_ciclo", "modo").
+
+    Solo t, V1 y V2 se almacenan, en un único arreglo contiguo (3, n) de
+    float64 o float32. Las demás señales se derivan al pedirlas por primera
+    vez y se conservan; las que nadie pide (p. ej. los flujos de cada
+    compartimento) no ocupan memoria. Con float32 las señales ocupan la
+    mitad, con una resolución relativa de ~1e-7 (el tiempo, ~3 µs en una
+    hora de simulación); los flujos, derivados del volumen, pierden más:
+    el error del tiempo relativo al paso (~1e-4 con pasos de 20 ms).
+    """
+
+    def __init__(self, datos: np.ndarray, paciente, ventilador, inicios_ciclo):
+        self.datos = datos
+        self.paciente = paciente
+        self.ventilador = ventilador
+        self.inicios_ciclo = np.asarray(inicios_ciclo, dtype=int)
+        self._derivadas = {"modo": ventilador.modo}
+
+    def __getitem__(self, clave):
+        if clave in _FILAS:
+            return self.datos[_FILAS[clave]]
+        if clave not in self._derivadas:
+            if clave not in self._CALCULOS:
+                raise KeyError(clave)
+            self._derivadas[clave] = self._CALCULOS[clave](self)
+        return self._derivadas[clave]
+
+    def __contains__(self, clave) -> bool:
+        return clave in _FILAS or clave in self._CALCULOS or clave == "modo"
+
+    def __iter__(self):
+        yield from _FILAS
+        yield from self._CALCULOS
+        yield "modo"
+
+    def __len__(self) -> int:
+        return len(_FILAS) + len(self._CALCULOS) + 1
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por las señales almacenadas y las ya derivadas."""
+        return self.datos.nbytes + sum(
+            v.nbytes for v in self._derivadas.values() if isinstance(v, np.ndarray)
+        )
+
+    def _como_datos(self, valores) -> np.ndarray:
+        return np.asarray(valores).astype(self.datos.dtype, copy=False)
+
+    def _volumen_total(self):
+        return self["V1"] + self["V2"]
+
+    def _flujo(self, clave):
+        return gradiente(self[clave], self["t"])
+
+    def _presion_via_aerea(self):
+        if self.ventilador.modo == "PCV":
+            fase = ciclos_util.fase_en_ciclo(self["t"], self.inicios_ciclo)
+            return self._como_datos(self.ventilador.presion(fase))
+        # P_aw = (flujo + Σ E·V/R) / Σ 1/R = flujo / Σ 1/R + P_alv
+        P_aw = self["flow"] / self._conductancia_total()
+        P_aw += self["P_alv"]
+        return P_aw
+
+    def _presion_alveolar(self):
+        # Presión alveolar de cada compartimento, ponderada por la
+        # conductancia (1/R): es la presión que se mediría en la vía aérea
+        # con flujo nulo
+        p, G = self.paciente, self._conductancia_total()
+        P_alv = self["V1"] * (p.E1 / p.R1 / G)
+        P_alv += self["V2"] * (p.E2 / p.R2 / G)
+        return P_alv
+
+    def _conductancia_total(self) -> float:
+        return (1 / self.paciente.R1) + (1 / self.paciente.R2)
+
+    def _por_ciclo(self):
+        return ciclos_util.metricas_por_ciclo(
+            self["t"],
+            self["Vt"],
+            self["P_aw"],
+            self["P_alv"],
+            self["flow"],
+            self.inicios_ciclo,
+        )
+
+    def _auto_peep(self):
+        # Presión alveolar al final de la espiración (volumen atrapado) de
+        # la última respiración
+        return self["por_ciclo"]["auto_peep"][-1]
+
+    _CALCULOS = {
+        "Vt": _volumen_total,
+        "flow1": lambda r: r._flujo("V1"),
+        "flow2": lambda r: r._flujo("V2"),
+        # El flujo total es la derivada del volumen total (igual a la suma de
+        # flow1 y flow2, sin calcularlas)
+        "flow": lambda r: r._flujo("Vt"),
+        "P_aw": _presion_via_aerea,
+        "P_alv": _presion_alveolar,
+        "por_ciclo": _por_ciclo,
+        "auto_peep": _auto_peep,
+    }
@@ -1,11 +1,28 @@
 # Librerías
 import numpy as np
-from scipy.integrate import solve_ivp
 import math
+import sys
 from .paciente import Paciente
 from .ventilador import Ventilador
 from .control import ControlRespiratorio
 from .intercambio import IntercambioGases  # Agregar este import
+from .motor_analitico import MotorAnalitico
+from .motor_espontaneo import MotorEspontaneo
+from .estado import EstadoSimulacion
+from .resultado import ResultadoSimulacion
+from .prolongado import AgregadosPorMinuto, BufferCircular, VolcadoNpy
+from . import ciclos as ciclos_util
+from . import resultado as resultado_util
+
+MOTORES = ("numerico", "analitico", "fusionado")
+
+
+def solve_ivp(*args, **kwargs):
+    """scipy.integrate.solve_ivp con importación diferida: importar scipy
+    cuesta cientos de ms y solo lo necesita el motor "numerico"."""
+    from scipy.integrate import solve_ivp as _solve_ivp
+
+    return _solve_ivp(*args, **kwargs)
 
 
 class Simulador:
@@ -16,7 +33,22 @@ class Simulador:
         paciente: Paciente,
         ventilador: Ventilador,
         control: "ControlRespiratorio" = None,
+        motor: str = "numerico",
+        dtype: str = "float64",
     ):
+        """
+        Parámetros
+        ----------
+        motor : str
+            "numerico" integra las EDO con solve_ivp (RK45). "analitico" usa la
+            solución exacta por exponenciales matriciales (MotorAnalitico),
+            disponible solo en PCV y VCV. "fusionado" resuelve el lazo cerrado
+            del modo espontáneo con la solución exacta de cada ciclo
+            (MotorEspontaneo), disponible solo en ESPONTANEO.
+        dtype : str
+            Tipo de las señales registradas, "float64" o "float32" (la mitad
+            de memoria; la integración se hace siempre en float64).
+        """
         self.paciente = paciente
         self.ventilador = ventilador
         self.control = control
@@ -24,6 +56,54 @@ class Simulador:
             assert (
                 self.control is not None
             ), "Se requiere un módulo de ControlRespiratorio para el modo 'ESPONTANEO'"
+        if motor not in MOTORES:
+            raise ValueError(f"Motor desconocido: {motor}. Opciones: {MOTORES}")
+        if motor == "analitico" and ventilador.modo not in ("PCV", "VCV"):
+            raise ValueError("El motor analítico solo admite los modos PCV y VCV.")
+        if motor == "fusionado" and ventilador.modo != "ESPONTANEO":
+            raise ValueError("El motor fusionado solo admite el modo ESPONTANEO.")
+        if dtype not in resultado_util.DTYPES:
+            raise ValueError(
+                f"Tipo de dato no soportado: {dtype}. "
+                f"Opciones: {resultado_util.DTYPES}"
+            )
+        self.motor = motor
+        self.dtype = dtype
+        # Índice de respiraciones de la última simulación: muestra de inicio
+        # de cada ciclo en `registro`
+        self.inicios_ciclo = None
+        # t, V1 y V2 de la última simulación, arreglo (3, muestras) reservado
+        # de una vez (ver resultado.llenar)
+        self.registro = None
+        # Instantánea al final del último ciclo simulado (EstadoSimulacion),
+        # desde la que se puede continuar la simulación
+        self.estado_final = None
+        # Evaluaciones acumuladas del lado derecho de las EDO (solo el motor
+        # numérico; los motores exactos no evalúan el modelo paso a paso)
+        self.nfev = 0
+
+    def _registrar_ciclos(
+        self, datos: np.ndarray, inicios: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Registra la simulación y devuelve t, V1 y V2 (filas de `datos`)."""
+        self.registro = datos
+        self.inicios_ciclo = inicios
+        return datos[0], datos[1], datos[2]
+
+    def _capturar_estado(
+        self, t: float, V1: float, V2: float, paco2: float
+    ) -> EstadoSimulacion:
+        """Instantánea del estado tras un ciclo que termina en `t`."""
+        control = self.control
+        return EstadoSimulacion(
+            V1=V1,
+            V2=V2,
+            t=t,
+            paco2=paco2,
+            integral_error=control.integral_error if control else 0.0,
+            amplitud=control.amplitud if control else None,
+            frecuencia=control.frecuencia if control else None,
+        )
 
     def _modelo_edo(self, t, y, P_aw_func, R1, E1, R2, E2):
         V1, V2 = y
@@ -54,21 +134,98 @@ class Simulador:
         return [dV1_dt, dV2_dt]
 
     def simular(
-        self, tiempo_total_deseado: float = 15.0, pasos_por_ciclo: int = 200
+        self,
+        tiempo_total_deseado: float = 15.0,
+        pasos_por_ciclo: int = 200,
+        estado: EstadoSimulacion = None,
     ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         """Ejecuta la simulación para múltiples ciclos respiratorios hasta alcanzar
-        una duración total deseada. Devuelve t, V1 y V2 concatenados."""
+        una duración total deseada. Devuelve t, V1 y V2 concatenados.
+
+        Con `estado` (p. ej. el `estado_final` de una simulación anterior) la
+        simulación continúa desde sus volúmenes y su tiempo, empezando un
+        ciclo nuevo; la primera muestra repite entonces la última de la
+        simulación anterior."""
+
+        num_ciclos = self.ciclos_para(tiempo_total_deseado)
+        return self._integrar_ciclos(
+            num_ciclos, pasos_por_ciclo, estado or EstadoSimulacion()
+        )
 
+    def ciclos_para(self, tiempo_total_deseado: float) -> int:
+        """Número de ciclos que simula `simular` para cubrir la duración
+        deseada."""
         # 1. CALCULAR DINÁMICAMENTE EL NÚMERO DE CICLOS
         tiempo_por_ciclo = 60.0 / self.ventilador.fr
         if tiempo_por_ciclo <= 0:
             raise ValueError("La frecuencia respiratoria debe ser mayor que cero.")
         # Añadimos 2 ciclos de margen
-        num_ciclos = math.ceil(tiempo_total_deseado / tiempo_por_ciclo) + 2
+        return math.ceil(tiempo_total_deseado / tiempo_por_ciclo) + 2
+
+    def _integrar_ciclos(
+        self, num_ciclos: int, pasos_por_ciclo: int, estado: EstadoSimulacion
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Integra `num_ciclos` ciclos consecutivos partiendo de `estado`
+        (volúmenes y tiempo inicial). Devuelve t, V1 y V2 concatenados y
+        registra el índice de respiraciones en `inicios_ciclo` y la
+        instantánea final en `estado_final`.
+
+        Las tres señales son filas de un único arreglo reservado al inicio
+        (num_ciclos × pasos_por_ciclo muestras), que cada ciclo llena en su
+        lugar."""
+        if self.motor == "analitico":
+            t, V = MotorAnalitico.desde_modelos(self.paciente, self.ventilador).simular(
+                pasos_por_ciclo=pasos_por_ciclo, V0=estado.V0, num_ciclos=num_ciclos
+            )
+            datos = resultado_util.reservar(t.shape[1], self.dtype)
+            np.add(t[0], estado.t, out=datos[0])
+            datos[1:] = V[0].T
+            t, V1, V2 = self._registrar_ciclos(
+                datos, ciclos_util.inicios_regulares(num_ciclos, pasos_por_ciclo)
+            )
+            self.estado_final = self._capturar_estado(
+                t[-1], V1[-1], V2[-1], estado.paco2
+            )
+            return t, V1, V2
+
+        return self._registrar_ciclos(
+            *resultado_util.llenar(
+                self.iterar_ciclos(num_ciclos, pasos_por_ciclo, estado=estado),
+                resultado_util.reservar(num_ciclos * pasos_por_ciclo, self.dtype),
+            )
+        )
+
+    def iterar_ciclos(
+        self,
+        num_ciclos: int,
+        pasos_por_ciclo: int = 200,
+        V0=None,
+        estado: EstadoSimulacion = None,
+    ):
+        """
+        Generador de `num_ciclos` ciclos consecutivos desde t = 0 partiendo
+        del estado V0 (por defecto, volúmenes nulos), o bien desde los
+        volúmenes y el tiempo de `estado`. Produce (t, V1, V2) de cada ciclo
+        en cuanto está calculado, con los mismos valores que
+        _integrar_ciclos, sin acumular la simulación completa en memoria.
+        Tras cada ciclo actualiza `estado_final`.
+        """
+        if estado is None:
+            estado = EstadoSimulacion(*([0.0, 0.0] if V0 is None else V0))
+        V0, t_inicio = estado.V0, estado.t
+        if self.motor == "analitico":
+            motor = MotorAnalitico.desde_modelos(self.paciente, self.ventilador)
+            for t, V in motor.iterar_ciclos(num_ciclos, pasos_por_ciclo, V0):
+                t, V1, V2 = t[0] + t_inicio, V[0, :, 0], V[0, :, 1]
+                self.estado_final = self._capturar_estado(
+                    t[-1], V1[-1], V2[-1], estado.paco2
+                )
+                yield t, V1, V2
+            return
+
+        tiempo_por_ciclo = 60.0 / self.ventilador.fr
 
         # 2. Ciclo FOR para calcular múltiples ciclos respiratorios
-        t_data, V1_data, V2_data = [], [], []
-        V0 = [0.0, 0.0]
         P_aw_func = self.ventilador.presion  # Se obtiene la función de presión para PCV
 
         for i in range(num_ciclos):
@@ -94,143 +251,463 @@ class Simulador:
                 ),
             )
 
-            t_data.append(sol.t)
-            V1_data.append(sol.y[0])
-            V2_data.append(sol.y[1])
+            self.nfev += sol.nfev
+
+            # Cada ciclo se integra en el tiempo de su propia fase y se
+            # desplaza al tiempo de la simulación
+            t_ciclo = sol.t + t_inicio
+            self.estado_final = self._capturar_estado(
+                t_inicio + t1, sol.y[0, -1], sol.y[1, -1], estado.paco2
+            )
+            yield t_ciclo, sol.y[0], sol.y[1]
 
             # Propagar el estado final como condición inicial del siguiente ciclo
             V0 = sol.y[:, -1]
 
-        t = np.concatenate(t_data)
-        V1 = np.concatenate(V1_data)
-        V2 = np.concatenate(V2_data)
+    def _mapa_ciclo_numerico(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Mapa de un ciclo V(T_total) = P·V(0) + q obtenido con el integrador
+        numérico. Como el modelo es lineal, basta integrar un ciclo desde el
+        origen (q) y desde cada vector canónico (columnas de P). Se usan
+        tolerancias estrictas porque el error del mapa se amplifica al
+        resolver el punto fijo cuando las constantes de tiempo son largas.
+        """
+        tiempo_por_ciclo = 60.0 / self.ventilador.fr
 
-        return t, V1, V2
+        def estado_final(V0):
+            sol = solve_ivp(
+                fun=self._modelo_edo,
+                t_span=[0.0, tiempo_por_ciclo],
+                y0=V0,
+                method="RK45",
+                rtol=1e-8,
+                atol=1e-10,
+                args=(
+                    self.ventilador.presion,
+                    self.paciente.R1,
+                    self.paciente.E1,
+                    self.paciente.R2,
+                    self.paciente.E2,
+                ),
+            )
+            self.nfev += sol.nfev
+            return sol.y[:, -1]
 
-    def procesar_resultados(
-        self, t: np.ndarray, V1: np.ndarray, V2: np.ndarray
-    ) -> dict:
-        """Calcula flujo, volumen total y presión resultante."""
-        flujo1 = np.gradient(V1, t)
-        flujo2 = np.gradient(V2, t)
-        flujo_total = flujo1 + flujo2
-        Vt = V1 + V2
-        if self.ventilador.modo == "PCV":
-            P_aw = self.ventilador.presion(t)
-        else:
-            P_aw = (
-                flujo_total
-                + (self.paciente.E1 * V1 / self.paciente.R1)
-                + (self.paciente.E2 * V2 / self.paciente.R2)
-            ) / ((1 / self.paciente.R1) + (1 / self.paciente.R2))
+        q = estado_final([0.0, 0.0])
+        P = np.column_stack([estado_final(e) - q for e in np.eye(2)])
+        return P, q
+
+    def simular_estado_estacionario(
+        self, ciclos: int = 2, pasos_por_ciclo: int = 200
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Simula directamente el régimen periódico (ciclo límite) en PCV o VCV.
 
-        # Calcular el Auto-PEEP a partir del volumen atrapado.
-        volumen_atrapado_c1 = V1[-1]
-        volumen_atrapado_c2 = V2[-1]
+        En lugar de integrar ciclos de calentamiento hasta que el volumen
+        atrapado se estabilice, resuelve el punto fijo V* = P·V* + q del mapa
+        de un ciclo (lineal en este modelo) y luego integra solo `ciclos`
+        ciclos de visualización desde V*. El Auto-PEEP que calcula
+        procesar_resultados sobre este resultado es el valor estacionario,
+        independiente de la duración de la simulación.
+
+        Devuelve t, V1 y V2 concatenados, con t desde 0.
+        """
+        if ciclos < 1:
+            raise ValueError("Se requiere al menos un ciclo de visualización.")
+        return self._integrar_ciclos(
+            ciclos, pasos_por_ciclo, EstadoSimulacion(*self.estado_estacionario())
+        )
 
-        # La presión alveolar en cada compartimento al final de la espiración
-        P_alv_final_c1 = self.paciente.E1 * volumen_atrapado_c1
-        P_alv_final_c2 = self.paciente.E2 * volumen_atrapado_c2
+    def estado_estacionario(self) -> np.ndarray:
+        """Volúmenes [V1, V2] al inicio de cada ciclo en régimen periódico
+        (PCV o VCV)."""
+        if self.ventilador.modo not in ("PCV", "VCV"):
+            raise ValueError(
+                "El estado estacionario directo solo está disponible en PCV y VCV."
+            )
 
-        # El Auto-PEEP medido en la vía aérea: es una
-        # media ponderada por la conductancia (1/R)
-        conductancia_total = (1 / self.paciente.R1) + (1 / self.paciente.R2)
-        auto_peep_calculado = (
-            P_alv_final_c1 / self.paciente.R1 + P_alv_final_c2 / self.paciente.R2
-        ) / conductancia_total
+        if self.motor == "analitico":
+            motor = MotorAnalitico.desde_modelos(self.paciente, self.ventilador)
+            return motor.estado_estacionario()[0]
+        else:
+            if self.ventilador.modo == "VCV" and self.ventilador.Ti >= (
+                60.0 / self.ventilador.fr
+            ):
+                raise ValueError(
+                    "Sin fase espiratoria el volumen crece sin límite: "
+                    "no existe estado estacionario."
+                )
+            P, q = self._mapa_ciclo_numerico()
+            return np.linalg.solve(np.eye(2) - P, q)
 
+    def procesar_resultados(
+        self,
+        t: np.ndarray,
+        V1: np.ndarray,
+        V2: np.ndarray,
+        inicios_ciclo=None,
+        dtype: str = None,
+    ) -> ResultadoSimulacion:
+        """
+        Flujo, volumen total y presión resultante, además de las métricas de
+        cada respiración ("por_ciclo", ver ciclos.metricas_por_ciclo), como
+        un ResultadoSimulacion: se usa como un dict, pero cada señal derivada
+        se calcula solo cuando se pide.
+
+        `inicios_ciclo` es la muestra en que empieza cada respiración. Por
+        defecto se usa el índice registrado por la última simulación solo si
+        t, V1 y V2 son sus propios arreglos (no copias ni otros registros de
+        la misma longitud); si no, el registro se trata como una sola
+        respiración.
+
+        `dtype` es el de las señales del resultado (por defecto, el del
+        simulador). Si t, V1 y V2 son los de la última simulación y ya tienen
+        ese tipo, se usan sin copiarlos.
+        """
+        dtype = dtype or self.dtype
+        if dtype not in resultado_util.DTYPES:
+            raise ValueError(
+                f"Tipo de dato no soportado: {dtype}. "
+                f"Opciones: {resultado_util.DTYPES}"
+            )
+        if inicios_ciclo is None:
+            if resultado_util.son_filas(self.registro, t, V1, V2):
+                inicios_ciclo = self.inicios_ciclo
+            else:
+                inicios_ciclo = np.array([0])
+        datos = resultado_util.como_datos(t, V1, V2, dtype, registro=self.registro)
+        return ResultadoSimulacion(datos, self.paciente, self.ventilador, inicios_ciclo)
+
+    def simular_prolongado(
+        self,
+        duracion_s: float,
+        pasos_por_ciclo: int = None,
+        ciclos_recientes: int = 15,
+        intercambio: IntercambioGases = None,
+        ruta_volcado=None,
+        estado: EstadoSimulacion = None,
+        periodo_agregados: float = 60.0,
+    ) -> dict:
+        """
+        Simulación de horas de ventilación con memoria constante.
+
+        Los ciclos se generan de uno en uno (iterar_ciclos o
+        iterar_espontaneo) y no se acumulan:
+
+        - los últimos (al menos `ciclos_recientes`) se conservan a
+          resolución completa en un BufferCircular;
+        - las métricas de cada respiración, y su intercambio de gases si se
+          pasa `intercambio`, se acumulan por periodos de
+          `periodo_agregados` segundos (AgregadosPorMinuto);
+        - con `ruta_volcado`, todas las muestras (t, V1, V2) se escriben en
+          un .npy de forma (muestras, 3) (VolcadoNpy), que se puede abrir
+          con np.load(ruta, mmap_mode="r") y pasar a procesar_resultados.
+
+        Las métricas de una respiración se calculan al llegar la siguiente,
+        con la última muestra de la anterior y las primeras de la siguiente
+        como contexto, por lo que coinciden con las de procesar_resultados
+        sobre el registro completo.
+
+        Los ciclos son los de iterar_hasta: en PCV y VCV, ceil(duracion_s /
+        T); en ESPONTANEO, hasta cubrir `duracion_s`. Con `estado` la simulación
+        continúa desde él (ver simular). `pasos_por_ciclo` es por defecto
+        el de simular o el de simular_espontaneo.
+
+        Returns
+        -------
+        dict con "recientes" (ResultadoSimulacion de los últimos ciclos),
+        "por_minuto" (un arreglo por agregado), "ciclos", "muestras" y
+        "volcado" (la ruta o None).
+        """
+        if duracion_s <= 0:
+            raise ValueError("La duración debe ser mayor que cero.")
+        if ciclos_recientes < 1:
+            raise ValueError("Se requiere al menos un ciclo reciente.")
+        espontaneo = self.ventilador.modo == "ESPONTANEO"
+        if pasos_por_ciclo is None:
+            pasos_por_ciclo = 100 if espontaneo else 200
+        t_inicio = estado.t if estado is not None else 0.0
+
+        ciclos = self.iterar_hasta(t_inicio + duracion_s, pasos_por_ciclo, estado)
+
+        recientes = BufferCircular(
+            ciclos_recientes * (pasos_por_ciclo + 1), dtype=self.dtype
+        )
+        agregados = AgregadosPorMinuto(t_inicio, periodo_agregados)
+        volcado = VolcadoNpy(ruta_volcado, 3, self.dtype) if ruta_volcado else None
+        anterior = pendiente = None
+        num_ciclos = muestras = 0
+        try:
+            for ciclo in ciclos:
+                recientes.agregar(*ciclo)
+                if volcado is not None:
+                    volcado.agregar(*ciclo)
+                if pendiente is not None:
+                    self._agregar_respiracion(
+                        agregados, intercambio, anterior, pendiente, ciclo
+                    )
+                anterior, pendiente = pendiente, ciclo
+                num_ciclos += 1
+                muestras += len(ciclo[0])
+            if pendiente is not None:
+                self._agregar_respiracion(
+                    agregados, intercambio, anterior, pendiente, None
+                )
+        finally:
+            if volcado is not None:
+                volcado.cerrar()
+
+        t, V1, V2 = self._registrar_ciclos(*recientes.contenido())
         return {
-            "t": t,
-            "V1": V1,
-            "V2": V2,
-            "Vt": Vt,
-            "flow1": flujo1,
-            "flow2": flujo2,
-            "flow": flujo_total,
-            "P_aw": P_aw,
-            "auto_peep": auto_peep_calculado,
-            "modo": self.ventilador.modo,
+            "recientes": self.procesar_resultados(t, V1, V2),
+            "por_minuto": agregados.resultado(),
+            "ciclos": num_ciclos,
+            "muestras": muestras,
+            "volcado": ruta_volcado,
+        }
+
+    def iterar_hasta(
+        self, t_fin: float, pasos_por_ciclo: int, estado: EstadoSimulacion = None
+    ):
+        """
+        Ciclos desde `estado` (o desde t = 0) hasta el primer fin de ciclo en
+        t_fin o después: en PCV y VCV, ceil((t_fin - t) / T) ciclos con
+        iterar_ciclos (el último incluye su punto final); en ESPONTANEO,
+        respiraciones de iterar_espontaneo hasta la que termina en t_fin o
+        después (sin su punto final, que es el estado_final). Si t_fin no
+        es posterior al inicio, no produce ciclos.
+        """
+        t_inicio = estado.t if estado is not None else 0.0
+        if self.ventilador.modo != "ESPONTANEO":
+            # La tolerancia evita un ciclo de más por redondeo cuando t_fin
+            # cae justo en un fin de ciclo
+            ciclos = (t_fin - t_inicio) * self.ventilador.fr / 60.0
+            yield from self.iterar_ciclos(
+                max(math.ceil(ciclos - 1e-9), 0), pasos_por_ciclo, estado=estado
+            )
+            return
+        if t_fin <= t_inicio:
+            return
+        for ciclo in self.iterar_espontaneo(sys.maxsize, pasos_por_ciclo, estado):
+            yield ciclo
+            if self.estado_final.t >= t_fin:
+                return
+
+    def _agregar_respiracion(
+        self,
+        agregados: AgregadosPorMinuto,
+        intercambio: IntercambioGases,
+        anterior,
+        ciclo,
+        siguiente,
+    ) -> None:
+        """
+        Métricas de la respiración `ciclo` calculadas con la última muestra
+        de la anterior (para el flujo en su primera muestra) y las dos
+        primeras de la siguiente (para el flujo en su última muestra y el
+        tramo que la une con la siguiente), como en el registro completo.
+        """
+        partes, inicios = [], []
+        if anterior is not None:
+            partes.append([s[-1:] for s in anterior])
+            inicios.append(0)
+        indice = len(inicios)
+        inicios.append(len(inicios))
+        partes.append(ciclo)
+        if siguiente is not None:
+            partes.append([s[:2] for s in siguiente])
+            inicios.append(inicios[-1] + len(ciclo[0]))
+        t, V1, V2 = (np.concatenate(senales) for senales in zip(*partes))
+        por_ciclo = self.procesar_resultados(t, V1, V2, inicios_ciclo=inicios)[
+            "por_ciclo"
+        ]
+        respiracion = {
+            nombre: valores[indice : indice + 1]
+            for nombre, valores in por_ciclo.items()
         }
+        gases = (
+            intercambio.calcular({"por_ciclo": respiracion})
+            if intercambio is not None
+            else None
+        )
+        agregados.agregar(
+            {
+                "inicio_s": t[inicios[indice]],
+                **{nombre: valores[0] for nombre, valores in respiracion.items()},
+            },
+            gases,
+        )
 
     def simular_espontaneo(
-        self, iteraciones: int = 30, pasos_por_ciclo: int = 100
+        self,
+        iteraciones: int = 30,
+        pasos_por_ciclo: int = 100,
+        estado: EstadoSimulacion = None,
+        tolerancia: float = None,
     ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Ejecuta una simulación en lazo cerrado para el modo espontáneo.
+
+        Con `estado` continúa una simulación anterior: volúmenes, tiempo,
+        PaCO2 y controlador (término integral, amplitud y frecuencia) se
+        restauran, de modo que continuar N iteraciones reproduce las que
+        habría calculado una simulación única más larga.
+
+        Con `tolerancia`, la simulación se detiene antes de `iteraciones` en
+        cuanto la PaCO2 (mmHg), la amplitud (cmH2O) y la frecuencia (rpm)
+        del controlador varían menos que ella entre dos respiraciones.
+        """
+        # Cada respiración aporta pasos_por_ciclo muestras y la última una más
+        return self._registrar_ciclos(
+            *resultado_util.llenar(
+                self.iterar_espontaneo(
+                    iteraciones, pasos_por_ciclo, estado, tolerancia
+                ),
+                resultado_util.reservar(iteraciones * pasos_por_ciclo + 1, self.dtype),
+            )
+        )
+
+    def iterar_espontaneo(
+        self,
+        iteraciones: int = 30,
+        pasos_por_ciclo: int = 100,
+        estado: EstadoSimulacion = None,
+        tolerancia: float = None,
+    ):
+        """
+        Generador del lazo cerrado de simular_espontaneo: produce (t, V1, V2)
+        de cada respiración en cuanto el controlador la ha simulado. Tras
+        cada respiración actualiza `estado_final`.
+
+        Cada respiración aporta `pasos_por_ciclo` muestras sin su punto
+        final, que es el inicial de la siguiente (así la concatenación no
+        repite instantes); la última lo incluye.
         """
         if not self.control:
             raise ValueError(
                 "El módulo de control es necesario para el modo espontáneo."
             )
 
-        t_data, V1_data, V2_data = [], [], []
-        V0 = [0.0, 0.0]
-        # Condición inicial para la primera iteración del controlador
-        paco2_actual = 55.0  # Empezamos con hipercapnia para forzar una respuesta
-        tiempo_actual = 0.0
+        if estado is None:
+            # Condición inicial para la primera iteración del controlador:
+            # empezamos con hipercapnia (PaCO2 = 55) para forzar una respuesta
+            estado = EstadoSimulacion()
+        else:
+            estado.restaurar_control(self.control, self.ventilador)
+        V0 = estado.V0
+        paco2_actual = estado.paco2
+        tiempo_actual = estado.t
 
         for i in range(iteraciones):
-            # 1. El controlador ajusta el impulso ventilatorio basado en el CO2
-            dt = 60.0 / self.ventilador.fr  # Duración del último ciclo
-            amplitud, frec_hz = self.control.actualizar(paco2_actual, dt)
-
-            # Actualizamos los parámetros del ventilador para el ciclo actual
-            self.ventilador.fr = frec_hz * 60.0
-            tiempo_ciclo = (
-                60.0 / self.ventilador.fr if self.ventilador.fr > 0 else float("inf")
+            previo = self.estado_final if i > 0 else None
+            t, V1, V2, paco2_actual = self.ciclo_espontaneo(
+                V0, tiempo_actual, paco2_actual, pasos_por_ciclo + 1
+            )
+            self.estado_final = self._capturar_estado(
+                t[-1], V1[-1], V2[-1], paco2_actual
             )
+            ultimo = i == iteraciones - 1 or (
+                tolerancia is not None
+                and previo is not None
+                and self._control_convergido(previo, self.estado_final, tolerancia)
+            )
+            # Entregamos y propagamos el estado para el siguiente ciclo
+            if ultimo:
+                yield t, V1, V2
+                return
+            yield t[:-1], V1[:-1], V2[:-1]
+            V0 = [V1[-1], V2[-1]]
+            tiempo_actual = t[-1]
+
+    @staticmethod
+    def _control_convergido(
+        previo: EstadoSimulacion, actual: EstadoSimulacion, tolerancia: float
+    ) -> bool:
+        """PaCO2, amplitud y frecuencia (en rpm) estables entre dos ciclos."""
+        cambios = (
+            actual.paco2 - previo.paco2,
+            actual.amplitud - previo.amplitud,
+            (actual.frecuencia - previo.frecuencia) * 60.0,
+        )
+        return all(abs(c) <= tolerancia for c in cambios)
 
-            # 2. Simulamos UN ciclo con el nuevo impulso ventilatorio
-            t0 = tiempo_actual
-            t1 = tiempo_actual + tiempo_ciclo
-            t_eval = np.linspace(t0, t1, pasos_por_ciclo)
+    def ciclo_espontaneo(
+        self, V0, tiempo_actual: float, paco2_actual: float, pasos_por_ciclo: int = 100
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """
+        Una iteración del lazo cerrado: el controlador ajusta el impulso con
+        la PaCO2 actual, se simula una respiración desde `tiempo_actual` y el
+        estado V0, y se estima la PaCO2 siguiente. Devuelve t, V1, V2 (con el
+        punto final del ciclo incluido) y la nueva PaCO2.
+        """
+        if not self.control:
+            raise ValueError(
+                "El módulo de control es necesario para el modo espontáneo."
+            )
 
-            # La función de presión ahora es la Pmus generada por el control
-            p_mus_func = self.control.generar_Pmus
+        # 1. El controlador ajusta el impulso ventilatorio basado en el CO2
+        dt = 60.0 / self.ventilador.fr  # Duración del último ciclo
+        amplitud, frec_hz = self.control.actualizar(paco2_actual, dt)
 
-            sol = solve_ivp(
-                fun=self._modelo_edo,
-                t_span=[t0, t1],
-                y0=V0,
-                method="RK45",
-                t_eval=t_eval,
-                args=(
-                    p_mus_func,
-                    self.paciente.R1,
-                    self.paciente.E1,
-                    self.paciente.R2,
-                    self.paciente.E2,
-                ),
-            )
+        # Actualizamos los parámetros del ventilador para el ciclo actual
+        self.ventilador.fr = frec_hz * 60.0
+        tiempo_ciclo = (
+            60.0 / self.ventilador.fr if self.ventilador.fr > 0 else float("inf")
+        )
 
-            # 3. (Eliminado) El procesamiento de gases ahora se hace en el SimulationService.
-            #    Aquí solo nos enfocamos en la mecánica.
-            #    Actualizamos paco2_actual de forma simple para la siguiente iteración.
-            resultados_ciclo = self.procesar_resultados(sol.t, sol.y[0], sol.y[1])
-            volumen_tidal_ciclo = np.max(resultados_ciclo["Vt"]) - np.min(
-                resultados_ciclo["Vt"]
+        # 2. Simulamos UN ciclo con el nuevo impulso ventilatorio
+        t0 = tiempo_actual
+        t1 = tiempo_actual + tiempo_ciclo
+        if self.motor == "fusionado":
+            t, V = MotorEspontaneo.desde_modelos(self.paciente).ciclo(
+                V0, t0, t1, pasos_por_ciclo, amplitud, frec_hz
             )
+            V1, V2 = V[:, 0], V[:, 1]
+        else:
+            t, V1, V2 = self._integrar_ciclo_espontaneo(V0, t0, t1, pasos_por_ciclo)
 
-            # Heurística simple: si el Vt es bajo, el CO2 sube. Si es alto, baja.
-            if volumen_tidal_ciclo < 0.4:
-                paco2_actual += 2.0
-            else:
-                paco2_actual -= 2.0
-            paco2_actual = max(30.0, min(80.0, paco2_actual))  # Limitar el rango
+        # 3. Solo se necesita el volumen tidal del ciclo para realimentar la
+        #    PaCO2; el procesamiento completo se hace en el SimulationService.
+        Vt = V1 + V2
+        volumen_tidal_ciclo = np.max(Vt) - np.min(Vt)
 
-            # 4. Guardamos y propagamos el estado para el siguiente ciclo
-            t_data.append(sol.t)
-            V1_data.append(sol.y[0])
-            V2_data.append(sol.y[1])
-            V0 = sol.y[:, -1]
-            tiempo_actual = t1
+        # Heurística simple: si el Vt es bajo, el CO2 sube. Si es alto, baja.
+        if volumen_tidal_ciclo < 0.4:
+            paco2_actual += 2.0
+        else:
+            paco2_actual -= 2.0
+        paco2_actual = max(30.0, min(80.0, paco2_actual))  # Limitar el rango
+
+        return t, V1, V2, paco2_actual
 
-        return (
-            np.concatenate(t_data),
-            np.concatenate(V1_data),
-            np.concatenate(V2_data),
+    def _integrar_ciclo_espontaneo(
+        self, V0, t0: float, t1: float, pasos_por_ciclo: int
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Integra con RK45 un ciclo espontáneo con la P_mus actual del
+        controlador."""
+        t_eval = np.linspace(t0, t1, pasos_por_ciclo)
+
+        # La función de presión ahora es la Pmus generada por el control
+        p_mus_func = self.control.generar_Pmus
+
+        sol = solve_ivp(
+            fun=self._modelo_edo,
+            t_span=[t0, t1],
+            y0=V0,
+            method="RK45",
+            t_eval=t_eval,
+            args=(
+                p_mus_func,
+                self.paciente.R1,
+                self.paciente.E1,
+                self.paciente.R2,
+                self.paciente.E2,
+            ),
         )
 
+        self.nfev += sol.nfev
+        return sol.t, sol.y[0], sol.y[1]
+
     # def graficar_resultados(self,
     #                         resultados: dict,
     #                         titulo: str = 'Simulación Pulmonar'):
@@ -0,0 +1,227 @@
+# Librerías
+import numpy as np
+from .motor_analitico import MotorAnalitico
+
+
+def _gradiente_filas(y: np.ndarray, x: np.ndarray, n_validos: np.ndarray) -> np.ndarray:
+    """
+    Equivalente a np.gradient(y[..., b, :n], x[b, :n]) aplicado a cada fila b
+    a la vez (segundo orden en el interior, primer orden en los extremos),
+    donde n es el número de muestras válidas de la fila. `y` puede llevar
+    ejes iniciales adicionales (varias señales sobre la misma malla); los
+    pesos de la diferencia finita se calculan una sola vez. Las muestras de
+    relleno quedan en NaN.
+    """
+    h = np.diff(x, axis=1)
+    hs, hd = h[:, :-1], h[:, 1:]
+    denominador = hs * hd * (hd + hs)
+    peso_sig = hs**2 / denominador
+    peso_act = (hd**2 - hs**2) / denominador
+    peso_ant = -(hd**2) / denominador
+
+    dy = np.full_like(y, np.nan)
+    dy[..., 1:-1] = (
+        peso_sig * y[..., 2:] + peso_act * y[..., 1:-1] + peso_ant * y[..., :-2]
+    )
+    dy[..., 0] = (y[..., 1] - y[..., 0]) / h[:, 0]
+    fila = np.arange(x.shape[0])
+    fin = n_validos - 1
+    dy[..., fila, fin] = (y[..., fila, fin] - y[..., fila, fin - 1]) / (
+        x[fila, fin] - x[fila, fin - 1]
+    )
+    return dy
+
+
+class SimuladorLote:
+    """
+    Simula muchas configuraciones paciente-ventilador a la vez.
+
+    Equivale a ejecutar Simulador(paciente, ventilador, motor="analitico") para
+    cada fila, pero todas las configuraciones avanzan juntas como arreglos de
+    NumPy con forma (lote, tiempo), de modo que el costo crece con el ancho de
+    los arreglos y no con iteraciones de Python. Solo admite PCV y VCV; el
+    modo puede variar entre filas.
+
+    Parámetros
+    ----------
+    R1, C1, R2, C2, PEEP, P_driving, fr, Ti : array_like
+        Un valor por configuración (o escalares, que se difunden).
+    modo : str o array_like de str
+        "PCV" o "VCV" por configuración.
+    Vt : array_like, opcional
+        Volumen tidal (L); obligatorio en las filas VCV (NaN en las PCV).
+    """
+
+    def __init__(
+        self,
+        R1,
+        C1,
+        R2,
+        C2,
+        modo="PCV",
+        PEEP=5.0,
+        P_driving=15.0,
+        fr=20.0,
+        Ti=1.0,
+        Vt=None,
+    ):
+        columnas = np.broadcast_arrays(
+            *(
+                np.asarray(v, dtype=float)
+                for v in (R1, C1, R2, C2, PEEP, P_driving, fr, Ti)
+            )
+        )
+        R1, C1, R2, C2, PEEP, P_driving, fr, Ti = (np.atleast_1d(c) for c in columnas)
+        self.n_configuraciones = R1.shape[0]
+        self.modo = np.broadcast_to(np.asarray(modo), (self.n_configuraciones,))
+        self.R1, self.C1, self.R2, self.C2 = R1, C1, R2, C2
+        self.E1, self.E2 = 1 / C1, 1 / C2
+        self.PEEP, self.P_driving, self.fr, self.Ti = PEEP, P_driving, fr, Ti
+        self.T_total = 60.0 / fr
+        self.pasos_por_ciclo = 200
+        self.motor = MotorAnalitico(
+            R=np.stack([R1, R2], axis=1),
+            C=np.stack([C1, C2], axis=1),
+            modo=self.modo,
+            PEEP=PEEP,
+            P_driving=P_driving,
+            fr=fr,
+            Ti=Ti,
+            Vt=Vt,
+        )
+
+    @classmethod
+    def desde_modelos(cls, pacientes, ventiladores) -> "SimuladorLote":
+        """Construye el lote a partir de listas de Paciente y Ventilador."""
+        if len(pacientes) != len(ventiladores):
+            raise ValueError("Se requiere un ventilador por cada paciente.")
+        return cls(
+            R1=[p.R1 for p in pacientes],
+            C1=[p.C1 for p in pacientes],
+            R2=[p.R2 for p in pacientes],
+            C2=[p.C2 for p in pacientes],
+            modo=[v.modo for v in ventiladores],
+            PEEP=[v.PEEP for v in ventiladores],
+            P_driving=[v.P_driving for v in ventiladores],
+            fr=[v.fr for v in ventiladores],
+            Ti=[v.Ti for v in ventiladores],
+            Vt=[np.nan if v.Vt is None else v.Vt for v in ventiladores],
+        )
+
+    def simular(
+        self, tiempo_total_deseado: float = 15.0, pasos_por_ciclo: int = 200
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Simula todas las configuraciones. Devuelve t, V1 y V2 con forma
+        (lote, tiempo); las filas que requieren menos ciclos que la más larga
+        se rellenan con NaN al final.
+        """
+        self.pasos_por_ciclo = pasos_por_ciclo
+        t, V = self.motor.simular(tiempo_total_deseado, pasos_por_ciclo)
+        # Señales contiguas por compartimento para el post-procesamiento
+        V1, V2 = np.moveaxis(V, -1, 0).copy()
+        return t, V1, V2
+
+    def simular_estado_estacionario(
+        self, ciclos: int = 2, pasos_por_ciclo: int = 200
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Versión por filas de Simulador.simular_estado_estacionario: simula
+        `ciclos` ciclos desde el ciclo límite de cada configuración.
+        """
+        if ciclos < 1:
+            raise ValueError("Se requiere al menos un ciclo de visualización.")
+        self.pasos_por_ciclo = pasos_por_ciclo
+        t, V = self.motor.simular(
+            pasos_por_ciclo=pasos_por_ciclo,
+            V0=self.motor.estado_estacionario(),
+            num_ciclos=ciclos,
+        )
+        V1, V2 = np.moveaxis(V, -1, 0).copy()
+        return t, V1, V2
+
+    def procesar_resultados(
+        self, t: np.ndarray, V1: np.ndarray, V2: np.ndarray
+    ) -> dict:
+        """
+        Versión por filas de Simulador.procesar_resultados: calcula flujo,
+        volumen total, presión en la vía aérea y Auto-PEEP de cada
+        configuración, además del volumen tidal y la presión pico del
+        último ciclo. 'ultimo_ciclo' tiene las métricas de
+        ciclos.metricas_por_ciclo de la última respiración, un valor por
+        fila, calculadas para todo el lote a la vez.
+        """
+        n_muestras = np.isfinite(t).sum(axis=1)
+        fila = np.arange(t.shape[0])
+        fin = n_muestras - 1
+
+        flujo1, flujo2 = _gradiente_filas(np.stack([V1, V2]), t, n_muestras)
+        flujo_total = flujo1 + flujo2
+        Vt = V1 + V2
+
+        R1, R2 = self.R1[:, None], self.R2[:, None]
+        conductancia_total = 1 / R1 + 1 / R2
+        # Fase desde el inicio de cada respiración, como en
+        # ResultadoSimulacion: todas las filas comparten la malla de
+        # pasos_por_ciclo muestras por ciclo
+        inicio_ciclo = np.repeat(t[:, :: self.pasos_por_ciclo], self.pasos_por_ciclo, 1)
+        fase = t - inicio_ciclo[:, : t.shape[1]]
+        P_pcv = self.PEEP[:, None] + self.P_driving[:, None] * (
+            (fase % self.T_total[:, None]) < self.Ti[:, None]
+        )
+        P_vcv = (
+            flujo_total + (self.E1[:, None] * V1 / R1) + (self.E2[:, None] * V2 / R2)
+        ) / conductancia_total
+        P_aw = np.where((self.modo == "PCV")[:, None], P_pcv, P_vcv)
+        P_aw[np.isnan(t)] = np.nan
+        P_alv = (self.E1[:, None] * V1 / R1 + self.E2[:, None] * V2 / R2) / (
+            conductancia_total
+        )
+
+        # Métricas del último ciclo de cada fila (ver ciclos.metricas_por_ciclo),
+        # las que usan los modelos de gases y hemodinámica, sobre una ventana
+        # (lote, pasos_por_ciclo) con las muestras de esa respiración
+        pasos = self.pasos_por_ciclo
+        filas = fila[:, None]
+        ventana = (fin - pasos + 1)[:, None] + np.arange(pasos)
+        t_ultimo = t[filas, ventana]
+        Vt_ultimo = Vt[filas, ventana]
+        P_aw_ultimo = P_aw[filas, ventana]
+        dt = np.diff(t_ultimo, axis=1)
+
+        def integral(y):
+            return np.sum(0.5 * (y[:, 1:] + y[:, :-1]) * dt, axis=1)
+
+        duracion = t_ultimo[:, -1] - t_ultimo[:, 0]
+        # Auto-PEEP: presión alveolar al final de la espiración, ponderada
+        # por la conductancia de cada compartimento
+        auto_peep = P_alv[fila, fin]
+        ultimo_ciclo = {
+            "inicio": ventana[:, 0],
+            "duracion": duracion,
+            "volumen_tidal": Vt_ultimo.max(axis=1) - Vt_ultimo.min(axis=1),
+            "volumen_inspirado": integral(np.maximum(flujo_total[filas, ventana], 0.0)),
+            "presion_pico": P_aw_ultimo.max(axis=1),
+            "presion_meseta": P_alv[filas, ventana].max(axis=1),
+            "presion_media": integral(P_aw_ultimo) / duracion,
+            "volumen_fin_espiracion": Vt[fila, fin],
+            "auto_peep": auto_peep,
+        }
+
+        return {
+            "t": t,
+            "V1": V1,
+            "V2": V2,
+            "Vt": Vt,
+            "flow1": flujo1,
+            "flow2": flujo2,
+            "flow": flujo_total,
+            "P_aw": P_aw,
+            "P_alv": P_alv,
+            "auto_peep": auto_peep,
+            "ultimo_ciclo": ultimo_ciclo,
+            "volumen_tidal": ultimo_ciclo["volumen_tidal"],
+            "presion_pico": ultimo_ciclo["presion_pico"],
+            "n_muestras": n_muestras,
+            "modo": self.modo,
+        }
@@ -0,0 +1,251 @@
+# Librerías
+import math
+
+import numpy as np
+
+from . import ciclos as ciclos_util
+from .paciente import PacienteMulticompartimental
+from .ventilador import Ventilador
+
+METODOS = ("RK45", "RK23", "DOP853", "Radau", "BDF")
+METODOS_IMPLICITOS = ("Radau", "BDF")
+
+
+def solve_ivp(*args, **kwargs):
+    """scipy.integrate.solve_ivp con importación diferida."""
+    from scipy.integrate import solve_ivp as _solve_ivp
+
+    return _solve_ivp(*args, **kwargs)
+
+
+class SimuladorMulticompartimental:
+    """
+    Simulación en PCV y VCV de un PacienteMulticompartimental:
+
+        dV/dt = (P_aw - E·V) / R,   V, R, E de forma (N,)
+
+    El lado derecho se evalúa con operaciones sobre arreglos, sin código por
+    compartimento, de modo que el costo de cada evaluación crece linealmente
+    con N. El jacobiano analítico es -diag(E/R) en PCV y en la espiración,
+    más un término de rango uno en la inspiración de VCV, donde la presión
+    en la vía aérea depende de todos los volúmenes (ver
+    jacobiano_estructurado). Los métodos implícitos lo reciben como matriz
+    dispersa: diagonal o, en la inspiración de VCV, en forma de flecha sobre
+    un estado aumentado, de modo que también la factorización es O(N).
+
+    Cada fase de cada ciclo se integra por separado, para que el integrador
+    no atraviese la discontinuidad de la entrada del ventilador. Por defecto
+    se usa BDF: en pulmones heterogéneos las constantes de tiempo más cortas
+    hacen el sistema rígido y los métodos explícitos (RK45) necesitan pasos
+    cada vez más pequeños a medida que crece N.
+    """
+
+    def __init__(
+        self,
+        paciente: PacienteMulticompartimental,
+        ventilador: Ventilador,
+        metodo: str = "BDF",
+        rtol: float = 1e-6,
+        atol: float = 1e-9,
+    ):
+        if ventilador.modo not in ("PCV", "VCV"):
+            raise ValueError(
+                "El simulador multicompartimental solo admite los modos PCV y VCV."
+            )
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconocido: {metodo}. Opciones: {METODOS}")
+        self.paciente = paciente
+        self.ventilador = ventilador
+        self.metodo = metodo
+        self.rtol = rtol
+        self.atol = atol
+        # Conductancias, E/R y conductancia total
+        self._g = 1 / paciente.R
+        self._d = paciente.E / paciente.R
+        self._G = float(np.sum(self._g))
+        self.T_total = 60.0 / ventilador.fr
+        self.Ti = min(ventilador.Ti, self.T_total)
+        self._jacobianos = {}
+        # Evaluaciones acumuladas del lado derecho y del jacobiano
+        self.nfev = 0
+        self.njev = 0
+        # Volúmenes al final de la última simulación, forma (N,)
+        self.V_final = None
+
+    def _en_inspiracion(self, t) -> np.ndarray:
+        return (np.asarray(t, dtype=float) % self.T_total) < self.Ti
+
+    def _presion(self, V: np.ndarray, en_insp) -> np.ndarray:
+        """P_aw con volúmenes V de forma (N,) o (N, K) y fase `en_insp`
+        (escalar o de forma (K,))."""
+        v = self.ventilador
+        if v.modo == "PCV":
+            return np.where(en_insp, v.PEEP + v.P_driving, v.PEEP)
+        # VCV: en la inspiración la presión hace que la suma de los flujos
+        # compartimentales sea el flujo programado
+        return np.where(en_insp, (v.flow_insp + self._d @ V) / self._G, v.PEEP)
+
+    def presion_via_aerea(self, t, V: np.ndarray) -> np.ndarray:
+        """Presión en la vía aérea a los tiempos `t` con volúmenes V de
+        forma (N,) o (N, K)."""
+        return self._presion(V, self._en_inspiracion(t))
+
+    def derivadas(self, t, V: np.ndarray, en_insp=None) -> np.ndarray:
+        """Lado derecho dV/dt para V de forma (N,) o (N, K). `en_insp` fija la
+        fase (por defecto se deduce de `t`)."""
+        if en_insp is None:
+            en_insp = self._en_inspiracion(t)
+        forma = (-1,) + (1,) * (V.ndim - 1)
+        E = self.paciente.E.reshape(forma)
+        return self._g.reshape(forma) * (self._presion(V, en_insp) - E * V)
+
+    def jacobiano_estructurado(self, t, en_insp=None):
+        """
+        Jacobiano J = -diag(d) + u·wᵀ del lado derecho (constante en cada
+        fase). Devuelve (d, u, w); u y w son None cuando J es diagonal.
+        """
+        if en_insp is None:
+            en_insp = bool(self._en_inspiracion(t))
+        if self.ventilador.modo == "VCV" and en_insp:
+            return self._d, self._g, self._d / self._G
+        return self._d, None, None
+
+    def _jacobiano_diagonal(self):
+        from scipy import sparse
+
+        return sparse.diags(-self._d, format="csc")
+
+    def _derivadas_aumentadas(self, t, y: np.ndarray) -> np.ndarray:
+        """Inspiración de VCV con el estado aumentado y = [V, s], s = (E/R)·V:
+        la presión depende solo de s y ds/dt = (E/R)·dV/dt."""
+        V, s = y[:-1], y[-1]
+        P_aw = (self.ventilador.flow_insp + s) / self._G
+        dV = self._g * (P_aw - self.paciente.E * V)
+        return np.append(dV, self._d @ dV)
+
+    def _jacobiano_aumentado(self):
+        """Jacobiano de _derivadas_aumentadas: diagonal más una fila y una
+        columna (flecha), con 3N + 1 elementos no nulos. Su factorización LU
+        dispersa no tiene relleno, así que cuesta O(N), mientras que la del
+        jacobiano denso -diag(d) + u·wᵀ cuesta O(N³)."""
+        from scipy import sparse
+
+        N = len(self._d)
+        indices = np.arange(N)
+        filas = np.concatenate([indices, indices, np.full(N, N), [N]])
+        columnas = np.concatenate([indices, np.full(N, N), indices, [N]])
+        valores = np.concatenate(
+            [-self._d, self._g / self._G, -self._d**2, [self._d @ self._g / self._G]]
+        )
+        return sparse.csc_matrix((valores, (filas, columnas)), shape=(N + 1, N + 1))
+
+    def _integrar_fase(
+        self, V0: np.ndarray, t0: float, t1: float, t_eval: np.ndarray, en_insp: bool
+    ):
+        """Integra una fase de t0 a t1; devuelve los volúmenes en `t_eval`,
+        forma (N, K), y el estado en t1."""
+        t_salida = np.unique(np.append(t_eval, t1))
+        implicito = self.metodo in METODOS_IMPLICITOS
+        aumentado = implicito and self.ventilador.modo == "VCV" and en_insp
+        # Los jacobianos son constantes en cada fase: se construyen una vez
+        if implicito and aumentado not in self._jacobianos:
+            self._jacobianos[aumentado] = (
+                self._jacobiano_aumentado() if aumentado else self._jacobiano_diagonal()
+            )
+        if aumentado:
+            fun, y0, args = self._derivadas_aumentadas, np.append(V0, self._d @ V0), ()
+        else:
+            fun, y0, args = self.derivadas, V0, (en_insp,)
+        sol = solve_ivp(
+            fun,
+            (t0, t1),
+            y0,
+            method=self.metodo,
+            t_eval=t_salida,
+            args=args,
+            rtol=self.rtol,
+            atol=self.atol,
+            **({"jac": self._jacobianos[aumentado]} if implicito else {}),
+        )
+        if not sol.success:
+            raise RuntimeError(f"Falló la integración: {sol.message}")
+        self.nfev += sol.nfev
+        self.njev += sol.njev
+        y = sol.y[:-1] if aumentado else sol.y
+        return y[:, : len(t_eval)], y[:, -1]
+
+    def simular(
+        self,
+        tiempo_total_deseado: float = 15.0,
+        pasos_por_ciclo: int = 200,
+        V0=None,
+        por_compartimento: bool = False,
+    ) -> dict:
+        """
+        Simula los ciclos necesarios para cubrir `tiempo_total_deseado` (más
+        dos de margen, igual que Simulador.simular) sobre la misma malla de
+        tiempos. `V0` son los volúmenes iniciales (por defecto, nulos).
+
+        Devuelve las mismas señales totales que Simulador.procesar_resultados
+        ("t", "Vt", "flow", "P_aw", "P_alv", "auto_peep", "por_ciclo",
+        "modo"); el flujo es el del lado derecho en cada muestra. Con
+        `por_compartimento` se incluyen además "V" y "flujos", de forma
+        (muestras, N); si no, la memoria no crece con N.
+        """
+        N = self.paciente.n_compartimentos
+        K = pasos_por_ciclo
+        num_ciclos = math.ceil(tiempo_total_deseado / self.T_total) + 2
+        V = np.zeros(N) if V0 is None else np.asarray(V0, dtype=float)
+        E, g = self.paciente.E[:, None], self._g[:, None]
+
+        senales = {"t": [], "Vt": [], "flow": [], "P_aw": [], "P_alv": []}
+        compartimentos = {"V": [], "flujos": []}
+        for i in range(num_ciclos):
+            t0 = i * self.T_total
+            t_ciclo = np.linspace(
+                t0, t0 + self.T_total, K, endpoint=i == num_ciclos - 1
+            )
+            en_insp = (t_ciclo - t0) < self.Ti
+            fases = (
+                (t0, t0 + self.Ti, en_insp, True),
+                (t0 + self.Ti, t0 + self.T_total, ~en_insp, False),
+            )
+            bloques = []
+            for inicio, fin, muestras, fase in fases:
+                if fin > inicio:
+                    Y, V = self._integrar_fase(V, inicio, fin, t_ciclo[muestras], fase)
+                    bloques.append(Y)
+            Y = np.concatenate(bloques, axis=1)
+
+            P_aw = self._presion(Y, en_insp)
+            flujos = g * (P_aw - E * Y)
+            senales["t"].append(t_ciclo)
+            senales["Vt"].append(Y.sum(axis=0))
+            senales["flow"].append(flujos.sum(axis=0))
+            senales["P_aw"].append(P_aw)
+            # Presión alveolar ponderada por la conductancia (ver Simulador)
+            senales["P_alv"].append((self._d @ Y) / self._G)
+            if por_compartimento:
+                compartimentos["V"].append(Y.T)
+                compartimentos["flujos"].append(flujos.T)
+        self.V_final = V
+
+        resultado = {nombre: np.concatenate(s) for nombre, s in senales.items()}
+        por_ciclo = ciclos_util.metricas_por_ciclo(
+            resultado["t"],
+            resultado["Vt"],
+            resultado["P_aw"],
+            resultado["P_alv"],
+            resultado["flow"],
+            ciclos_util.inicios_regulares(num_ciclos, K),
+        )
+        resultado.update(
+            auto_peep=por_ciclo["auto_peep"][-1],
+            por_ciclo=por_ciclo,
+            modo=self.ventilador.modo,
+        )
+        if por_compartimento:
+            resultado.update(
+                {nombre: np.concatenate(s) for nombre, s in compartimentos.items()}
+            )
+        return resultado
@@ -0,0 +1,66 @@
+# backend/tests/test_benchmarks.py
+
+import asyncio
+
+import pytest
+
+from benchmarks import carga, suite
+
+
+def _resultados(**medianas):
+    return {
+        "version": suite.VERSION_LINEA_BASE,
+        "casos": {
+            nombre.replace("__", "/"): {
+                "mediana_s": m,
+                "minimo_s": m,
+                "repeticiones": 5,
+            }
+            for nombre, m in medianas.items()
+        },
+    }
+
+
+def test_comparar_detecta_regresiones_por_encima_del_umbral():
+    linea_base = _resultados(simular__PCV=1.0, servicio__PCV=1.0, solo_base=1.0)
+    actuales = _resultados(simular__PCV=1.2, servicio__PCV=1.3, caso_nuevo=9.0)
+
+    regresiones = suite.comparar(actuales, linea_base, umbral=0.25)
+
+    assert [r["caso"] for r in regresiones] == ["servicio/PCV"]
+    assert regresiones[0]["razon"] == pytest.approx(1.3)
+
+
+def test_suite_guarda_y_compara_su_propia_linea_base(tmp_path):
+    ruta = tmp_path / "linea_base.json"
+    argumentos = ["--filtro", "intercambio/PCV/*", "--tiempo-min", "0.001"]
+
+    assert suite.main(argumentos + ["--guardar", str(ruta)]) == 0
+    linea_base = suite.cargar_linea_base(str(ruta))
+    assert sorted(linea_base["casos"]) == [
+        f"intercambio/PCV/{paciente}" for paciente in sorted(suite.PACIENTES)
+    ]
+    # Con un umbral holgado, repetir la medición no es una regresión
+    assert suite.main(argumentos + ["--comparar", str(ruta), "--umbral", "100"]) == 0
+
+
+def test_carga_reporta_latencias_y_cpu_por_etapa():
+    escenario = dict(
+        carga.ESCENARIO_POR_DEFECTO,
+        etapas=[
+            {"concurrencia": 1, "duracion_s": 0.2},
+            {"concurrencia": 2, "duracion_s": 0.2},
+        ],
+        opciones={"max_points": 50},
+    )
+
+    resultado = asyncio.run(carga.ejecutar_escenario(escenario, semilla=1))
+
+    assert [e["concurrencia"] for e in resultado["etapas"]] == [1, 2]
+    for etapa in resultado["etapas"]:
+        assert etapa["peticiones"] > 0
+        assert etapa["errores"] == 0
+        assert etapa["rps"] > 0
+        latencia = etapa["latencia_ms"]
+        assert 0 < latencia["p50"] <= latencia["p95"] <= latencia["p99"]
+        assert etapa["cpu_s"] >= 0
@@ -0,0 +1,86 @@
+# backend/tests/test_cache.py
+
+from app.services.cache import CacheResultados, clave_parametros
+from app.services.ejecutor import EjecutorSimulaciones
+from app.services.simulation_service import SimulationService
+
+PACIENTE = {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05}
+VENTILADOR = {
+    "modo": "PCV",
+    "PEEP": 5.0,
+    "P_driving": 15.0,
+    "fr": 15.0,
+    "Ti": 1.0,
+    "Vt": 0.5,
+    "FiO2": 0.21,
+}
+FISIOLOGIA = {
+    "k_sensibilidad": 0.1,
+    "Gp_control": 0.3,
+    "Gi_control": 0.01,
+    "Qs_Qt": 0.05,
+    "V_D": 0.15,
+}
+
+
+def test_clave_es_canonica():
+    """El orden de las claves y 10 frente a 10.0 no cambian el hash."""
+    a = clave_parametros(paciente={"R1": 10, "C1": 0.05})
+    b = clave_parametros(paciente={"C1": 0.05, "R1": 10.0})
+    assert a == b
+    assert a != clave_parametros(paciente={"R1": 11.0, "C1": 0.05})
+
+
+def test_cache_desaloja_la_entrada_menos_reciente():
+    cache = CacheResultados(max_entradas=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    assert cache.obtener("a") == 1  # "b" pasa a ser la menos reciente
+    cache.guardar("c", 3)
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("c") == 3
+    estadisticas = cache.estadisticas()
+    assert estadisticas["desalojos"] == 1
+    assert estadisticas["aciertos"] == 2
+    assert estadisticas["fallos"] == 1
+
+
+def test_cache_en_disco_sobrevive_reinicios(tmp_path):
+    CacheResultados(directorio=str(tmp_path)).guardar("a", {"x": [1.0, 2.0]})
+
+    nueva = CacheResultados(directorio=str(tmp_path))
+    assert nueva.obtener("a") == {"x": [1.0, 2.0]}
+    assert nueva.estadisticas()["aciertos_disco"] == 1
+
+
+def test_servicio_reutiliza_resultados():
+    servicio = SimulationService(EjecutorSimulaciones(backend="local"))
+    primero = servicio.run_simulation(PACIENTE, VENTILADOR, FISIOLOGIA)
+    segundo = servicio.run_simulation(dict(PACIENTE), VENTILADOR, FISIOLOGIA)
+
+    assert segundo is primero
+    assert servicio.cache.estadisticas()["aciertos"] == 1
+
+
+def test_cache_en_disco_desaloja_sin_recorrer_el_directorio(tmp_path, monkeypatch):
+    """El orden LRU de los archivos se lleva en memoria: el directorio solo
+    se recorre al crear la caché."""
+    anterior = CacheResultados(directorio=str(tmp_path))
+    anterior.guardar("a", 1)
+    anterior.guardar("b", 2)
+
+    cache = CacheResultados(max_entradas=1, directorio=str(tmp_path))
+    assert cache.estadisticas()["entradas_disco"] == 2
+    cache.max_entradas_disco = 2
+
+    def listdir(_):
+        raise AssertionError("El directorio no debe recorrerse al escribir")
+
+    monkeypatch.setattr("app.services.cache.os.listdir", listdir)
+    assert cache.obtener("a") == 1  # "b" pasa a ser el archivo menos reciente
+    cache.guardar("c", 3)
+
+    assert [(tmp_path / f"{c}.pkl").exists() for c in "abc"] == [True, False, True]
+    assert cache.estadisticas()["entradas_disco"] == 2
+    assert cache.obtener("b") is None
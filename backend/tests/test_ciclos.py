@@ -0,0 +1,34 @@
+# backend/tests/test_ciclos.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+
+
+def test_metricas_por_ciclo_coinciden_con_calculo_por_respiracion():
+    """Las reducciones segmentadas reproducen el cálculo respiración a
+    respiración sobre el índice de ciclos registrado por la simulación."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="PCV", PEEP=5.0, P_driving=15.0, fr=15.0, Ti=1.0)
+    simulador = Simulador(paciente, ventilador, motor="analitico")
+    t, V1, V2 = simulador.simular(30.0)
+    resultados = simulador.procesar_resultados(t, V1, V2)
+    por_ciclo = resultados["por_ciclo"]
+
+    inicios = simulador.inicios_ciclo
+    assert len(por_ciclo["volumen_tidal"]) == simulador.ciclos_para(30.0)
+    limites = np.append(inicios, len(t))
+    for b, (a, z) in enumerate(zip(limites[:-1], limites[1:])):
+        Vt = resultados["Vt"][a:z]
+        assert por_ciclo["volumen_tidal"][b] == pytest.approx(Vt.max() - Vt.min())
+        assert por_ciclo["auto_peep"][b] == pytest.approx(resultados["P_alv"][z - 1])
+        # La presión media integra hasta la primera muestra del ciclo siguiente
+        fin = min(z, len(t) - 1)
+        media = np.trapz(resultados["P_aw"][a : fin + 1], t[a : fin + 1]) / (
+            t[fin] - t[a]
+        )
+        assert por_ciclo["presion_media"][b] == pytest.approx(media)
+    assert resultados["auto_peep"] == pytest.approx(por_ciclo["auto_peep"][-1])
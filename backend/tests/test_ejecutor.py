@@ -0,0 +1,85 @@
+# backend/tests/test_ejecutor.py
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.ejecutor import (
+    EjecutorSimulaciones,
+    ServicioSaturadoError,
+    TiempoAgotadoError,
+)
+
+
+def test_ejecutor_rechaza_trabajos_con_la_cola_llena():
+    """Con capacidad 1, un segundo trabajo simultáneo se rechaza de inmediato."""
+    ejecutor = EjecutorSimulaciones(backend="hilos", max_workers=1, max_pendientes=0)
+
+    async def escenario():
+        primero = asyncio.ensure_future(ejecutor.ejecutar(time.sleep, 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(ServicioSaturadoError):
+            await ejecutor.ejecutar(time.sleep, 0.0)
+        await primero
+        assert ejecutor.en_curso == 0
+
+    asyncio.run(escenario())
+    ejecutor.cerrar()
+
+
+def test_ejecutor_aplica_tiempo_maximo():
+    ejecutor = EjecutorSimulaciones(backend="hilos", max_workers=1, timeout_s=0.05)
+
+    with pytest.raises(TiempoAgotadoError):
+        asyncio.run(ejecutor.ejecutar(time.sleep, 0.5))
+    ejecutor.cerrar()
+
+
+def test_ejecutor_conserva_el_lugar_hasta_que_termina_el_trabajo():
+    """Un trabajo que superó el tiempo máximo sigue corriendo: ocupa su lugar
+    hasta terminar, así que otro trabajo se rechaza mientras tanto."""
+    ejecutor = EjecutorSimulaciones(
+        backend="hilos", max_workers=1, max_pendientes=0, timeout_s=0.05
+    )
+
+    async def escenario():
+        with pytest.raises(TiempoAgotadoError):
+            await ejecutor.ejecutar(time.sleep, 0.3)
+        assert ejecutor.en_curso == 1
+        with pytest.raises(ServicioSaturadoError):
+            await ejecutor.ejecutar(time.sleep, 0.0)
+        await asyncio.sleep(0.4)
+        assert ejecutor.en_curso == 0
+        await ejecutor.ejecutar(time.sleep, 0.0)
+
+    asyncio.run(escenario())
+    ejecutor.cerrar()
+
+
+def test_reserva_libera_su_lugar_al_terminar_el_calculo():
+    ejecutor = EjecutorSimulaciones(
+        backend="procesos", max_workers=1, max_pendientes=0, timeout_s=0.05
+    )
+
+    async def escenario():
+        reserva = ejecutor.reservar()
+        assert await reserva.ejecutar(pow, 2, 10) == 1024
+        with pytest.raises(ServicioSaturadoError):
+            ejecutor.reservar()
+        with pytest.raises(TiempoAgotadoError):
+            await reserva.ejecutar(time.sleep, 0.3)
+        reserva.liberar()
+        assert ejecutor.en_curso == 1
+        await asyncio.sleep(0.4)
+        assert ejecutor.en_curso == 0
+
+    asyncio.run(escenario())
+    ejecutor.cerrar()
+
+
+def test_ejecutor_de_procesos_devuelve_resultado():
+    ejecutor = EjecutorSimulaciones(backend="procesos", max_workers=1)
+
+    assert asyncio.run(ejecutor.ejecutar(pow, 2, 10)) == 1024
+    ejecutor.cerrar()
@@ -0,0 +1,73 @@
+# backend/tests/test_estado.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.control import ControlRespiratorio
+from models.estado import EstadoSimulacion
+
+
+def test_simulacion_espontanea_reanudada_coincide_con_simulacion_unica():
+    """Continuar desde el estado final reproduce la simulación de una pieza."""
+
+    def simulador():
+        return Simulador(
+            Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08),
+            Ventilador(modo="ESPONTANEO", fr=12.0),
+            ControlRespiratorio(Gp=0.3, Gi=0.01),
+        )
+
+    unico = simulador()
+    t, V1, V2 = unico.simular_espontaneo(iteraciones=12)
+
+    primero = simulador()
+    t_a, V1_a, V2_a = primero.simular_espontaneo(iteraciones=5)
+    estado = EstadoSimulacion.desde_dict(primero.estado_final.a_dict())
+    segundo = simulador()
+    t_b, V1_b, V2_b = segundo.simular_espontaneo(iteraciones=7, estado=estado)
+
+    # La continuación empieza en el último instante de la primera parte
+    np.testing.assert_array_equal(np.concatenate([t_a[:-1], t_b]), t)
+    np.testing.assert_array_equal(np.concatenate([V1_a[:-1], V1_b]), V1)
+    np.testing.assert_array_equal(np.concatenate([V2_a[:-1], V2_b]), V2)
+    assert np.all(np.diff(t) > 0)
+    assert segundo.estado_final == unico.estado_final
+
+
+@pytest.mark.parametrize("motor", ["analitico", "numerico"])
+def test_simulacion_controlada_reanudada_alcanza_el_mismo_estado(motor):
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="VCV", PEEP=5.0, fr=15.0, Ti=1.0, Vt=0.5)
+
+    unico = Simulador(paciente, ventilador, motor=motor)
+    unico.simular(24.0)  # 8 ciclos
+    por_partes = Simulador(paciente, ventilador, motor=motor)
+    por_partes.simular(8.0)  # 4 ciclos
+    t, _, _ = por_partes.simular(8.0, estado=por_partes.estado_final)
+
+    assert t[0] == pytest.approx(16.0)
+    final, esperado = por_partes.estado_final, unico.estado_final
+    assert final.t == pytest.approx(esperado.t)
+    assert final.V1 == pytest.approx(esperado.V1, rel=1e-5)
+    assert final.V2 == pytest.approx(esperado.V2, rel=1e-5)
+
+
+@pytest.mark.parametrize("motor", ["analitico", "numerico"])
+def test_pcv_reanudada_desde_tiempo_no_alineado_mantiene_la_fase(motor):
+    """La presión PCV sigue a los ciclos simulados, que empiezan en el
+    tiempo del estado aunque no sea múltiplo del periodo."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="PCV", PEEP=5.0, P_driving=15.0, fr=14.0, Ti=1.0)
+    simulador = Simulador(paciente, ventilador, motor=motor)
+    t, V1, V2 = simulador.simular(10.0, estado=EstadoSimulacion(t=36.0))
+    resultados = simulador.procesar_resultados(t, V1, V2)
+
+    assert t[0] == pytest.approx(36.0)
+    inspiracion = resultados["flow"] > 0.05
+    assert inspiracion[t < 37.0].any()
+    assert np.all(resultados["P_aw"][inspiracion] > ventilador.PEEP)
+    por_ciclo = resultados["por_ciclo"]
+    np.testing.assert_allclose(por_ciclo["presion_pico"], 20.0)
@@ -0,0 +1,26 @@
+# backend/tests/test_estado_estacionario.py
+
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+
+
+@pytest.mark.parametrize("motor", ["numerico", "analitico"])
+def test_estado_estacionario_coincide_con_simulacion_larga(motor):
+    """
+    El ciclo límite calculado directamente reproduce el Auto-PEEP al que
+    converge una simulación larga con constantes de tiempo prolongadas.
+    """
+    paciente = Paciente(R1=30.0, C1=0.1, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="PCV", fr=25.0, Ti=1.0)
+    simulador = Simulador(paciente, ventilador, motor=motor)
+
+    t, V1, V2 = simulador.simular_estado_estacionario(ciclos=2)
+    assert len(t) == 2 * 200
+    estacionario = simulador.procesar_resultados(t, V1, V2)
+
+    referencia = Simulador(paciente, ventilador, motor="analitico")
+    larga = referencia.procesar_resultados(*referencia.simular(300.0))
+    assert estacionario["auto_peep"] == pytest.approx(larga["auto_peep"], rel=1e-2)
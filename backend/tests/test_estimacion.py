@@ -0,0 +1,74 @@
+# backend/tests/test_estimacion.py
+
+import time
+
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+
+from models.paciente import Paciente
+from models.estimacion import estimar_mecanica
+
+
+def _registro_pcv(paciente, duracion_s=180.0, dt=0.01, subida=0.1):
+    """Registro sintético de un ventilador a 100 Hz: PCV con subida de presión
+    en rampa, integrado con precisión (independiente del modelo estimado)."""
+    T, Ti = 4.0, 1.0
+
+    def presion(t):
+        tc = np.mod(t, T)
+        return 5.0 + 15.0 * np.clip(np.minimum(tc, Ti + subida - tc) / subida, 0, 1)
+
+    def rhs(t, V):
+        P = presion(t)
+        return [
+            (P - paciente.E1 * V[0]) / paciente.R1,
+            (P - paciente.E2 * V[1]) / paciente.R2,
+        ]
+
+    t = np.arange(0.0, duracion_s, dt)
+    sol = solve_ivp(
+        rhs, (0.0, t[-1]), [0.2, 0.3], t_eval=t, rtol=1e-10, atol=1e-12, max_step=dt
+    )
+    return t, presion(t), np.sum(rhs(t, sol.y), axis=0)
+
+
+def test_estimacion_recupera_parametros_con_intervalos():
+    """
+    Con un registro de 3 minutos sin ruido se recuperan R1, C1, R2 y C2;
+    con ruido en el flujo, los intervalos contienen los valores reales. El
+    ajuste de un registro de varios minutos tarda bastante menos de 1 s.
+    """
+    paciente = Paciente(R1=5.0, C1=0.04, R2=20.0, C2=0.06)
+    reales = {"R1": 5.0, "C1": 0.04, "R2": 20.0, "C2": 0.06}
+    t, presion, flujo = _registro_pcv(paciente)
+
+    exacto = estimar_mecanica(t, presion, flujo=flujo)
+    for nombre, valor in reales.items():
+        assert exacto["parametros"][nombre]["valor"] == pytest.approx(valor, rel=1e-3)
+
+    ruido = np.random.default_rng(0).normal(0.0, 0.02, len(t))
+    inicio = time.perf_counter()
+    resultado = estimar_mecanica(t, presion, flujo=flujo + ruido)
+    assert time.perf_counter() - inicio < 1.0
+    assert resultado["ajuste"]["muestras"] == len(t)
+    for nombre, valor in reales.items():
+        bajo, alto = resultado["parametros"][nombre]["ic"]
+        assert bajo < valor < alto
+        assert alto - bajo < 0.05 * valor
+
+    with pytest.raises(ValueError):
+        estimar_mecanica(t, presion[:-1], flujo=flujo)
+
+
+def test_estimacion_rechaza_registros_que_no_identifican_los_parametros():
+    """Sin excitación (presión constante, flujo nulo) o con dos
+    compartimentos iguales no hay un ajuste único: ValueError en lugar de
+    parámetros arbitrarios con intervalos de ancho nulo."""
+    t = np.arange(0.0, 60.0, 0.01)
+    with pytest.raises(ValueError, match="constante"):
+        estimar_mecanica(t, np.full_like(t, 5.0), flujo=np.zeros_like(t))
+
+    t, presion, flujo = _registro_pcv(Paciente(R1=10.0, C1=0.05, R2=10.0, C2=0.05))
+    with pytest.raises(ValueError, match="rango incompleto"):
+        estimar_mecanica(t, presion, flujo=flujo)
@@ -0,0 +1,51 @@
+# backend/tests/test_motor_analitico.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.control import ControlRespiratorio
+
+
+def test_motor_analitico_pcv_coincide_con_solucion_exponencial():
+    """
+    En PCV cada compartimento es un circuito RC independiente; durante la
+    primera inspiración V_i(t) = C_i * P * (1 - exp(-t / (R_i * C_i))).
+    """
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="PCV", PEEP=5.0, P_driving=15.0, fr=15.0, Ti=1.0)
+    t, V1, V2 = Simulador(paciente, ventilador, motor="analitico").simular(30.0)
+
+    en_insp = t < ventilador.Ti
+    P = ventilador.PEEP + ventilador.P_driving
+    esperado_1 = paciente.C1 * P * (1 - np.exp(-t / (paciente.R1 * paciente.C1)))
+    esperado_2 = paciente.C2 * P * (1 - np.exp(-t / (paciente.R2 * paciente.C2)))
+
+    np.testing.assert_allclose(V1[en_insp], esperado_1[en_insp], atol=1e-12)
+    np.testing.assert_allclose(V2[en_insp], esperado_2[en_insp], atol=1e-12)
+
+
+def test_motor_analitico_vcv_entrega_volumen_programado():
+    """En VCV el volumen inspirado en cada ciclo es exactamente el Vt programado."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="VCV", PEEP=5.0, fr=15.0, Ti=1.0, Vt=0.5)
+    simulador = Simulador(paciente, ventilador, motor="analitico")
+    t, V1, V2 = simulador.simular(30.0, pasos_por_ciclo=200)
+
+    # Con 200 pasos por ciclo de 4 s, t = Ti cae exactamente sobre la malla
+    indice_fin_insp = 50
+    assert t[indice_fin_insp] == pytest.approx(ventilador.Ti)
+    Vt = V1 + V2
+    assert Vt[indice_fin_insp] - Vt[0] == pytest.approx(0.5, abs=1e-12)
+
+    # La malla de tiempos es la misma que la del integrador numérico
+    t_num, _, _ = Simulador(paciente, ventilador).simular(30.0)
+    np.testing.assert_allclose(t, t_num, atol=1e-12)
+
+
+def test_motor_analitico_rechaza_modo_espontaneo():
+    ventilador = Ventilador(modo="ESPONTANEO")
+    with pytest.raises(ValueError):
+        Simulador(Paciente(), ventilador, ControlRespiratorio(), motor="analitico")
@@ -0,0 +1,52 @@
+# backend/tests/test_motor_espontaneo.py
+
+import numpy as np
+from scipy.integrate import solve_ivp
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.control import ControlRespiratorio
+from models.motor_espontaneo import MotorEspontaneo
+
+
+def test_motor_fusionado_coincide_con_integracion_precisa():
+    """La solución exacta de un ciclo espontáneo coincide con RK45 a
+    tolerancias estrictas."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    control = ControlRespiratorio()
+    simulador = Simulador(paciente, Ventilador(modo="ESPONTANEO"), control)
+    amplitud, frecuencia = control.actualizar(55.0, 5.0)
+    t0, t1 = 1.3, 1.3 + 1.0 / frecuencia  # Empieza a mitad de una fase
+
+    sol = solve_ivp(
+        simulador._modelo_edo,
+        [t0, t1],
+        [0.1, 0.05],
+        t_eval=np.linspace(t0, t1, 100),
+        rtol=1e-12,
+        atol=1e-14,
+        args=(control.generar_Pmus, paciente.R1, paciente.E1, paciente.R2, paciente.E2),
+    )
+    t, V = MotorEspontaneo.desde_modelos(paciente).ciclo(
+        [0.1, 0.05], t0, t1, 100, amplitud, frecuencia
+    )
+
+    np.testing.assert_allclose(t, sol.t)
+    np.testing.assert_allclose(V.T, sol.y, atol=1e-10)
+
+
+def test_simulacion_espontanea_se_detiene_al_converger_el_control():
+    simulador = Simulador(
+        Paciente(R1=10.0, C1=0.05, R2=10.0, C2=0.05),
+        Ventilador(modo="ESPONTANEO"),
+        ControlRespiratorio(),
+        motor="fusionado",
+    )
+    simulador.simular_espontaneo(iteraciones=200, tolerancia=1e-6)
+
+    ciclos = len(simulador.inicios_ciclo)
+    assert ciclos < 200
+    estado = simulador.estado_final
+    assert estado.paco2 == 30.0  # Límite inferior de la heurística
+    assert estado.integral_error == -50.0  # Término integral saturado
@@ -0,0 +1,68 @@
+# backend/tests/test_multicompartimental.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente, PacienteMulticompartimental
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.simulador_multicompartimental import SimuladorMulticompartimental
+
+
+@pytest.mark.parametrize("modo", ["PCV", "VCV"])
+@pytest.mark.parametrize("metodo", ["BDF", "RK45"])
+def test_multicompartimental_con_dos_unidades_coincide_con_simulador(modo, metodo):
+    paciente = Paciente(R1=5.0, C1=0.04, R2=20.0, C2=0.06)
+    ventilador = Ventilador(modo=modo, PEEP=5.0, fr=15.0, Ti=1.0, Vt=0.5)
+    t, V1, V2 = Simulador(paciente, ventilador, motor="analitico").simular(30.0)
+
+    resultado = SimuladorMulticompartimental(
+        PacienteMulticompartimental.desde_paciente(paciente), ventilador, metodo
+    ).simular(30.0)
+
+    np.testing.assert_allclose(resultado["t"], t, atol=1e-12)
+    np.testing.assert_allclose(resultado["Vt"], V1 + V2, atol=1e-5)
+
+
+def test_multicompartimental_jacobiano_diagonal_mas_rango_uno():
+    paciente = PacienteMulticompartimental.heterogeneo(20, semilla=1)
+    ventilador = Ventilador(modo="VCV", PEEP=5.0, fr=15.0, Ti=1.0, Vt=0.5)
+    simulador = SimuladorMulticompartimental(paciente, ventilador)
+    V = np.random.default_rng(0).uniform(0.0, 0.05, 20)
+
+    for t in (0.5, 2.0):  # inspiración y espiración
+        d, u, w = simulador.jacobiano_estructurado(t)
+        J = -np.diag(d) + (np.outer(u, w) if u is not None else 0.0)
+        numerico = np.column_stack(
+            [
+                (simulador.derivadas(t, V + 1e-7 * e) - simulador.derivadas(t, V))
+                / 1e-7
+                for e in np.eye(20)
+            ]
+        )
+        np.testing.assert_allclose(J, numerico, rtol=1e-5, atol=1e-6)
+
+
+def test_multicompartimental_pulmon_heterogeneo_rigido():
+    """
+    200 unidades con constantes de tiempo de 0.1 ms a varios segundos: en
+    VCV cada ciclo entrega el Vt programado, y las salidas por compartimento
+    suman las totales.
+    """
+    paciente = PacienteMulticompartimental.heterogeneo(200, dispersion=2.0, semilla=0)
+    assert paciente.conductancia_total == pytest.approx(1 / 10.0)
+    assert paciente.compliancia_total == pytest.approx(0.05)
+    ventilador = Ventilador(modo="VCV", PEEP=5.0, fr=15.0, Ti=1.0, Vt=0.5)
+    simulador = SimuladorMulticompartimental(paciente, ventilador)
+
+    resultado = simulador.simular(15.0, por_compartimento=True)
+
+    # El último ciclo incluye su punto final y tiene un intervalo menos
+    np.testing.assert_allclose(
+        resultado["por_ciclo"]["volumen_tidal"][:-1], 0.5, rtol=1e-4
+    )
+    assert resultado["V"].shape == (len(resultado["t"]), 200)
+    np.testing.assert_allclose(resultado["V"].sum(axis=1), resultado["Vt"])
+    np.testing.assert_allclose(resultado["flujos"].sum(axis=1), resultado["flow"])
+    np.testing.assert_allclose(simulador.V_final, resultado["V"][-1])
+    assert "V" not in simulador.simular(15.0)
@@ -0,0 +1,39 @@
+# backend/tests/test_oxigeno.py
+
+import numpy as np
+import pytest
+
+from models import oxigeno
+
+
+@pytest.mark.parametrize("curva", oxigeno.CURVAS)
+def test_inversa_del_contenido_recupera_la_po2(curva):
+    """La inversa por tabla funciona con arreglos y es precisa en todo el rango."""
+    po2 = np.linspace(5.0, 600.0, 1000)
+    contenido = oxigeno.contenido_o2(po2, hb_g_dl=12.0, curva=curva)
+    np.testing.assert_allclose(
+        oxigeno.po2_desde_contenido(contenido, hb_g_dl=12.0, curva=curva),
+        po2,
+        atol=1e-3,
+    )
+
+
+def test_curva_de_severinghaus():
+    """P50 de la curva de Severinghaus ≈ 26.9 mmHg; escalares devuelven float."""
+    assert oxigeno.saturacion(26.86, "severinghaus") == pytest.approx(0.5, abs=1e-3)
+    assert isinstance(oxigeno.po2_desde_contenido(18.0), float)
+
+
+@pytest.mark.parametrize("curva", oxigeno.CURVAS)
+def test_inversa_en_los_extremos_de_la_tabla(curva):
+    """La inversa recupera 0 y 800 mmHg (los extremos de la tabla) y sus
+    vecinos, y satura fuera del rango."""
+    po2 = np.array([0.0, 1e-3, 0.5, 1.0, 799.0, 799.9, 800.0])
+    contenido = oxigeno.contenido_o2(po2, hb_g_dl=15.0, curva=curva)
+    np.testing.assert_allclose(
+        oxigeno.po2_desde_contenido(contenido, hb_g_dl=15.0, curva=curva),
+        po2,
+        atol=1e-6,
+    )
+    assert oxigeno.po2_desde_contenido(contenido[-1] + 1.0, curva=curva) == 800.0
+    assert oxigeno.po2_desde_contenido(0.0, curva=curva) == 0.0
@@ -0,0 +1,100 @@
+# backend/tests/test_prolongado.py
+
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.control import ControlRespiratorio
+from models.intercambio import IntercambioGases
+from models.hemodinamica import InteraccionCorazonPulmon
+
+
+@pytest.mark.parametrize("modo", ["PCV", "VCV"])
+def test_simulacion_prolongada_coincide_con_registro_completo(tmp_path, modo):
+    """Los agregados por minuto, el volcado a disco y los ciclos recientes
+    reproducen la simulación completa de la misma duración."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(
+        modo=modo, PEEP=5.0, P_driving=15.0, fr=15.0, Ti=1.0, Vt=0.5
+    )
+    completa = Simulador(paciente, ventilador, motor="analitico")
+    t, V1, V2 = completa.simular(600.0)  # 152 ciclos de 4 s
+    por_ciclo = completa.procesar_resultados(t, V1, V2)["por_ciclo"]
+
+    ruta = tmp_path / "volcado.npy"
+    simulador = Simulador(paciente, ventilador, motor="analitico")
+    resultado = simulador.simular_prolongado(608.0, ruta_volcado=ruta)
+
+    assert resultado["ciclos"] == 152 and resultado["muestras"] == len(t)
+    volcado = np.load(ruta, mmap_mode="r")
+    np.testing.assert_allclose(volcado, np.column_stack([t, V1, V2]), atol=1e-12)
+    recientes = resultado["recientes"]
+    assert len(recientes["t"]) == 15 * 200
+    np.testing.assert_allclose(recientes["t"], t[-3000:], atol=1e-12)
+    np.testing.assert_allclose(
+        recientes["por_ciclo"]["volumen_tidal"], por_ciclo["volumen_tidal"][-15:]
+    )
+
+    minuto = t[por_ciclo["inicio"]] // 60
+    por_minuto = resultado["por_minuto"]
+    assert len(por_minuto["inicio_s"]) == 11
+    for m in range(11):
+        ciclos = minuto == m
+        duracion = por_ciclo["duracion"][ciclos].sum()
+        assert por_minuto["ciclos"][m] == ciclos.sum()
+        assert por_minuto["ventilacion_minuto"][m] == pytest.approx(
+            por_ciclo["volumen_inspirado"][ciclos].sum() * 60 / duracion
+        )
+        assert por_minuto["presion_media"][m] == pytest.approx(
+            (por_ciclo["presion_media"] * por_ciclo["duracion"])[ciclos].sum()
+            / duracion
+        )
+        assert por_minuto["presion_pico"][m] == por_ciclo["presion_pico"][ciclos].max()
+        assert por_minuto["auto_peep"][m] == pytest.approx(
+            por_ciclo["auto_peep"][ciclos][-1]
+        )
+
+
+def test_simulacion_prolongada_memoria_constante():
+    """La memoria no crece con la duración: seis veces más tiempo simulado
+    no aumenta el pico de memoria."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(modo="PCV", PEEP=5.0, P_driving=15.0, fr=15.0, Ti=1.0)
+    intercambio = IntercambioGases(
+        ventilador=ventilador,
+        hemodinamica=InteraccionCorazonPulmon(),
+        V_D=0.15,
+        Qs_Qt=0.05,
+        FiO2=0.21,
+        VCO2=200,
+        R=0.8,
+        Pb=560,
+    )
+    picos = []
+    for duracion in (600.0, 3600.0):
+        simulador = Simulador(paciente, ventilador, motor="analitico")
+        tracemalloc.start()
+        resultado = simulador.simular_prolongado(duracion, intercambio=intercambio)
+        picos.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert len(resultado["por_minuto"]["PaO2_mmHg"]) == duracion // 60
+    assert picos[1] < 1.2 * picos[0]
+
+
+def test_simulacion_prolongada_espontanea_cubre_la_duracion(tmp_path):
+    ruta = tmp_path / "espontaneo.npy"
+    simulador = Simulador(
+        Paciente(), Ventilador(modo="ESPONTANEO"), ControlRespiratorio(), "fusionado"
+    )
+    resultado = simulador.simular_prolongado(300.0, ruta_volcado=ruta)
+
+    t = np.load(ruta, mmap_mode="r")[:, 0]
+    assert len(t) == resultado["muestras"]
+    assert np.all(np.diff(t) > 0)
+    # La última respiración (100 muestras) empieza antes de 300 s y termina después
+    assert t[-100] < 300.0 <= simulador.estado_final.t
+    assert resultado["por_minuto"]["ciclos"].sum() == resultado["ciclos"]
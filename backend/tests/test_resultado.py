@@ -0,0 +1,79 @@
+# backend/tests/test_resultado.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models import resultado as resultado_util
+
+
+@pytest.mark.parametrize("modo", ["PCV", "VCV"])
+def test_resultado_deriva_senales_al_pedirlas_sin_copiar_el_registro(modo):
+    """procesar_resultados reutiliza el arreglo reservado por la simulación,
+    deriva cada señal solo al pedirla y reproduce el cálculo directo."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    ventilador = Ventilador(
+        modo=modo, PEEP=5.0, P_driving=15.0, fr=15.0, Ti=1.0, Vt=0.5
+    )
+    simulador = Simulador(paciente, ventilador, motor="analitico")
+    t, V1, V2 = simulador.simular(30.0)
+    resultados = simulador.procesar_resultados(t, V1, V2)
+
+    assert resultados.datos is simulador.registro
+    assert resultados.nbytes == simulador.registro.nbytes
+    flujo1, flujo2 = np.gradient(V1, t), np.gradient(V2, t)
+    np.testing.assert_allclose(resultados["flow"], flujo1 + flujo2, atol=1e-12)
+    G = 1 / paciente.R1 + 1 / paciente.R2
+    P_alv = (paciente.E1 * V1 / paciente.R1 + paciente.E2 * V2 / paciente.R2) / G
+    if modo == "PCV":
+        # Fase desde el inicio de cada respiración (200 muestras por ciclo)
+        P_aw = ventilador.presion(t - np.repeat(t[::200], 200))
+    else:
+        P_aw = (flujo1 + flujo2) / G + P_alv
+    np.testing.assert_allclose(resultados["P_aw"], P_aw, atol=1e-12)
+    np.testing.assert_allclose(resultados["P_alv"], P_alv, atol=1e-12)
+    assert "flow1" in resultados and "flow1" not in resultados._derivadas
+    np.testing.assert_array_equal(resultados["flow1"], flujo1)
+
+    # float32: la mitad de memoria y las mismas señales y métricas
+    compacto = Simulador(paciente, ventilador, motor="analitico", dtype="float32")
+    resultados32 = compacto.procesar_resultados(*compacto.simular(30.0))
+    assert resultados32.datos.nbytes * 2 == resultados.datos.nbytes
+    assert resultados32["flow"].dtype == np.float32
+    np.testing.assert_allclose(resultados32["Vt"], resultados["Vt"], atol=1e-6)
+    np.testing.assert_allclose(resultados32["P_aw"], resultados["P_aw"], atol=1e-3)
+    assert resultados32["auto_peep"] == pytest.approx(resultados["auto_peep"], rel=1e-4)
+
+
+def test_gradiente_por_bloques_identico_a_numpy(monkeypatch):
+    monkeypatch.setattr(resultado_util, "_BLOQUE_GRADIENTE", 7)
+    rng = np.random.default_rng(0)
+    t = np.cumsum(rng.uniform(0.01, 0.02, 100))
+    f = rng.normal(size=100)
+    for n in (2, 8, 15, 100):
+        np.testing.assert_array_equal(
+            resultado_util.gradiente(f[:n], t[:n]), np.gradient(f[:n], t[:n])
+        )
+
+
+def test_resultado_no_reutiliza_el_indice_de_ciclos_con_arreglos_ajenos():
+    """El índice de respiraciones de la última simulación solo se aplica a
+    sus propios arreglos, no a otros de la misma longitud."""
+    paciente = Paciente(R1=5.0, C1=0.02, R2=20.0, C2=0.08)
+    simulador = Simulador(paciente, Ventilador(modo="PCV", fr=15.0), motor="analitico")
+    t, V1, V2 = simulador.simular(30.0)
+    otro = Simulador(paciente, Ventilador(modo="PCV", fr=30.0), motor="analitico")
+    t_otro, V1_otro, V2_otro = otro.simular(15.0)  # Misma longitud, otros ciclos
+    assert len(t_otro) == len(t)
+
+    propios = simulador.procesar_resultados(t, V1, V2)
+    assert len(propios["por_ciclo"]["inicio"]) == simulador.ciclos_para(30.0)
+    for ajenos in ((t_otro, V1_otro, V2_otro), (t.copy(), V1.copy(), V2.copy())):
+        resultados = simulador.procesar_resultados(*ajenos)
+        np.testing.assert_array_equal(resultados.inicios_ciclo, [0])
+    resultados = simulador.procesar_resultados(
+        t_otro, V1_otro, V2_otro, inicios_ciclo=otro.inicios_ciclo
+    )
+    assert len(resultados["por_ciclo"]["inicio"]) == len(otro.inicios_ciclo)
@@ -0,0 +1,53 @@
+# backend/tests/test_simulador_lote.py
+
+import numpy as np
+import pytest
+
+from models.paciente import Paciente
+from models.ventilador import Ventilador
+from models.simulador import Simulador
+from models.simulador_lote import SimuladorLote
+
+
+def test_simulador_lote_coincide_con_simulaciones_individuales():
+    """Cada fila del lote reproduce Simulador.simular + procesar_resultados."""
+    configuraciones = [
+        (Paciente(5.0, 0.02, 20.0, 0.08), Ventilador("PCV", fr=15.0, Ti=1.0)),
+        (Paciente(10.0, 0.05, 10.0, 0.05), Ventilador("VCV", fr=22.0, Ti=0.8, Vt=0.5)),
+        (Paciente(30.0, 0.1, 3.0, 0.01), Ventilador("PCV", fr=30.0, Ti=0.9)),
+        (Paciente(5.0, 0.02, 20.0, 0.08), Ventilador("PCV", fr=22.0, Ti=0.8)),
+    ]
+    lote = SimuladorLote.desde_modelos(*zip(*configuraciones))
+    t, V1, V2 = lote.simular(30.0)
+    resultados = lote.procesar_resultados(t, V1, V2)
+
+    for fila, (paciente, ventilador) in enumerate(configuraciones):
+        simulador = Simulador(paciente, ventilador, motor="analitico")
+        esperado = simulador.procesar_resultados(*simulador.simular(30.0))
+        n = resultados["n_muestras"][fila]
+        assert n == len(esperado["t"])
+        for clave in ("t", "V1", "V2", "flow", "P_aw"):
+            np.testing.assert_allclose(
+                resultados[clave][fila, :n], esperado[clave], atol=1e-9
+            )
+        assert resultados["auto_peep"][fila] == pytest.approx(esperado["auto_peep"])
+        ultima = esperado["por_ciclo"]["presion_pico"][-1]
+        assert resultados["presion_pico"][fila] == pytest.approx(ultima)
+        for metrica, valores in resultados["ultimo_ciclo"].items():
+            assert valores[fila] == pytest.approx(esperado["por_ciclo"][metrica][-1])
+        assert np.all(np.isnan(resultados["t"][fila, n:]))
+
+
+def test_simulador_lote_presion_pico_del_ultimo_ciclo():
+    """Como en una simulación individual, la presión pico es la de la última
+    respiración aunque una anterior la supere."""
+    lote = SimuladorLote.desde_modelos(
+        [Paciente(10.0, 0.05, 10.0, 0.05)], [Ventilador("VCV", fr=20.0, Vt=0.5)]
+    )
+    t, V1, V2 = lote.simular(15.0)
+    V1[0, 50] += 0.05  # Pico de flujo (y de presión) en la primera respiración
+    resultados = lote.procesar_resultados(t, V1, V2)
+
+    P_aw = resultados["P_aw"][0]
+    assert resultados["presion_pico"][0] < np.nanmax(P_aw)
+    assert resultados["presion_pico"][0] == np.max(P_aw[-lote.pasos_por_ciclo :])
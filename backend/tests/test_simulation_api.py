@@ -1,7 +1,24 @@
 # backend/tests/test_simulation_api.py
 
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
 from app.main import app  # Aplicación FastAPI
+from app.endpoints.simulation import (
+    SimulationRequest,
+    _validar_parametros,
+    simulation_service,
+)
+from app.services.sesiones import SesionSimulacion
+from app.utils import serializacion
+from app.utils.decimacion import indices_min_max
 
 # Cliente de prueba
 client = TestClient(app)
@@ -63,3 +80,683 @@ def test_run_simulation_happy_path():
     assert "GC_actual_L_min" in response_data["metricas_hemodinamicas"]
 
     print("\nPrueba 'test_run_simulation_happy_path' superada con éxito.")
+
+
+def test_run_simulation_estado_estacionario():
+    """
+    Con estado_estacionario=True la respuesta contiene solo los dos ciclos
+    del régimen periódico (2 x 200 muestras) y conserva todas las métricas.
+    """
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "fr": 15.0, "Ti": 1.0},
+        "fisiologia": {},
+        "estado_estacionario": True,
+    }
+
+    response = client.post("/api/simulate", json=payload)
+
+    assert response.status_code == 200
+    response_data = response.json()
+    assert len(response_data["series_tiempo"]["tiempo"]) == 400
+    assert "auto_peep_cmH2O" in response_data["metricas_hemodinamicas"]
+
+
+def test_run_simulation_continua_desde_estado_final():
+    """El estado_final de una respuesta permite continuar la simulación sin
+    recalcular desde t = 0; no se combina con estado_estacionario."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "fr": 15.0, "Ti": 1.0},
+        "fisiologia": {},
+    }
+
+    primera = client.post("/api/simulate", json=payload).json()
+    estado = primera["estado_final"]
+    assert estado["t"] == pytest.approx(primera["series_tiempo"]["tiempo"][-1])
+
+    segunda = client.post("/api/simulate", json={**payload, "estado": estado})
+    assert segunda.status_code == 200
+    tiempo = segunda.json()["series_tiempo"]["tiempo"]
+    assert tiempo[0] == pytest.approx(estado["t"])
+    assert segunda.json()["estado_final"]["t"] == pytest.approx(2 * estado["t"])
+
+    conflicto = {**payload, "estado": estado, "estado_estacionario": True}
+    assert client.post("/api/simulate", json=conflicto).status_code == 400
+
+
+def test_server_timing_y_metricas_prometheus():
+    """Cada etapa se informa en Server-Timing y se agrega en /metrics."""
+    payload = {
+        "paciente": {"R1": 12.0, "C1": 0.04, "R2": 9.0, "C2": 0.05},
+        "ventilador": {"modo": "VCV", "PEEP": 7.3, "Vt": 0.45},
+        "fisiologia": {},
+    }
+    response = client.post("/api/simulate", json=payload)
+    assert response.status_code == 200
+    etapas = {
+        parte.split(";")[0].strip(): parte.strip()
+        for parte in response.headers["server-timing"].split(",")
+    }
+    for etapa in ("cache", "cola", "simulacion", "procesamiento", "json", "total"):
+        assert "dur=" in etapas[etapa]
+    assert 'desc="fallo"' in etapas["cache"]
+    assert (
+        etapas["puntos"]
+        == f'puntos;desc="{len(response.json()["series_tiempo"]["tiempo"])}"'
+    )
+
+    # La segunda petición se sirve desde la caché
+    repetida = client.post("/api/simulate", json=payload)
+    assert "cache;dur=" in repetida.headers["server-timing"]
+    assert "simulacion" not in repetida.headers["server-timing"]
+
+    metricas = client.get("/metrics")
+    assert metricas.status_code == 200
+    assert metricas.headers["content-type"].startswith("text/plain")
+    texto = metricas.text
+    assert 'simulador_etapa_segundos_count{etapa="simulacion",modo="VCV"}' in texto
+    assert 'simulador_ciclos_bucket{modo="VCV",le="+Inf"}' in texto
+    assert (
+        'simulador_respuestas_total{codigo="200",metodo="POST",ruta="/api/simulate"}'
+        in texto
+    )
+
+
+def test_run_simulation_formato_binario():
+    """Con Accept binario las series llegan como float32 y las métricas intactas."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "P_driving": 15.0},
+        "fisiologia": {},
+    }
+    respuesta_json = client.post("/api/simulate", json=payload)
+    json_resp = respuesta_json.json()
+    response = client.post(
+        "/api/simulate",
+        json=payload,
+        headers={"Accept": serializacion.TIPO_BINARIO},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == serializacion.TIPO_BINARIO
+    resultado = serializacion.desde_binario(response.content)
+    tiempo = resultado["series_tiempo"]["tiempo"]
+    assert tiempo.dtype == np.float32
+    np.testing.assert_allclose(tiempo, json_resp["series_tiempo"]["tiempo"], rtol=1e-6)
+    assert resultado["metricas_gases"] == json_resp["metricas_gases"]
+    assert len(response.content) < len(respuesta_json.content) / 2
+
+
+def test_run_simulation_precision_float32():
+    """Con precision float32 las series y las métricas coinciden con las de
+    float64 dentro de la resolución de float32 (en las derivadas, la del
+    paso de tiempo)."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "VCV", "Vt": 0.5},
+        "fisiologia": {},
+    }
+    doble = client.post("/api/simulate", json=payload).json()
+    response = client.post(
+        "/api/simulate",
+        json={**payload, "precision": "float32"},
+        headers={"Accept": serializacion.TIPO_BINARIO},
+    )
+
+    assert response.status_code == 200
+    simple = serializacion.desde_binario(response.content)
+    for nombre, serie in simple["series_tiempo"].items():
+        np.testing.assert_allclose(
+            serie, doble["series_tiempo"][nombre], rtol=1e-5, atol=1e-3
+        )
+    for nombre, valor in doble["metricas_mecanicas"].items():
+        assert simple["metricas_mecanicas"][nombre] == pytest.approx(valor, rel=1e-4)
+    invalida = client.post("/api/simulate", json={**payload, "precision": "float16"})
+    assert invalida.status_code == 422
+
+
+def test_run_simulation_max_points_conserva_picos():
+    """La decimación limita las muestras sin perder la presión ni el flujo pico."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "VCV", "Vt": 0.5},
+        "fisiologia": {},
+    }
+    completa = client.post("/api/simulate", json=payload).json()
+    reducida = client.post("/api/simulate", json={**payload, "max_points": 300}).json()
+
+    series, series_completas = reducida["series_tiempo"], completa["series_tiempo"]
+    assert len(series["tiempo"]) <= 300
+    assert series["tiempo"] == sorted(series["tiempo"])
+    for nombre in ("presion_via_aerea", "flujo_total"):
+        assert max(series[nombre]) == max(series_completas[nombre])
+        assert min(series[nombre]) == min(series_completas[nombre])
+    assert reducida["metricas_mecanicas"] == completa["metricas_mecanicas"]
+
+
+def test_indices_min_max_sin_cubetas_de_relleno():
+    """Con el tamaño de cubeta redondeado, ningún índice sale de la serie."""
+    serie = np.sin(np.linspace(0, 20, 3001))
+    indices = indices_min_max([serie, -serie, serie**2], 1000)
+    assert indices[-1] == 3000
+    assert len(indices) <= 1000
+
+
+def test_run_simulation_stream_ndjson():
+    """El streaming entrega un evento por ciclo y uno final."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "fr": 15.0},
+        "fisiologia": {},
+    }
+    with client.stream("POST", "/api/simulate/stream", json=payload) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(serializacion.TIPO_NDJSON)
+        eventos = [json.loads(linea) for linea in response.iter_lines() if linea]
+
+    ciclos = [e for e in eventos if e["tipo"] == "ciclo"]
+    assert len(ciclos) == 30 // 4 + 1 + 2
+    assert eventos[-1]["tipo"] == "fin"
+    assert eventos[-1]["ciclos"] == len(ciclos)
+    assert eventos[-1]["estado_final"]["t"] == ciclos[-1]["series_tiempo"]["tiempo"][-1]
+    assert len(ciclos[0]["series_tiempo"]["tiempo"]) == 200
+    assert ciclos[-1]["metricas_mecanicas"]["volumen_tidal_entregado"] > 0
+    assert "PaO2_mmHg" in ciclos[-1]["metricas_gases"]
+
+
+def test_run_simulation_stream_rechaza_configuracion_invalida():
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "ESPONTANEO"},
+        "fisiologia": {},
+        "estado_estacionario": True,
+    }
+    response = client.post("/api/simulate/stream", json=payload)
+    assert response.status_code == 400
+
+
+def test_run_simulation_stream_ocupa_un_lugar_del_ejecutor():
+    """Sin lugar en el ejecutor el stream se rechaza con 503; al terminar la
+    transmisión su lugar se libera."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "fr": 15.0},
+        "fisiologia": {},
+    }
+    ejecutor = simulation_service.ejecutor
+    reservas = [ejecutor.reservar() for _ in range(ejecutor.capacidad)]
+    try:
+        response = client.post("/api/simulate/stream", json=payload)
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+    finally:
+        for reserva in reservas:
+            reserva.liberar()
+
+    response = client.post("/api/simulate/stream", json=payload)
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[-1])["tipo"] == "fin"
+    assert ejecutor.en_curso == 0
+
+
+def test_sesion_websocket_continua_tras_actualizar():
+    """Un cambio de PEEP se aplica al ciclo siguiente sin reiniciar el tiempo."""
+    inicial = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "fr": 20.0, "PEEP": 5.0},
+        "fisiologia": {},
+    }
+    with client.websocket_connect("/api/simulate/session") as websocket:
+        websocket.send_json(inicial)
+        primero = json.loads(websocket.receive_text())
+        websocket.send_json({"tipo": "actualizar", "ventilador": {"PEEP": 10.0}})
+        websocket.send_json({"tipo": "velocidad", "factor": 0})
+        websocket.send_json({"tipo": "velocidad", "factor": 100})
+        eventos = [json.loads(websocket.receive_text()) for _ in range(2)]
+        websocket.send_json({"tipo": "cerrar"})
+
+    assert primero["ciclo"] == 1
+    assert len(primero["series_tiempo"]["tiempo"]) == 200
+    assert primero["t_sesion"] == pytest.approx(3.0)
+    assert min(primero["series_tiempo"]["presion_via_aerea"]) == 5.0
+
+    error, segundo = eventos
+    assert error["tipo"] == "error"  # velocidad 0 no es válida
+    assert segundo["ciclo"] == 2
+    assert segundo["series_tiempo"]["tiempo"][0] == pytest.approx(3.0)
+    assert min(segundo["series_tiempo"]["presion_via_aerea"]) == 10.0
+
+
+def test_sesion_websocket_cambio_de_frecuencia_mantiene_la_fase_pcv():
+    """El ciclo con la nueva fr empieza en el tiempo de la sesión (no
+    múltiplo de su periodo) con la inspiración."""
+    inicial = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "fr": 20.0, "PEEP": 5.0, "P_driving": 15.0},
+        "fisiologia": {},
+    }
+    with client.websocket_connect("/api/simulate/session") as websocket:
+        websocket.send_json(inicial)
+        json.loads(websocket.receive_text())
+        websocket.send_json({"tipo": "actualizar", "ventilador": {"fr": 14.0}})
+        websocket.send_json({"tipo": "velocidad", "factor": 100})
+        segundo = json.loads(websocket.receive_text())
+        websocket.send_json({"tipo": "cerrar"})
+
+    assert segundo["duracion"] == pytest.approx(60.0 / 14.0)
+    series = segundo["series_tiempo"]
+    tiempo = np.array(series["tiempo"]) - series["tiempo"][0]
+    presion = np.array(series["presion_via_aerea"])
+    assert tiempo[0] == 0.0 and series["tiempo"][0] == pytest.approx(3.0)
+    np.testing.assert_array_equal(presion[tiempo < 0.99], 20.0)
+    np.testing.assert_array_equal(presion[tiempo > 1.01], 5.0)
+    assert segundo["metricas_mecanicas"]["presion_pico"] == 20.0
+
+
+def test_sesion_espontanea_conserva_el_controlador_al_actualizar():
+    """Actualizar con la misma configuración no altera la evolución: el
+    término integral y la frecuencia del controlador se conservan."""
+    request = SimulationRequest(
+        paciente={"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        ventilador={"modo": "ESPONTANEO"},
+        fisiologia={},
+    )
+    continua = SesionSimulacion(simulation_service, *_validar_parametros(request))
+    actualizada = SesionSimulacion(simulation_service, *_validar_parametros(request))
+    for _ in range(2):
+        continua.avanzar()
+        actualizada.avanzar()
+    frecuencia = actualizada._simulador.ventilador.fr
+    actualizada.actualizar(*_validar_parametros(request))
+    assert actualizada._simulador.ventilador.fr == frecuencia
+
+    for _ in range(2):
+        esperado, evento = continua.avanzar(), actualizada.avanzar()
+        assert evento["t_sesion"] == esperado["t_sesion"]
+        np.testing.assert_array_equal(
+            evento["series_tiempo"]["volumen_total"],
+            esperado["series_tiempo"]["volumen_total"],
+        )
+    assert actualizada._control.integral_error == continua._control.integral_error
+
+
+def test_sesion_websocket_se_cierra_con_el_ejecutor_saturado():
+    """Cada ciclo de la sesión ocupa un lugar del ejecutor."""
+    inicial = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV"},
+        "fisiologia": {},
+    }
+    ejecutor = simulation_service.ejecutor
+    reservas = [ejecutor.reservar() for _ in range(ejecutor.capacidad)]
+    try:
+        with client.websocket_connect("/api/simulate/session") as websocket:
+            websocket.send_json(inicial)
+            error = json.loads(websocket.receive_text())
+            with pytest.raises(WebSocketDisconnect) as cierre:
+                websocket.receive_text()
+    finally:
+        for reserva in reservas:
+            reserva.liberar()
+
+    assert error["tipo"] == "error"
+    assert "saturado" in error["detalle"]
+    assert cierre.value.code == 1013
+    assert ejecutor.en_curso == 0
+
+
+def test_sweep_coincide_con_simulaciones_individuales():
+    """Cada punto de la rejilla reproduce las métricas de /simulate."""
+    base = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV"},
+        "fisiologia": {},
+    }
+    response = client.post(
+        "/api/sweep",
+        json={
+            **base,
+            "ejes": [
+                {"parametro": "PEEP", "valores": [5.0, 10.0]},
+                {"parametro": "fr", "inicio": 12.0, "fin": 24.0, "pasos": 3},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    barrido = response.json()
+    assert barrido["ejes"][1]["valores"] == [12.0, 18.0, 24.0]
+    assert np.shape(barrido["metricas_gases"]["PaO2_mmHg"]) == (2, 3)
+
+    individual = client.post(
+        "/api/simulate",
+        json={**base, "ventilador": {"modo": "PCV", "PEEP": 10.0, "fr": 18.0}},
+    ).json()
+    for grupo in ("metricas_mecanicas", "metricas_gases", "metricas_hemodinamicas"):
+        for metrica, valor in individual[grupo].items():
+            assert barrido[grupo][metrica][1][1] == pytest.approx(valor)
+
+
+def test_sweep_rechaza_valores_fuera_de_rango():
+    response = client.post(
+        "/api/sweep",
+        json={
+            "paciente": {},
+            "ventilador": {},
+            "fisiologia": {},
+            "ejes": [{"parametro": "C1", "valores": [0.05, -0.01]}],
+        },
+    )
+    assert response.status_code == 400
+
+    # Ti debe ser menor que el ciclo (60 / fr) en todas las combinaciones
+    for ejes in (
+        [{"parametro": "Ti", "valores": [1.0, 5.0]}],
+        [
+            {"parametro": "Ti", "valores": [1.0, 2.0]},
+            {"parametro": "fr", "valores": [15.0, 30.0]},
+        ],
+    ):
+        response = client.post(
+            "/api/sweep",
+            json={
+                "paciente": {},
+                "ventilador": {"fr": 15.0},
+                "fisiologia": {},
+                "ejes": ejes,
+            },
+        )
+        assert response.status_code == 400
+        assert "Ti" in response.json()["detail"]
+
+
+def test_ready_solo_tras_el_calentamiento():
+    """/ready responde 503 hasta calentar el worker e informa el arranque y la
+    primera petición (las de calentamiento y sondeo no cuentan)."""
+    payload = {"paciente": {}, "ventilador": {"modo": "PCV"}, "fisiologia": {}}
+    with TestClient(app) as cliente:
+        for _ in range(600):
+            respuesta = cliente.get("/ready")
+            if respuesta.status_code == 200:
+                break
+            assert respuesta.status_code == 503
+            time.sleep(0.05)
+        datos = respuesta.json()
+        assert respuesta.status_code == 200
+        assert set(datos["calentamiento_s"]) == {"rutas", "PCV", "VCV", "ESPONTANEO"}
+        assert datos["arranque_s"] > 0
+        assert datos["primera_peticion"] is None
+
+        assert cliente.post("/api/simulate", json=payload).status_code == 200
+        primera = cliente.get("/ready").json()["primera_peticion"]
+        assert primera["ruta"] == "/api/simulate"
+        assert "simulador_primera_peticion_segundos" in cliente.get("/metrics").text
+
+
+def test_importar_la_app_no_importa_scipy():
+    """scipy (solo para el motor numérico) se importa al usarlo por primera vez."""
+    codigo = "import sys, app.main; sys.exit('scipy.integrate' in sys.modules)"
+    proceso = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=Path(__file__).parents[1]
+    )
+    assert proceso.returncode == 0
+
+
+def test_sensitivity_jacobiano_en_un_solo_lote():
+    """El jacobiano coincide con las fórmulas cerradas y con un barrido; las
+    perturbaciones de fisiología no añaden simulaciones mecánicas."""
+    payload = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "P_driving": 15.0, "fr": 15.0},
+        "fisiologia": {},
+        "parametros": ["C1", "Ti", "PEEP", "FiO2", "Qs_Qt"],
+    }
+    response = client.post("/api/sensitivity", json=payload)
+    assert response.status_code == 200
+    datos = response.json()
+
+    esquemas = {p["parametro"]: p["esquema"] for p in datos["parametros"]}
+    assert esquemas["FiO2"] == "adelante"  # FiO2 = 0.21 es el mínimo
+    assert esquemas["C1"] == "central"
+    # Base más dos filas por C1, Ti y PEEP; FiO2 y Qs_Qt reutilizan la base
+    assert datos["simulaciones"] == 7
+
+    d_vt = dict(
+        zip(
+            payload["parametros"],
+            datos["jacobiano"]["metricas_mecanicas"]["volumen_tidal_entregado"],
+        )
+    )
+    d_auto_peep = dict(
+        zip(
+            payload["parametros"], datos["jacobiano"]["metricas_mecanicas"]["auto_peep"]
+        )
+    )
+    assert d_auto_peep["PEEP"] == pytest.approx(1.0, rel=1e-6)
+    assert d_vt["PEEP"] == pytest.approx(0.0, abs=1e-9)
+    assert d_vt["Qs_Qt"] == 0.0
+
+    # Compartimentos iguales: VT = P·C·(1-a)(1-b)/(1-ab), a = e^(-Ti/τ),
+    # b = e^(-Te/τ), con C = 0.1 L/cmH2O y τ = 0.5 s. La métrica se mide
+    # sobre la malla de muestras, de ahí la tolerancia
+    def vt(Ti):
+        a, b = np.exp(-Ti / 0.5), np.exp(-(4.0 - Ti) / 0.5)
+        return 15.0 * 0.1 * (1 - a) * (1 - b) / (1 - a * b)
+
+    assert d_vt["Ti"] == pytest.approx((vt(1.001) - vt(0.999)) / 0.002, rel=0.05)
+
+    # Coherente con un barrido sobre los mismos extremos
+    extremos = next(
+        p["extremos"] for p in datos["parametros"] if p["parametro"] == "C1"
+    )
+    barrido = client.post(
+        "/api/sweep",
+        json={
+            **{k: payload[k] for k in ("paciente", "ventilador", "fisiologia")},
+            "ejes": [{"parametro": "C1", "valores": extremos}],
+            "estado_estacionario": True,
+        },
+    ).json()
+    vt_extremos = barrido["metricas_mecanicas"]["volumen_tidal_entregado"]
+    assert d_vt["C1"] == pytest.approx(
+        (vt_extremos[1] - vt_extremos[0]) / (extremos[1] - extremos[0]), rel=1e-9
+    )
+
+    espontaneo = {**payload, "ventilador": {"modo": "ESPONTANEO"}}
+    assert client.post("/api/sensitivity", json=espontaneo).status_code == 400
+
+
+def test_estimate_devuelve_parametros_e_intervalos():
+    # Registro del propio simulador (VCV): presión y volumen
+    resultado = client.post(
+        "/api/simulate",
+        json={
+            "paciente": {"R1": 5.0, "C1": 0.04, "R2": 20.0, "C2": 0.06},
+            "ventilador": {"modo": "VCV", "PEEP": 5.0, "fr": 15.0, "Vt": 0.5},
+            "fisiologia": {},
+        },
+    ).json()["series_tiempo"]
+    cuerpo = {
+        "t": resultado["tiempo"],
+        "presion": resultado["presion_via_aerea"],
+        "volumen": resultado["volumen_total"],
+    }
+    response = client.post("/api/estimate", json=cuerpo)
+    assert response.status_code == 200
+    data = response.json()
+    for nombre, valor in (("R1", 5.0), ("C1", 0.04), ("R2", 20.0), ("C2", 0.06)):
+        estimado = data["parametros"][nombre]
+        assert estimado["ic"][0] <= estimado["valor"] <= estimado["ic"][1]
+        assert estimado["valor"] == pytest.approx(valor, rel=0.05)
+    assert data["ajuste"]["r2_flujo"] > 0.99
+
+    response = client.post("/api/estimate", json={**cuerpo, "volumen": None})
+    assert response.status_code == 400
+
+    # Un registro sin excitación no permite estimar la mecánica
+    constante = {"t": cuerpo["t"], "presion": [5.0] * len(cuerpo["t"])}
+    response = client.post(
+        "/api/estimate", json={**constante, "flujo": [0.0] * len(cuerpo["t"])}
+    )
+    assert response.status_code == 400
+
+
+def test_population_bandas_e_histogramas_reproducibles():
+    cuerpo = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV"},
+        "fisiologia": {},
+        "muestras": 300,
+        "semilla": 7,
+        "percentiles": [5, 50, 95],
+        "bins": 10,
+        "distribuciones": {
+            "R1": {"tipo": "lognormal", "mediana": 10.0, "desvio": 0.3},
+            "C1": {"tipo": "lognormal", "mediana": 0.05, "desvio": 0.3},
+            "Qs_Qt": {"tipo": "uniforme", "minimo": 0.0, "maximo": 0.3},
+            "V_D": {"tipo": "normal", "media": 0.15, "desvio": 0.05, "minimo": 0.05},
+        },
+    }
+    response = client.post("/api/population", json=cuerpo)
+    assert response.status_code == 200
+    data = response.json()
+    assert data == client.post("/api/population", json=cuerpo).json()
+
+    # Bandas ordenadas sobre la malla del último ciclo
+    ondas = data["ondas"]
+    assert len(ondas["t"]) == len(ondas["Vt"]["p50"])
+    bajo, medio, alto = (np.array(ondas["Vt"][p]) for p in ("p5", "p50", "p95"))
+    assert np.all(bajo <= medio) and np.all(medio <= alto)
+    assert np.all(alto - bajo > 0)
+
+    # Histogramas de las métricas y de los parámetros sorteados
+    do2 = data["metricas"]["metricas_hemodinamicas"]["DO2_ml_min"]
+    assert sum(do2["histograma"]["conteos"]) + do2["no_finitos"] == 300
+    assert len(do2["histograma"]["bordes"]) == 11
+    v_d = data["parametros"]["V_D"]
+    assert v_d["histograma"]["bordes"][0] >= 0.05
+    assert v_d["media"] == pytest.approx(0.15, abs=0.01)
+
+    # La mediana de la población coincide con la simulación de la mediana
+    # cuando solo varía la fisiología (la mecánica es común)
+    solo_fisiologia = {
+        **cuerpo,
+        "distribuciones": {"Qs_Qt": cuerpo["distribuciones"]["Qs_Qt"]},
+    }
+    data = client.post("/api/population", json=solo_fisiologia).json()
+    vt = data["metricas"]["metricas_mecanicas"]["volumen_tidal_entregado"]
+    assert vt["percentiles"]["p5"] == pytest.approx(vt["percentiles"]["p95"])
+
+    # Muestras fuera del rango válido de un parámetro
+    invalida = {
+        **cuerpo,
+        "distribuciones": {"Qs_Qt": {"tipo": "normal", "media": 0.1, "desvio": 0.5}},
+    }
+    assert client.post("/api/population", json=invalida).status_code == 400
+
+
+def test_scenario_cambio_de_peep_continuo():
+    """Un escenario con un cambio de PEEP equivale a simular hasta el cambio
+    y continuar desde su estado_final con la nueva PEEP; cada segmento
+    tiene sus propias métricas."""
+    base = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "fr": 15.0, "Ti": 1.0},
+        "fisiologia": {},
+    }
+    primera = client.post("/api/simulate", json=base).json()
+    t_cambio = primera["estado_final"]["t"]
+    segunda = client.post(
+        "/api/simulate",
+        json={
+            **base,
+            "ventilador": {**base["ventilador"], "PEEP": 10.0},
+            "estado": primera["estado_final"],
+        },
+    ).json()
+
+    # El cambio programado 1 s antes se aplica en el siguiente límite de ciclo
+    escenario = {
+        **base,
+        "eventos": [{"t": t_cambio - 1.0, "ventilador": {"PEEP": 10.0}}],
+        "duracion_s": 2 * t_cambio - 1.0,
+    }
+    response = client.post("/api/scenario", json=escenario)
+    assert response.status_code == 200
+    data = response.json()
+
+    tiempo = np.array(data["series_tiempo"]["tiempo"])
+    assert np.all(np.diff(tiempo) > 0)
+    for serie in ("tiempo", "volumen_total", "presion_via_aerea"):
+        esperada = (
+            primera["series_tiempo"][serie][:-1] + segunda["series_tiempo"][serie]
+        )
+        np.testing.assert_allclose(data["series_tiempo"][serie], esperada)
+    assert data["estado_final"] == pytest.approx(segunda["estado_final"])
+
+    antes, despues = data["segmentos"]
+    assert antes["inicio_programado_s"] == 0.0
+    assert (antes["inicio_s"], antes["fin_s"]) == (0.0, t_cambio)
+    assert (despues["inicio_s"], despues["fin_s"]) == (t_cambio, 2 * t_cambio)
+    assert despues["inicio_programado_s"] == t_cambio - 1.0
+    # El primer segmento no incluye la muestra compartida con el segundo
+    assert antes["metricas_mecanicas"] == pytest.approx(primera["metricas_mecanicas"])
+    for grupo in ("metricas_mecanicas", "metricas_gases", "metricas_hemodinamicas"):
+        assert despues[grupo] == pytest.approx(segunda[grupo])
+    assert despues["metricas_mecanicas"]["presion_pico"] == 25.0
+
+    # Eventos fuera del escenario o con parámetros inválidos o desconocidos
+    for evento in (
+        {"t": 500.0, "ventilador": {"PEEP": 10.0}},
+        {"t": 5.0, "ventilador": {"PEEP": -1.0}},
+        {"t": 5.0, "ventilador": {"PIP": 30.0}},
+    ):
+        invalido = {**escenario, "eventos": [evento]}
+        assert client.post("/api/scenario", json=invalido).status_code == 400
+
+
+def test_scenario_cambio_de_frecuencia_mantiene_la_fase_pcv():
+    """Tras un cambio de fr el ciclo nuevo empieza en un tiempo que no es
+    múltiplo de su periodo: la presión PCV sigue a los ciclos simulados."""
+    escenario = {
+        "paciente": {"R1": 10.0, "C1": 0.05, "R2": 10.0, "C2": 0.05},
+        "ventilador": {"modo": "PCV", "PEEP": 5.0, "fr": 15.0, "Ti": 1.0},
+        "fisiologia": {},
+        "eventos": [{"t": 10.0, "ventilador": {"fr": 14.0}}],
+        "duracion_s": 30.0,
+    }
+    response = client.post("/api/scenario", json=escenario)
+    assert response.status_code == 200
+    data = response.json()
+
+    _, despues = data["segmentos"]
+    assert despues["inicio_s"] == 12.0
+    assert despues["metricas_mecanicas"]["presion_pico"] == 20.0
+    series = data["series_tiempo"]
+    tiempo = np.array(series["tiempo"])
+    presion = np.array(series["presion_via_aerea"])
+    inspiracion = (np.array(series["flujo_total"]) > 0.05) & (tiempo >= 12.0)
+    assert inspiracion[tiempo < 13.0].any()
+    assert np.all(presion[inspiracion] > 5.0)
+
+
+def test_eventos_de_streaming_con_nan_son_json_estricto():
+    """NaN e infinitos llegan a los clientes de streaming como null."""
+    evento = {
+        "tipo": "ciclo",
+        "metricas_gases": {"PaO2_mmHg": float("nan"), "SaO2": np.float64("inf")},
+        "series_tiempo": {"flujo_total": np.array([0.5, np.nan, -np.inf])},
+        "ciclo": np.int64(3),
+    }
+    esperado = {
+        "tipo": "ciclo",
+        "metricas_gases": {"PaO2_mmHg": None, "SaO2": None},
+        "series_tiempo": {"flujo_total": [0.5, None, None]},
+        "ciclo": 3,
+    }
+    linea = serializacion.linea_ndjson(evento)
+    assert linea.endswith("\n") and json.loads(linea) == esperado
+    sse = serializacion.evento_sse(evento)
+    assert sse.startswith("event: ciclo\ndata: ")
+    datos = sse.splitlines()[1].removeprefix("data: ")
+    assert json.loads(datos, parse_constant=pytest.fail) == esperado